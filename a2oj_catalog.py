@@ -0,0 +1,261 @@
+"""
+Indexed catalog of the A2OJ ladders and category lists.
+
+A2OJ/ladders/data.json and A2OJ/categorywise/data.json are loaded once into
+integer column arrays (one entry per problem in a list). String fields are
+stored as ids into a deduplicated string table, and posting lists are kept
+per platform, list, difficulty, rating and Codeforces problem id. Queries
+intersect the posting lists and materialize only the requested page, so a
+client fetches tens of KB instead of the multi-MB source files.
+
+If a compiled snapshot (see a2oj_snapshot.py) is newer than both sources,
+get_catalog() maps it instead of parsing the JSON.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from array import array
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+LADDERS_PATH = ROOT / "A2OJ" / "ladders" / "data.json"
+CATEGORIES_PATH = ROOT / "A2OJ" / "categorywise" / "data.json"
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class CatalogQueryError(ValueError):
+    """Invalid query parameters."""
+
+
+class Catalog:
+    # String columns hold ids into `strings`; int columns hold values.
+    STRING_COLUMNS = ("kind", "list", "name", "link", "platform", "year", "contest", "cfIndex")
+    INT_COLUMNS = ("id", "difficulty", "rating", "cfContestId")
+
+    def __init__(self, strings, columns: dict, lists: list[dict], generated: dict) -> None:
+        self.strings = strings  # list[str], or a lazily decoded table
+        self.columns = columns
+        self.lists = lists  # ladder/category metadata, without problems
+        self.generated = generated
+        self.index: dict[str, dict] = {
+            "kind": {}, "list": {}, "platform": {}, "difficulty": {}, "rating": {}, "cfContest": {}, "cf": {},
+        }
+        self._build_index()
+
+    def __len__(self) -> int:
+        return len(self.columns["id"])
+
+    # -- loading -------------------------------------------------------------
+
+    @classmethod
+    def from_sources(cls, ladders_path: Path = LADDERS_PATH, categories_path: Path = CATEGORIES_PATH) -> "Catalog":
+        with ladders_path.open("r", encoding="utf-8") as f:
+            ladders = json.load(f)
+        with categories_path.open("r", encoding="utf-8") as f:
+            categories = json.load(f)
+
+        builder = _Builder()
+        for ladder in ladders.get("ladders", []):
+            builder.add_list("ladder", ladder, default_platform="Codeforces")
+        for category in categories.get("categories", []):
+            builder.add_list("category", category, default_platform="")
+        generated = {"ladders": ladders.get("lastUpdated"), "categories": categories.get("lastUpdated")}
+        return cls(builder.strings, builder.columns, builder.lists, generated)
+
+    def _build_index(self) -> None:
+        cols = self.columns
+        strings = self.strings
+        platform_keys: dict[int, str] = {}
+        for i in range(len(self)):
+            self._post("kind", cols["kind"][i], i)
+            self._post("list", cols["list"][i], i)
+            sid = cols["platform"][i]
+            if sid not in platform_keys:
+                platform_keys[sid] = strings[sid].lower()
+            self._post("platform", platform_keys[sid], i)
+            self._post("difficulty", cols["difficulty"][i], i)
+            if cols["rating"][i]:
+                self._post("rating", cols["rating"][i], i)
+            contest_id = cols["cfContestId"][i]
+            if contest_id:
+                self._post("cfContest", contest_id, i)
+                self._post("cf", (contest_id, cols["cfIndex"][i]), i)
+        # Kind and list are looked up by their text, not by string id.
+        for name in ("kind", "list"):
+            self.index[name] = {strings[sid]: rows for sid, rows in self.index[name].items()}
+        self.index["cf"] = {f"{cid}{strings[sid]}": rows for (cid, sid), rows in self.index["cf"].items()}
+
+    def _post(self, index: str, key, row: int) -> None:
+        postings = self.index[index].get(key)
+        if postings is None:
+            postings = self.index[index][key] = array("I")
+        postings.append(row)
+
+    # -- queries -------------------------------------------------------------
+
+    def record(self, i: int) -> dict:
+        cols = self.columns
+        strings = self.strings
+        rec = {
+            "id": cols["id"][i],
+            "kind": strings[cols["kind"][i]],
+            "list": strings[cols["list"][i]],
+            "name": strings[cols["name"][i]],
+            "link": strings[cols["link"][i]],
+            "platform": strings[cols["platform"][i]],
+            "difficulty": cols["difficulty"][i],
+        }
+        if cols["rating"][i]:
+            rec["rating"] = cols["rating"][i]
+        for name in ("year", "contest"):
+            value = strings[cols[name][i]]
+            if value:
+                rec[name] = value
+        if cols["cfContestId"][i]:
+            rec["cfContestId"] = cols["cfContestId"][i]
+            rec["cfIndex"] = strings[cols["cfIndex"][i]]
+        return rec
+
+    def query(self, params: dict[str, str]) -> dict:
+        """
+        Filter and paginate. Supported parameters (all optional):
+          kind=ladder|category, category=<list slug>, platform, difficulty,
+          rating, minRating, maxRating, cfContestId (+ cfIndex), page, pageSize
+        """
+        page = _int_param(params, "page", 1, minimum=1)
+        page_size = min(_int_param(params, "pageSize", DEFAULT_PAGE_SIZE, minimum=1), MAX_PAGE_SIZE)
+
+        postings = []
+        for index, key in (
+            ("kind", params.get("kind")),
+            ("list", params.get("category")),
+            ("platform", (params.get("platform") or "").lower()),
+        ):
+            if key:
+                postings.append(self.index[index].get(key, array("I")))
+        if params.get("difficulty"):
+            postings.append(self.index["difficulty"].get(_int_param(params, "difficulty", 0), array("I")))
+        if params.get("rating"):
+            postings.append(self.index["rating"].get(_int_param(params, "rating", 0), array("I")))
+        if params.get("cfContestId"):
+            contest_id = _int_param(params, "cfContestId", 0)
+            if params.get("cfIndex"):
+                postings.append(self.index["cf"].get(f"{contest_id}{params['cfIndex']}", array("I")))
+            else:
+                postings.append(self.index["cfContest"].get(contest_id, array("I")))
+        if params.get("minRating") or params.get("maxRating"):
+            lo = _int_param(params, "minRating", 0)
+            hi = _int_param(params, "maxRating", 1 << 30)
+            rows = array("I")
+            for rating, rating_rows in self.index["rating"].items():
+                if lo <= rating <= hi:
+                    rows.extend(rating_rows)
+            postings.append(array("I", sorted(rows)))
+
+        if postings:
+            postings.sort(key=len)
+            matched = set(postings[0])
+            for other in postings[1:]:
+                matched.intersection_update(other)
+                if not matched:
+                    break
+            rows = sorted(matched)
+        else:
+            rows = range(len(self))
+
+        start = (page - 1) * page_size
+        return {
+            "total": len(rows),
+            "page": page,
+            "pageSize": page_size,
+            "problems": [self.record(i) for i in rows[start:start + page_size]],
+        }
+
+    def list_summaries(self) -> list[dict]:
+        return [dict(meta) for meta in self.lists]
+
+
+class _Builder:
+    """Accumulates rows from the source JSON into columns and a string table."""
+
+    def __init__(self) -> None:
+        self.strings: list[str] = [""]
+        self.string_ids: dict[str, int] = {"": 0}
+        self.columns: dict[str, array] = {name: array("I") for name in Catalog.STRING_COLUMNS}
+        self.columns.update({name: array("i") for name in Catalog.INT_COLUMNS})
+        self.lists: list[dict] = []
+
+    def intern(self, value) -> int:
+        value = "" if value is None else str(value)
+        sid = self.string_ids.get(value)
+        if sid is None:
+            sid = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return sid
+
+    def add_list(self, kind: str, source: dict, default_platform: str) -> None:
+        meta = {k: v for k, v in source.items() if k != "problems"}
+        meta["kind"] = kind
+        self.lists.append(meta)
+        cols = self.columns
+        for problem in source.get("problems", []):
+            cols["kind"].append(self.intern(kind))
+            cols["list"].append(self.intern(source["slug"]))
+            cols["name"].append(self.intern(problem.get("name", "")))
+            cols["link"].append(self.intern(problem.get("link", "")))
+            cols["platform"].append(self.intern(problem.get("platform") or default_platform))
+            cols["year"].append(self.intern(problem.get("year", "")))
+            cols["contest"].append(self.intern(problem.get("contest", "")))
+            cols["cfIndex"].append(self.intern(problem.get("cfIndex", "")))
+            cols["id"].append(int(problem.get("id", 0)))
+            cols["difficulty"].append(int(problem.get("difficulty", 0)))
+            cols["rating"].append(int(problem.get("rating") or 0))
+            cols["cfContestId"].append(int(problem.get("cfContestId") or 0))
+
+
+def _int_param(params: dict[str, str], name: str, default: int, minimum: int | None = None) -> int:
+    raw = params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise CatalogQueryError(f"{name} must be an integer") from None
+    if minimum is not None and value < minimum:
+        raise CatalogQueryError(f"{name} must be >= {minimum}")
+    return value
+
+
+_catalog: Catalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def load_catalog() -> Catalog:
+    """Map the compiled snapshot when it is up to date, else parse the source JSON."""
+    from a2oj_snapshot import SNAPSHOT_PATH, SnapshotError, load_snapshot
+
+    try:
+        snapshot_mtime = SNAPSHOT_PATH.stat().st_mtime
+        fresh = snapshot_mtime >= max(LADDERS_PATH.stat().st_mtime, CATEGORIES_PATH.stat().st_mtime)
+    except OSError:
+        fresh = False
+    if fresh:
+        try:
+            return load_snapshot(SNAPSHOT_PATH)
+        except SnapshotError:
+            pass  # corrupt or from an older format: fall back to the JSON
+    return Catalog.from_sources()
+
+
+def get_catalog() -> Catalog:
+    """Process-wide catalog, loaded on first use."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = load_catalog()
+    return _catalog
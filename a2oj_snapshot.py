@@ -0,0 +1,197 @@
+"""
+Compiled binary snapshot of the A2OJ catalog.
+
+Parsing the multi-MB A2OJ JSON files dominates the startup of any process
+that uses them. This module compiles them once into a columnar file that
+is loaded with mmap: integer columns are used in place (no parsing, no
+copies) and strings are decoded lazily, only when a record is materialized.
+
+Layout (little-endian, sections 8-byte aligned):
+
+    header   "A2OJSNP1", format version, row count, string count, column count
+    columns  per column: name (16 bytes), kind ("s" string id / "i" int32), offset
+    strings  u32 offsets[string count + 1], then one UTF-8 blob
+    meta     JSON: ladder/category metadata and source timestamps
+    data     one u32/i32 array of `row count` entries per column
+
+Usage:
+    python a2oj_snapshot.py build    # compile A2OJ/*/data.json -> A2OJ/catalog.snapshot
+    python a2oj_snapshot.py verify   # round-trip the snapshot against the source JSON
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from a2oj_catalog import ROOT, Catalog
+
+SNAPSHOT_PATH = ROOT / "A2OJ" / "catalog.snapshot"
+
+MAGIC = b"A2OJSNP1"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIII")
+COLUMN_ENTRY = struct.Struct("<16s1sxxxxxxxQ")
+SECTIONS = struct.Struct("<QQQQQ")  # string offsets, blob, blob length, meta, meta length
+
+
+class SnapshotError(ValueError):
+    """The snapshot file is missing, truncated or from another format version."""
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def _le_bytes(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def compile_snapshot(catalog: Catalog, path: Path = SNAPSHOT_PATH) -> int:
+    """Write `catalog` (built from the sources) as a snapshot; returns the file size."""
+    columns = [(name, "s") for name in Catalog.STRING_COLUMNS] + [(name, "i") for name in Catalog.INT_COLUMNS]
+    rows = len(catalog)
+
+    encoded = [s.encode("utf-8") for s in catalog.strings]
+    offsets = array("I", [0])
+    for raw in encoded:
+        offsets.append(offsets[-1] + len(raw))
+    blob = b"".join(encoded)
+    meta = json.dumps({"lists": catalog.lists, "generated": catalog.generated}, ensure_ascii=False).encode("utf-8")
+
+    pos = HEADER.size + COLUMN_ENTRY.size * len(columns) + SECTIONS.size
+    offsets_at = _align(pos)
+    blob_at = _align(offsets_at + 4 * len(offsets))
+    meta_at = _align(blob_at + len(blob))
+    data_at = _align(meta_at + len(meta))
+    column_at = [data_at + _align(4 * rows) * i for i in range(len(columns))]
+
+    out = bytearray(column_at[-1] + _align(4 * rows) if columns else data_at)
+    HEADER.pack_into(out, 0, MAGIC, FORMAT_VERSION, rows, len(catalog.strings), len(columns))
+    pos = HEADER.size
+    for (name, kind), at in zip(columns, column_at):
+        COLUMN_ENTRY.pack_into(out, pos, name.encode("ascii"), kind.encode("ascii"), at)
+        pos += COLUMN_ENTRY.size
+    SECTIONS.pack_into(out, pos, offsets_at, blob_at, len(blob), meta_at, len(meta))
+
+    out[offsets_at:offsets_at + 4 * len(offsets)] = _le_bytes(offsets)
+    out[blob_at:blob_at + len(blob)] = blob
+    out[meta_at:meta_at + len(meta)] = meta
+    for (name, _), at in zip(columns, column_at):
+        out[at:at + 4 * rows] = _le_bytes(catalog.columns[name])
+
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(out)
+    tmp.replace(path)
+    return len(out)
+
+
+class StringTable:
+    """Offset-indexed strings inside the mapped file, decoded on first access."""
+
+    def __init__(self, offsets, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+        self._cache: dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        value = self._cache.get(i)
+        if value is None:
+            value = self._cache[i] = str(self._blob[self._offsets[i]:self._offsets[i + 1]], "utf-8")
+        return value
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def _column(view: memoryview, at: int, count: int, typecode: str):
+    raw = view[at:at + 4 * count]
+    if sys.byteorder == "little":
+        return raw.cast(typecode)  # zero-copy view into the mapping
+    values = array(typecode, raw.tobytes())
+    values.byteswap()
+    return values
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH) -> Catalog:
+    try:
+        with path.open("rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Cannot map {path}: {e}") from e
+
+    view = memoryview(mapped)
+    if len(view) < HEADER.size:
+        raise SnapshotError(f"{path} is truncated")
+    magic, version, rows, nstrings, ncolumns = HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotError(f"{path} is not a version {FORMAT_VERSION} A2OJ snapshot")
+
+    columns = {}
+    pos = HEADER.size
+    for _ in range(ncolumns):
+        raw_name, kind, at = COLUMN_ENTRY.unpack_from(view, pos)
+        pos += COLUMN_ENTRY.size
+        name = raw_name.rstrip(b"\0").decode("ascii")
+        columns[name] = _column(view, at, rows, "I" if kind == b"s" else "i")
+    offsets_at, blob_at, blob_len, meta_at, meta_len = SECTIONS.unpack_from(view, pos)
+    if meta_at + meta_len > len(view):
+        raise SnapshotError(f"{path} is truncated")
+
+    strings = StringTable(_column(view, offsets_at, nstrings + 1, "I"), view[blob_at:blob_at + blob_len])
+    meta = json.loads(bytes(view[meta_at:meta_at + meta_len]))
+    return Catalog(strings, columns, meta["lists"], meta["generated"])
+
+
+def verify_snapshot(path: Path = SNAPSHOT_PATH) -> list[str]:
+    """Compare every record and list of the snapshot with the source JSON; returns mismatches."""
+    source = Catalog.from_sources()
+    snapshot = load_snapshot(path)
+    problems = []
+    if len(source) != len(snapshot):
+        problems.append(f"row count {len(snapshot)} != source {len(source)}")
+    if source.lists != snapshot.lists:
+        problems.append("ladder/category metadata differs")
+    if source.generated != snapshot.generated:
+        problems.append("source timestamps differ")
+    for i in range(min(len(source), len(snapshot))):
+        if source.record(i) != snapshot.record(i):
+            problems.append(f"row {i}: {snapshot.record(i)} != {source.record(i)}")
+            if len(problems) >= 20:
+                break
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compile or verify the A2OJ catalog snapshot")
+    parser.add_argument("command", choices=["build", "verify"])
+    parser.add_argument("--path", type=Path, default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        catalog = Catalog.from_sources()
+        size = compile_snapshot(catalog, args.path)
+        print(f"Wrote {args.path} ({len(catalog)} rows, {len(catalog.strings)} strings, {size:,} bytes)")
+        return
+
+    problems = verify_snapshot(args.path)
+    for problem in problems:
+        print("MISMATCH", problem)
+    if problems:
+        raise SystemExit(1)
+    print(f"OK {args.path} matches the source JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,12 @@
 
 const CodeforcesAPI = {
     BASE_URL: 'https://codeforces.com/api',
+    MIRROR_URL: window.location.hostname === 'localhost'
+        ? 'http://localhost:5000/api/cf/problemset'
+        : '/api/cf/problemset',
+    ANALYSIS_URL: window.location.hostname === 'localhost'
+        ? 'http://localhost:5000/api/analysis/summary'
+        : '/api/analysis/summary',
     
     /**
      * Fetch user information
@@ -63,6 +69,14 @@ const CodeforcesAPI = {
         let url = `${this.BASE_URL}/problemset.problems`;
         if (tags.length > 0) {
             url += `?tags=${tags.join(';')}`;
+        } else {
+            // The full problemset comes from the server's cached mirror when it is up.
+            try {
+                const mirrored = await fetch(this.MIRROR_URL);
+                if (mirrored.ok) return (await mirrored.json()).result;
+            } catch (error) {
+                console.warn('Problemset mirror unavailable:', error.message);
+            }
         }
         
         const response = await fetch(url);
@@ -75,6 +89,26 @@ const CodeforcesAPI = {
         return data.result;
     },
     
+    /**
+     * Fetch precomputed analytics for a date range from the server
+     * @param {string} handle - Codeforces username
+     * @param {string} from - Start date (YYYY-MM-DD), optional
+     * @param {string} to - End date (YYYY-MM-DD), optional
+     * @returns {Promise<Object|null>} Summary, or null if the API is unavailable
+     */
+    async getAnalysisSummary(handle, from = '', to = '') {
+        const params = new URLSearchParams({ handle });
+        if (from) params.set('from', from);
+        if (to) params.set('to', to);
+        try {
+            const response = await fetch(`${this.ANALYSIS_URL}?${params}`);
+            return response.ok ? await response.json() : null;
+        } catch (error) {
+            console.warn('Analysis API unavailable:', error.message);
+            return null;
+        }
+    },
+    
     /**
      * Fetch all data for a user
      * @param {string} handle - Codeforces username
@@ -351,20 +351,41 @@ const App = {
     /**
      * Render analytics charts
      */
-    renderCharts() {
+    async renderCharts() {
         // Get filtered date range
         const startDate = this.elements.analyticsStartDate.value ? 
             new Date(this.elements.analyticsStartDate.value) : null;
         const endDate = this.elements.analyticsEndDate.value ? 
             new Date(this.elements.analyticsEndDate.value) : null;
         
-        // Get problems with gaps for the date range
-        const problemsWithGaps = CodeforcesAPI.getProblemsPerDayWithGaps(
-            this.userData.solvedProblems.byDate,
-            startDate,
-            endDate
+        // Precomputed range aggregates from the API; computed locally if it is unavailable
+        const summary = await CodeforcesAPI.getAnalysisSummary(
+            this.userData.userInfo.handle,
+            this.elements.analyticsStartDate.value,
+            this.elements.analyticsEndDate.value
         );
         
+        let problemsWithGaps;
+        let dailyScores = this.dailyScores;
+        if (summary && summary.from) {
+            const byDate = this.userData.solvedProblems.byDate;
+            const first = new Date(summary.from);
+            dailyScores = {};
+            problemsWithGaps = summary.problemsPerDay.map((count, i) => {
+                const day = new Date(first);
+                day.setUTCDate(first.getUTCDate() + i);
+                const date = day.toISOString().split('T')[0];
+                dailyScores[date] = { score: summary.dailyScores[i], problemCount: count };
+                return { date, count, problems: byDate[date] || [] };
+            });
+        } else {
+            problemsWithGaps = CodeforcesAPI.getProblemsPerDayWithGaps(
+                this.userData.solvedProblems.byDate,
+                startDate,
+                endDate
+            );
+        }
+        
         // Create problems per day chart
         Analytics.createProblemsPerDayChart(
             this.elements.problemsPerDayChart,
@@ -374,12 +395,19 @@ const App = {
         // Create daily score chart
         Analytics.createDailyScoreChart(
             this.elements.dailyScoreChart,
-            this.dailyScores,
+            dailyScores,
             problemsWithGaps
         );
         
         // Calculate and display averages
-        this.updateChartAverages(problemsWithGaps);
+        if (summary && summary.from) {
+            this.elements.avgProblemsPerDay.textContent = summary.avgProblemsPerDay.toFixed(2);
+            this.elements.maxProblemsPerDay.textContent = summary.maxProblemsPerDay;
+            this.elements.avgDailyScore.textContent = summary.avgDailyScore.toFixed(1);
+            this.elements.maxDailyScore.textContent = Math.round(summary.maxDailyScore);
+        } else {
+            this.updateChartAverages(problemsWithGaps);
+        }
     },
     
     /**
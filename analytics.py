@@ -0,0 +1,182 @@
+"""
+Vectorized analytics for the analysis dashboard.
+
+Built from the first-solve history that cf_sync keeps per handle. Each
+solve becomes one row of NumPy arrays (day, rating bucket, tag bitmask);
+per-day problem counts, daily scores, rating buckets and tag counts are
+computed with np.bincount and stored as prefix sums, so the totals of any
+date range are a subtraction instead of a scan.
+
+Daily score (same formula as calculateDailyScores() in analysis/api.js):
+    DailyScore = sum over rating buckets r of 100 * 2^((r - 800) / 400) * count_r^GAMMA
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+DAY_SECONDS = 86400
+GAMMA = 0.90
+RATING_MIN = 800
+RATING_MAX = 3500
+RATING_STEP = 100
+RATING_BUCKETS = np.arange(RATING_MIN, RATING_MAX + RATING_STEP, RATING_STEP)
+
+MAX_CACHED_USERS = 128
+# Longest ?from=&to= span accepted, and the most per-day values a summary returns.
+MAX_RANGE_DAYS = 5 * 366
+
+
+class AnalyticsQueryError(ValueError):
+    """Invalid date or date range."""
+
+
+def _prefix(values):
+    """Prefix sums along axis 0 with a leading zero row: sum(values[i:j]) = p[j] - p[i]."""
+    zero = np.zeros((1,) + values.shape[1:], dtype=values.dtype)
+    return np.concatenate([zero, np.cumsum(values, axis=0)])
+
+
+class UserAnalytics:
+    def __init__(self, history):
+        """`history`: [[solvedAtSeconds, rating, [tags]], ...] in any order."""
+        n = len(history)
+        timestamps = np.fromiter((h[0] for h in history), dtype=np.int64, count=n)
+        ratings = np.fromiter((h[1] or 0 for h in history), dtype=np.int64, count=n)
+
+        self.tags = []
+        tag_ids = {}
+        for _, _, tags in history:
+            for tag in tags:
+                if tag not in tag_ids:
+                    tag_ids[tag] = len(self.tags)
+                    self.tags.append(tag)
+        # One uint64 word per 64 tags (Codeforces has fewer than 64).
+        words = max(1, -(-len(self.tags) // 64))
+        masks = np.zeros((n, words), dtype=np.uint64)
+        for row, (_, _, tags) in enumerate(history):
+            for tag in tags:
+                k = tag_ids[tag]
+                masks[row, k // 64] |= np.uint64(1 << (k % 64))
+
+        days = timestamps // DAY_SECONDS
+        self.first_day = int(days.min()) if n else 0
+        self.num_days = int(days.max()) - self.first_day + 1 if n else 0
+        day_index = days - self.first_day
+
+        counts = np.bincount(day_index, minlength=self.num_days)
+
+        rated = ratings > 0
+        bucket = np.clip((ratings[rated] - RATING_MIN) // RATING_STEP, 0, len(RATING_BUCKETS) - 1)
+        by_day_rating = np.bincount(
+            day_index[rated] * len(RATING_BUCKETS) + bucket,
+            minlength=self.num_days * len(RATING_BUCKETS),
+        ).reshape(self.num_days, len(RATING_BUCKETS))
+
+        base_points = 100 * np.power(2.0, (RATING_BUCKETS - RATING_MIN) / 400)
+        scores = (base_points * np.power(by_day_rating, GAMMA)).sum(axis=1)
+        self.scores = np.round(scores, 2)
+
+        by_day_tag = np.zeros((self.num_days, len(self.tags)), dtype=np.int64)
+        for k in range(len(self.tags)):
+            has_tag = (masks[:, k // 64] >> np.uint64(k % 64)) & np.uint64(1)
+            by_day_tag[:, k] = np.bincount(day_index, weights=has_tag, minlength=self.num_days)
+
+        self.counts = counts
+        self.count_prefix = _prefix(counts)
+        self.active_prefix = _prefix((counts > 0).astype(np.int64))
+        # Days scoring > 0: the avgDailyScore denominator, as in updateChartAverages() (analysis/app.js).
+        self.score_day_prefix = _prefix((self.scores > 0).astype(np.int64))
+        self.score_prefix = _prefix(self.scores)
+        self.rating_prefix = _prefix(by_day_rating)
+        self.tag_prefix = _prefix(by_day_tag)
+
+    def summary(self, start=None, end=None):
+        """
+        Aggregates for days [start, end] (days since epoch; None = open),
+        clipped to the days with solves and to the last MAX_RANGE_DAYS of them.
+        `from`/`to` are the days actually covered; `truncated` is set when the
+        MAX_RANGE_DAYS limit cut off earlier solves of the requested range.
+        """
+        first = self.first_day if start is None else max(start, self.first_day)
+        last = self.first_day + self.num_days - 1
+        if end is not None:
+            last = min(end, last)
+        truncated = first < last - MAX_RANGE_DAYS + 1
+        first = max(first, last - MAX_RANGE_DAYS + 1)
+        i, j = first - self.first_day, last - self.first_day + 1
+        if j <= i:
+            i = j = 0
+
+        total = int(self.count_prefix[j] - self.count_prefix[i])
+        active = int(self.active_prefix[j] - self.active_prefix[i])
+        score_days = int(self.score_day_prefix[j] - self.score_day_prefix[i])
+        score_total = float(self.score_prefix[j] - self.score_prefix[i])
+        ratings = self.rating_prefix[j] - self.rating_prefix[i]
+        tags = self.tag_prefix[j] - self.tag_prefix[i]
+        daily_counts = self.counts[i:j]
+        daily_scores = self.scores[i:j]
+
+        return {
+            'from': _iso(first) if len(daily_counts) else None,
+            'to': _iso(last) if len(daily_counts) else None,
+            'truncated': truncated,
+            'totalSolved': total,
+            'activeDays': active,
+            'avgProblemsPerDay': round(total / active, 2) if active else 0,
+            'maxProblemsPerDay': int(daily_counts.max()) if len(daily_counts) else 0,
+            'avgDailyScore': round(score_total / score_days, 1) if score_days else 0,
+            'maxDailyScore': float(daily_scores.max()) if len(daily_scores) else 0,
+            'problemsPerDay': daily_counts.tolist(),
+            'dailyScores': daily_scores.tolist(),
+            'byTopic': {tag: int(n) for tag, n in zip(self.tags, tags) if n},
+            'byRating': {str(int(r)): int(n) for r, n in zip(RATING_BUCKETS, ratings) if n},
+        }
+
+
+def _iso(day):
+    return datetime.fromtimestamp(day * DAY_SECONDS, tz=timezone.utc).date().isoformat()
+
+
+def parse_day(value):
+    """YYYY-MM-DD -> days since the epoch (UTC), None for empty."""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).toordinal() - date(1970, 1, 1).toordinal()
+    except ValueError:
+        raise AnalyticsQueryError(f'Invalid date: {value!r} (expected YYYY-MM-DD)') from None
+
+
+def check_range(start, end):
+    """Reject reversed ranges and spans longer than MAX_RANGE_DAYS (days since epoch; None = open)."""
+    if start is None or end is None:
+        return
+    if start > end:
+        raise AnalyticsQueryError('from must not be after to')
+    if end - start + 1 > MAX_RANGE_DAYS:
+        raise AnalyticsQueryError(f'Date range too long (at most {MAX_RANGE_DAYS} days)')
+
+
+_cache = OrderedDict()  # handle -> (etag, UserAnalytics)
+_cache_lock = threading.Lock()
+
+
+def analytics_for(sync_doc):
+    """UserAnalytics for a cf_sync document, reused until its etag changes."""
+    key = sync_doc['_id']
+    etag = sync_doc.get('etag')
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None and cached[0] == etag:
+            _cache.move_to_end(key)
+            return cached[1]
+    built = UserAnalytics(sync_doc.get('history', []))
+    with _cache_lock:
+        _cache[key] = (etag, built)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_USERS:
+            _cache.popitem(last=False)
+    return built
@@ -225,7 +225,8 @@
         if (typeof window.authHeaders === 'function') {
             Object.assign(headers, window.authHeaders());
         }
-        const res = await fetch(CONFIG.PROGRESS_ENDPOINT, { headers, cache: 'no-store' });
+        // 'no-cache' revalidates with If-None-Match, so an unchanged document costs a 304.
+        const res = await fetch(CONFIG.PROGRESS_ENDPOINT, { headers, cache: 'no-cache' });
         if (!res.ok) throw new Error(`Failed to load progress: ${res.status}`);
         return res.json();
     }
@@ -0,0 +1,417 @@
+"""
+Load test for the contest API (contest_server.py) and the progress server (server.py).
+
+Starts both servers on free local ports (contest data in the memory or
+sqlite backend, see contest_storage.py), seeds users built from
+contest/sample-contests.json and progress.json, then drives a concurrent
+mixed workload for a fixed time and reports per-operation p50/p95/p99
+latency and requests per second as JSON.
+
+Usage:
+  python bench_api.py                                   # 200 users x 25 contests, 16 clients, 10 s
+  python bench_api.py --storage sqlite --users 1000 --contests 40 --concurrency 32 --duration 30
+  python bench_api.py --mix load=50,stats=20,leaderboard=20,save=5,progress=5
+  python bench_api.py --out bench.json                  # keep the report
+  python bench_api.py --baseline bench.json --max-regression 25   # exit 1 if a p95 got >25% slower
+  python bench_api.py --contest-url http://127.0.0.1:5000 --progress-url ""   # existing server, contest only
+
+Progress documents are written as bench-<n> users: into the temporary
+work directory for the server.py started here (PROGRESS_DATA_DIR), and
+removed afterwards, with the shard directories this leaves empty, from
+progress/ for a --progress-url server. progress.json is never touched.
+"""
+
+import argparse
+import copy
+import hashlib
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_CONTESTS = os.path.join(ROOT, 'contest', 'sample-contests.json')
+SAMPLE_PROGRESS = os.path.join(ROOT, 'progress.json')
+PROGRESS_DIR = os.path.join(ROOT, 'progress')
+
+DEFAULT_MIX = 'load=35,save=10,stats=25,leaderboard=15,progress=15'
+CONTEST_OPS = ['load', 'save', 'stats', 'leaderboard']
+PERCENTILES = [50, 95, 99]
+USER_PREFIX = 'bench-'
+
+
+# -- fixtures -----------------------------------------------------------------
+
+def make_contests(samples, count, rng):
+    """`count` finished contests cloned from the samples with varied scores and dates."""
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    contests = []
+    for i in range(count):
+        contest = copy.deepcopy(samples[i % len(samples)])
+        solved = rng.randint(0, contest.get('totalProblems', 4))
+        contest['contestId'] = 1700000000000 + i * 86400000 + rng.randint(0, 3600000)
+        contest['solvedCount'] = solved
+        contest['totalScore'] = solved * rng.randint(300, 700)
+        contest['timeTaken'] = rng.randint(1800000, 7200000)
+        contest['date'] = (start + timedelta(days=i)).isoformat().replace('+00:00', 'Z')
+        contest.pop('inProgress', None)
+        contests.append(contest)
+    return contests
+
+
+def make_user_doc(user, contests, rng):
+    return {
+        'user': user,
+        'pastContests': contests,
+        'streak': {'current': rng.randint(0, 30), 'best': rng.randint(30, 60), 'lastDate': None, 'history': []},
+        'settings': {'soundEnabled': False, 'autoRefresh': True, 'showTags': False},
+        'dailyGoal': {'target': 1, 'completed': 0, 'date': None},
+        'activeContest': None,
+    }
+
+
+def progress_path(user):
+    """Same layout as server._user_progress_path()."""
+    shard = hashlib.sha1(user.encode('utf-8')).hexdigest()[:2]
+    return os.path.join(PROGRESS_DIR, shard, f'{user}.json')
+
+
+def remove_progress(users):
+    """Delete the users' documents from progress/, and the shard directories left empty."""
+    shards = set()
+    for user in users:
+        path = progress_path(user)
+        shards.add(os.path.dirname(path))
+        for leftover in (path, path + '.etag', path + '.lock'):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+    for shard in shards:
+        try:
+            os.rmdir(shard)  # only succeeds once empty
+        except OSError:
+            pass
+
+
+# -- servers ------------------------------------------------------------------
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(script, port, extra_env, log):
+    env = {**os.environ, 'PORT': str(port), 'HOST': '127.0.0.1', **extra_env}
+    return subprocess.Popen([sys.executable, script], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_ready(base, path, proc, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f'[ERROR] server for {base} exited with code {proc.returncode}')
+        try:
+            status, _ = Client(base).request('GET', path)
+            if status < 500:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f'[ERROR] {base}{path} not ready after {timeout:.0f}s')
+
+
+# -- client -------------------------------------------------------------------
+
+class Client:
+    """One keep-alive connection per worker thread (http.client reconnects after `Connection: close`)."""
+
+    def __init__(self, base):
+        parts = urlsplit(base)
+        self.conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+
+    def request(self, method, path, body=None):
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            body = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            self.conn.close()
+            raise
+        return response.status, data
+
+
+class Workload:
+    def __init__(self, args, users, docs, progress_doc):
+        self.args = args
+        self.users = users
+        self.docs = docs
+        self.progress_doc = progress_doc
+        ops, weights = zip(*parse_mix(args.mix, progress=bool(args.progress_url)).items())
+        self.ops, self.weights = list(ops), list(weights)
+        self.samples = {op: [] for op in self.ops}
+        self.errors = {op: 0 for op in self.ops}
+        self.lock = threading.Lock()
+
+    def run_op(self, op, clients, rng):
+        user = rng.choice(self.users)
+        if op == 'load':
+            return clients['contest'].request('GET', f'/api/contest/data?user={user}')
+        if op == 'save':
+            return clients['contest'].request('POST', '/api/contest/data', self.docs[user])
+        if op == 'stats':
+            return clients['contest'].request('GET', f'/api/contest/stats?user={user}')
+        if op == 'leaderboard':
+            offset = rng.choice([0, 0, 0, 20, 40])
+            return clients['contest'].request('GET', f'/api/contest/leaderboard?limit=20&offset={offset}')
+        if op == 'progress':
+            return clients['progress'].request('POST', f'/progress?user={user}', self.progress_doc)
+        raise ValueError(op)
+
+    def worker(self, seed, deadline):
+        rng = random.Random(seed)
+        clients = {'contest': Client(self.args.contest_url)}
+        if self.args.progress_url:
+            clients['progress'] = Client(self.args.progress_url)
+        samples = {op: [] for op in self.ops}
+        errors = {op: 0 for op in self.ops}
+        while time.perf_counter() < deadline:
+            op = rng.choices(self.ops, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                status, _ = self.run_op(op, clients, rng)
+                ok = status < 400
+            except (http.client.HTTPException, OSError):
+                ok = False
+            samples[op].append(time.perf_counter() - started)
+            if not ok:
+                errors[op] += 1
+        with self.lock:
+            for op in self.ops:
+                self.samples[op].extend(samples[op])
+                self.errors[op] += errors[op]
+
+    def run(self):
+        deadline = time.perf_counter() + self.args.duration
+        threads = [threading.Thread(target=self.worker, args=(self.args.seed + i, deadline))
+                   for i in range(self.args.concurrency)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - started
+
+
+def parse_mix(text, progress=True):
+    mix = {}
+    for part in text.split(','):
+        op, _, weight = part.partition('=')
+        op = op.strip()
+        if op not in CONTEST_OPS + ['progress']:
+            raise SystemExit(f'[ERROR] unknown operation in --mix: {op!r}')
+        if op == 'progress' and not progress:
+            continue
+        mix[op] = float(weight or 1)
+    if not any(mix.values()):
+        raise SystemExit('[ERROR] --mix has no operations with a positive weight')
+    return {op: w for op, w in mix.items() if w > 0}
+
+
+# -- report -------------------------------------------------------------------
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, max(math.ceil(p / 100 * len(sorted_values)) - 1, 0))]
+
+
+def summarize(samples, errors, elapsed):
+    ops = {}
+    for op, values in samples.items():
+        values = sorted(values)
+        ops[op] = {
+            'requests': len(values),
+            'errors': errors[op],
+            'rps': round(len(values) / elapsed, 1),
+            **{f'p{p}Ms': round(percentile(values, p) * 1000, 2) if values else None for p in PERCENTILES},
+            'maxMs': round(values[-1] * 1000, 2) if values else None,
+        }
+    total = sum(o['requests'] for o in ops.values())
+    return {
+        'requests': total,
+        'errors': sum(o['errors'] for o in ops.values()),
+        'rps': round(total / elapsed, 1),
+        'ops': ops,
+    }
+
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def regressions(report, baseline, max_regression):
+    """Operations whose p95 is more than `max_regression` percent above the baseline."""
+    slower = []
+    for op, current in report['results']['ops'].items():
+        before = baseline.get('results', {}).get('ops', {}).get(op)
+        if not before or not before.get('p95Ms') or current['p95Ms'] is None:
+            continue
+        change = (current['p95Ms'] - before['p95Ms']) / before['p95Ms'] * 100
+        if change > max_regression:
+            slower.append(f"{op}: p95 {before['p95Ms']} -> {current['p95Ms']} ms (+{change:.0f}%)")
+    return slower
+
+
+def print_table(report):
+    results = report['results']
+    print(f"\n{'op':<12} {'req':>8} {'err':>5} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)",
+          file=sys.stderr)
+    for op, o in results['ops'].items():
+        print(f"{op:<12} {o['requests']:>8} {o['errors']:>5} {o['rps']:>9} {o['p50Ms']!s:>8} "
+              f"{o['p95Ms']!s:>8} {o['p99Ms']!s:>8} {o['maxMs']!s:>8}", file=sys.stderr)
+    print(f"{'total':<12} {results['requests']:>8} {results['errors']:>5} {results['rps']:>9}", file=sys.stderr)
+
+
+# -- main ---------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the contest and progress APIs')
+    parser.add_argument('--storage', choices=['memory', 'sqlite'], default='memory',
+                        help='CONTEST_STORAGE for the contest server started by the harness')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--contests', type=int, default=25, help='finished contests per user')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of measured load')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'operation weights (default {DEFAULT_MIX})')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--contest-url', help='use a running contest server instead of starting one')
+    parser.add_argument('--progress-url', help='use a running server.py instead of starting one ("" to skip)')
+    parser.add_argument('--out', help='write the JSON report here (default: stdout)')
+    parser.add_argument('--baseline', help='earlier report to compare p95 latencies against')
+    parser.add_argument('--max-regression', type=float, default=20.0,
+                        help='allowed p95 increase over the baseline, in percent')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with open(SAMPLE_CONTESTS, encoding='utf-8') as f:
+        samples = json.load(f)
+    with open(SAMPLE_PROGRESS, encoding='utf-8') as f:
+        progress_doc = json.load(f)
+
+    procs = []
+    workdir = tempfile.mkdtemp(prefix='skilltree-bench-')
+    log = open(os.path.join(workdir, 'servers.log'), 'wb')
+    users = [f'{USER_PREFIX}{i}' for i in range(args.users)]
+    try:
+        contest_proc = progress_proc = None
+        if not args.contest_url:
+            port = free_port()
+            contest_proc = start_server('contest_server.py', port, {
+                'CONTEST_STORAGE': args.storage,
+                'CONTEST_SQLITE_PATH': os.path.join(workdir, 'contest.sqlite3'),
+                'MONGODB_URI': '',
+            }, log)
+            procs.append(contest_proc)
+            args.contest_url = f'http://127.0.0.1:{port}'
+        if args.progress_url is None:
+            port = free_port()
+            progress_proc = start_server('server.py', port, {
+                'PROGRESS_DATA_DIR': os.path.join(workdir, 'progress'),
+            }, log)
+            procs.append(progress_proc)
+            args.progress_url = f'http://127.0.0.1:{port}'
+
+        wait_ready(args.contest_url, '/api/health', contest_proc)
+        if args.progress_url:
+            wait_ready(args.progress_url, '/curriculum', progress_proc)
+
+        print(f"Seeding {args.users} users x {args.contests} contests ...", file=sys.stderr)
+        docs = {user: make_user_doc(user, make_contests(samples, args.contests, rng), rng) for user in users}
+        seeder = Client(args.contest_url)
+        seed_started = time.perf_counter()
+        for user in users:
+            status, body = seeder.request('POST', '/api/contest/data', docs[user])
+            if status != 200:
+                raise SystemExit(f'[ERROR] seeding {user} failed: {status} {body[:200]!r}')
+        if args.progress_url:
+            progress_seeder = Client(args.progress_url)
+            for user in users:
+                progress_seeder.request('POST', f'/progress?user={user}', progress_doc)
+        seed_seconds = time.perf_counter() - seed_started
+
+        print(f"Running {args.concurrency} clients for {args.duration:.0f}s ...", file=sys.stderr)
+        workload = Workload(args, users, docs, progress_doc)
+        elapsed = workload.run()
+
+        report = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'config': {
+                'storage': args.storage if contest_proc else None,
+                'contestUrl': args.contest_url,
+                'progressUrl': args.progress_url or None,
+                'users': args.users,
+                'contestsPerUser': args.contests,
+                'concurrency': args.concurrency,
+                'durationSeconds': args.duration,
+                'mix': parse_mix(args.mix, progress=bool(args.progress_url)),
+                'seed': args.seed,
+                'python': sys.version.split()[0],
+            },
+            'seedSeconds': round(seed_seconds, 2),
+            'elapsedSeconds': round(elapsed, 2),
+            'results': summarize(workload.samples, workload.errors, elapsed),
+        }
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        log.close()
+        if progress_proc is None and args.progress_url:
+            remove_progress(users)
+
+    print_table(report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"\nReport written to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            slower = regressions(report, json.load(f), args.max_regression)
+        if slower:
+            print('\n[FAIL] p95 regressions over the baseline:\n  ' + '\n  '.join(slower), file=sys.stderr)
+            sys.exit(1)
+        print(f"\n[OK] no p95 regression above {args.max_regression:.0f}% of the baseline", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark for the contest API (the Vercel Python function).
+
+Every run is a fresh interpreter, like a cold serverless instance:
+  import   -> time to `import contest_server` (module + app factory)
+  first    -> time for the first request to each path via the test client
+
+Usage:
+  python bench_coldstart.py                          # 5 runs, default paths
+  python bench_coldstart.py --runs 10 --path /api/health --path "/api/contest/stats?user=x"
+  python bench_coldstart.py --max-import-ms 400      # exit 1 above the budget (CI)
+  python bench_coldstart.py --importtime             # slowest top-level imports
+
+Without MONGODB_URI the database endpoints answer 503, which still measures
+the import and routing cost; set it to include connection setup.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATHS = ['/api/health', '/api/contest/stats?user=bench', '/api/contest/leaderboard']
+
+RUN_ONE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import contest_server
+t1 = time.perf_counter()
+client = contest_server.app.test_client()
+first = {}
+for path in sys.argv[1:]:
+    start = time.perf_counter()
+    status = client.get(path).status_code
+    first[path] = [round((time.perf_counter() - start) * 1000, 2), status]
+print(json.dumps({'import': round((t1 - t0) * 1000, 2), 'first': first}))
+'''
+
+
+def run_once(paths):
+    out = subprocess.run([sys.executable, '-c', RUN_ONE, *paths], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit=12):
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import contest_server'],
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Top-level imports of contest_server are indented by three spaces.
+        if name.startswith('   ') and not name.startswith('    ') or name.strip() == 'contest_server':
+            try:
+                rows.append((int(cumulative), name.strip()))
+            except ValueError:
+                continue
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure contest_server cold start')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--path', action='append', dest='paths')
+    parser.add_argument('--max-import-ms', type=float,
+                        help='fail if the median import time exceeds this budget')
+    parser.add_argument('--importtime', action='store_true',
+                        help='also list the slowest imports (python -X importtime)')
+    args = parser.parse_args()
+    paths = args.paths or DEFAULT_PATHS
+
+    results = [run_once(paths) for _ in range(args.runs)]
+    imports = [r['import'] for r in results]
+    print(f"Cold start over {args.runs} fresh interpreters (median / max, ms)")
+    print(f"  {'import contest_server':<40} {statistics.median(imports):>8.1f} {max(imports):>8.1f}")
+    for path in paths:
+        times = [r['first'][path][0] for r in results]
+        status = results[-1]['first'][path][1]
+        print(f"  {'first ' + path:<40} {statistics.median(times):>8.1f} {max(times):>8.1f}  [{status}]")
+
+    if args.importtime:
+        print("\nSlowest imports (cumulative, ms)")
+        for micros, name in slowest_imports():
+            print(f"  {name:<40} {micros / 1000:>8.1f}")
+
+    if args.max_import_ms is not None and statistics.median(imports) > args.max_import_ms:
+        print(f"\n[FAIL] median import {statistics.median(imports):.1f} ms > budget {args.max_import_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
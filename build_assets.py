@@ -0,0 +1,225 @@
+"""
+Static asset build for the dashboards (root, contest/, analysis/,
+codeforces/, skilltree2/, A2OJ/) served by server.py.
+
+Writes dist/ (or --out):
+  - every .js/.css/.json asset twice: under its own name and under a
+    content-hashed name (app.js -> app.3f9a1c2b7d.js); JSON data files, and
+    data.js files that only wrap one JSON literal, are minified first
+  - the HTML pages, with local <script src>/<link href> references (and
+    their ?v= cache busters) rewritten to the hashed names
+  - .gz and .br sidecars next to every file they make smaller (brotli needs
+    the optional `brotli` package; without it only .gz is written)
+  - asset-manifest.json: logical path -> hashed file and sizes
+
+server.py serves dist/ when the manifest exists (hashed names as
+immutable, everything else revalidated) and falls back to the source tree
+for anything the build did not produce. Rebuild after editing assets, or
+run `python server.py --dev` while working on them.
+
+Usage:
+  python build_assets.py                 # build dist/ and print per-asset savings
+  python build_assets.py --out /tmp/dist --quiet
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+from static_files import MANIFEST_NAME
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUT = os.path.join(ROOT, 'dist')
+
+# Top-level pages and assets; the app directories are taken whole.
+ROOT_FILES = ['index.html', 'reset-password.html', 'app.js', 'auth-gate.js', 'sample-data.js', 'styles.css']
+APP_DIRS = ['contest', 'analysis', 'codeforces', 'skilltree2', 'A2OJ']
+ASSET_EXTENSIONS = ('.js', '.css', '.json')
+HASH_LENGTH = 10
+# Sidecars below this size are not worth a second file.
+MIN_SIDECAR_SIZE = 256
+
+REFERENCE_RE = re.compile(r'(<(?:script|link)\b[^>]*?\b(?:src|href)=")([^"]+)(")', re.IGNORECASE)
+# `const NAME = <JSON>;` and nothing else (the A2OJ data.js files).
+JSON_WRAPPER_RE = re.compile(r'^\s*((?:const|let|var)\s+[A-Za-z_$][\w$]*\s*=\s*)(.*?);?\s*$', re.DOTALL)
+
+
+def source_files():
+    """Relative posix paths of the pages and assets to build, sorted."""
+    found = [name for name in ROOT_FILES if os.path.isfile(os.path.join(ROOT, name))]
+    for app_dir in APP_DIRS:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, app_dir)):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d != 'node_modules')
+            for name in filenames:
+                if name.endswith(ASSET_EXTENSIONS + ('.html',)):
+                    found.append(os.path.relpath(os.path.join(dirpath, name), ROOT).replace(os.sep, '/'))
+    return sorted(found)
+
+
+def minify(path, data):
+    """Compact JSON data files and JSON-only data.js wrappers; other files are returned as is."""
+    if path.endswith('.json'):
+        try:
+            value = json.loads(data)
+        except ValueError:
+            return data
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if path.endswith('.js'):
+        match = JSON_WRAPPER_RE.match(data.decode('utf-8', errors='replace'))
+        if match:
+            try:
+                value = json.loads(match.group(2))
+            except ValueError:
+                return data
+            compact = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+            return (match.group(1) + compact + ';\n').encode('utf-8')
+    return data
+
+
+def hashed_name(path, data):
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    base, ext = os.path.splitext(path)
+    return f'{base}.{digest}{ext}'
+
+
+def write_with_sidecars(out_dir, path, data):
+    """Write `path` and its .gz/.br sidecars (when smaller); returns {'gzip': n, 'br': n} sizes."""
+    target = os.path.join(out_dir, *path.split('/'))
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        f.write(data)
+    sizes = {'gzip': None, 'br': None}
+    if len(data) < MIN_SIDECAR_SIZE:
+        return sizes
+    variants = [('gzip', '.gz', lambda body: gzip.compress(body, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('br', '.br', lambda body: brotli.compress(body, quality=11)))
+    for coding, suffix, encode in variants:
+        encoded = encode(data)
+        if len(encoded) < len(data):
+            with open(target + suffix, 'wb') as f:
+                f.write(encoded)
+            sizes[coding] = len(encoded)
+    return sizes
+
+
+def rewrite_html(path, html, hashed):
+    """Point local script/stylesheet references of the page at `path` to the hashed files."""
+    page_dir = os.path.dirname(path)
+
+    def replace(match):
+        ref = match.group(2)
+        if re.match(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', ref, re.IGNORECASE):
+            return match.group(0)  # external, data: or fragment
+        clean = ref.split('#', 1)[0].split('?', 1)[0]
+        if clean.startswith('/'):
+            logical = clean.lstrip('/')
+        else:
+            logical = os.path.normpath(os.path.join(page_dir, clean)).replace(os.sep, '/')
+        if logical not in hashed:
+            return match.group(0)
+        if clean.startswith('/'):
+            new_ref = '/' + hashed[logical]
+        else:
+            new_ref = os.path.relpath(hashed[logical], page_dir or '.').replace(os.sep, '/')
+        return match.group(1) + new_ref + match.group(3)
+
+    return REFERENCE_RE.sub(replace, html)
+
+
+def prepare_out_dir(out_dir):
+    """Start from an empty directory; refuse to wipe one that is not an earlier build."""
+    if os.path.isdir(out_dir) and os.listdir(out_dir):
+        if not os.path.isfile(os.path.join(out_dir, MANIFEST_NAME)):
+            raise SystemExit(f'{out_dir} is not empty and has no {MANIFEST_NAME}; refusing to overwrite it')
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+
+def build(out_dir):
+    prepare_out_dir(out_dir)
+    files = source_files()
+    assets, rows, hashed = {}, [], {}
+
+    for path in files:
+        if path.endswith('.html'):
+            continue
+        with open(os.path.join(ROOT, path), 'rb') as f:
+            source = f.read()
+        data = minify(path, source)
+        name = hashed_name(path, data)
+        sizes = write_with_sidecars(out_dir, path, data)
+        write_with_sidecars(out_dir, name, data)
+        hashed[path] = name
+        assets[path] = {'file': name, 'sourceSize': len(source), 'size': len(data), **sizes}
+        rows.append((path, len(source), len(data), sizes))
+
+    pages = {}
+    for path in files:
+        if not path.endswith('.html'):
+            continue
+        with open(os.path.join(ROOT, path), 'rb') as f:
+            source = f.read()
+        data = rewrite_html(path, source.decode('utf-8'), hashed).encode('utf-8')
+        sizes = write_with_sidecars(out_dir, path, data)
+        pages[path] = {'sourceSize': len(source), 'size': len(data), **sizes}
+        rows.append((path, len(source), len(data), sizes))
+
+    manifest = {
+        'version': 1,
+        'generated': datetime.now(timezone.utc).isoformat(),
+        'brotli': brotli is not None,
+        'assets': assets,
+        'pages': pages,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest, rows
+
+
+def _kb(n):
+    return '-' if n is None else f'{n / 1024:,.1f}'
+
+
+def print_report(rows):
+    print(f"{'asset':<44} {'source KB':>10} {'min KB':>9} {'gzip KB':>9} {'br KB':>9} {'saved':>7}")
+    totals = [0, 0]
+    for path, source, size, sizes in sorted(rows, key=lambda row: -row[1]):
+        sent = min(n for n in (size, sizes['gzip'], sizes['br']) if n is not None)
+        totals[0] += source
+        totals[1] += sent
+        saved = 100 * (1 - sent / source) if source else 0
+        print(f'{path:<44} {_kb(source):>10} {_kb(size):>9} {_kb(sizes["gzip"]):>9} {_kb(sizes["br"]):>9} '
+              f'{saved:>6.1f}%')
+    if totals[0]:
+        print(f"{'total (smallest variant)':<44} {_kb(totals[0]):>10} {_kb(totals[1]):>9} {'':>9} {'':>9} "
+              f'{100 * (1 - totals[1] / totals[0]):>6.1f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint, minify and precompress the static dashboards')
+    parser.add_argument('--out', default=DEFAULT_OUT, help='output directory (default: dist/)')
+    parser.add_argument('--quiet', action='store_true', help='no per-asset report')
+    args = parser.parse_args()
+
+    if brotli is None:
+        print('[WARNING] brotli is not installed; writing .gz sidecars only', file=sys.stderr)
+    manifest, rows = build(os.path.abspath(args.out))
+    if not args.quiet:
+        print_report(rows)
+    print(f"[OK] {len(manifest['assets'])} assets, {len(manifest['pages'])} pages -> {args.out}")
+
+
+if __name__ == '__main__':
+    main()
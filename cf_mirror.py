@@ -0,0 +1,241 @@
+"""
+Local mirror of Codeforces API resources (problemset.problems).
+
+The payload is several MB and rarely changes, so instead of every browser
+downloading it from codeforces.com, the server keeps one copy:
+
+  - on disk as gzip (CF_CACHE_DIR), so restarts and cold serverless
+    instances do not refetch it;
+  - in memory as precompressed bytes with a content ETag, served as-is to
+    clients that accept gzip (brotli and identity are derived once);
+  - refreshed in the background when older than PROBLEMSET_MAX_AGE, with a
+    conditional request when upstream sent validators. Stale bytes keep
+    being served meanwhile.
+
+Concurrent cold misses are single-flighted: one request fetches upstream,
+the others wait for its result. The upstream base URL comes from
+CF_API_BASE, so tests can point it at a local fixture server.
+"""
+
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from http_cache import compress, content_etag
+
+CF_API_BASE = os.getenv('CF_API_BASE', 'https://codeforces.com/api').rstrip('/')
+CF_CACHE_DIR = Path(os.getenv('CF_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'skilltree-cf'))
+# Seconds before the problemset is refreshed from upstream.
+PROBLEMSET_MAX_AGE = int(os.getenv('PROBLEMSET_MAX_AGE', 6 * 3600))
+UPSTREAM_TIMEOUT = 20
+
+
+class MirrorUnavailable(RuntimeError):
+    """Nothing cached yet and the upstream fetch failed."""
+
+
+class MirrorEntry:
+    """One immutable version of a mirrored resource."""
+
+    def __init__(self, gzipped, etag, fetched_at, validators=None):
+        self.gzipped = gzipped
+        self.etag = etag
+        self.fetched_at = fetched_at
+        self.validators = validators or {}  # upstream ETag / Last-Modified
+        self._encoded = {'gzip': gzipped}
+        self._result = None
+
+    def encoded(self, encoding):
+        """Body for a Content-Encoding (None = identity), computed once."""
+        cached = self._encoded.get(encoding)
+        if cached is None:
+            body = self._encoded.get(None)
+            if body is None:
+                body = self._encoded[None] = gzip.decompress(self.gzipped)
+            cached = body if encoding is None else compress(body, encoding)
+            self._encoded[encoding] = cached
+        return cached
+
+    def result(self):
+        """Parsed `result` field of the API response, decoded once."""
+        if self._result is None:
+            self._result = json.loads(self.encoded(None))['result']
+        return self._result
+
+    def with_fetched_at(self, fetched_at, validators):
+        entry = MirrorEntry(self.gzipped, self.etag, fetched_at, validators or self.validators)
+        entry._encoded = self._encoded
+        entry._result = self._result
+        return entry
+
+
+class Mirror:
+    def __init__(self, method, max_age, cache_dir=CF_CACHE_DIR, api_base=None):
+        self.method = method
+        self.max_age = max_age
+        self.api_base = api_base
+        self.data_path = Path(cache_dir) / f'{method}.json.gz'
+        self.meta_path = Path(cache_dir) / f'{method}.meta.json'
+        self._entry = None
+        self._lock = threading.Lock()
+        self._inflight = None  # threading.Event of the running refresh
+        self._last_error = None
+
+    @property
+    def url(self):
+        return f'{(self.api_base or CF_API_BASE)}/{self.method}'
+
+    def get(self, timeout=UPSTREAM_TIMEOUT + 5):
+        """Current entry; refreshes in the background when stale, fetches inline when cold."""
+        entry = self._entry
+        if entry is None:
+            with self._lock:
+                if self._entry is None:
+                    self._entry = self._load_disk()
+            entry = self._entry
+        if entry is None:
+            self._refresh(wait=True, timeout=timeout)
+            entry = self._entry
+            if entry is None:
+                raise MirrorUnavailable(f'{self.method}: {self._last_error or "upstream fetch failed"}')
+        elif time.time() - entry.fetched_at >= self.max_age:
+            self._refresh(wait=False)
+        return entry
+
+    def _refresh(self, wait, timeout=None):
+        with self._lock:
+            event = self._inflight
+            leader = event is None
+            if leader:
+                event = self._inflight = threading.Event()
+        if not leader:
+            if wait:
+                event.wait(timeout)
+            return
+        if wait:
+            self._run_refresh(event)
+        else:
+            threading.Thread(target=self._run_refresh, args=(event,),
+                             name=f'cf-mirror-{self.method}', daemon=True).start()
+
+    def _run_refresh(self, event):
+        try:
+            self._fetch()
+            self._last_error = None
+        except Exception as e:
+            self._last_error = e
+            print(f"[WARNING] Codeforces mirror refresh of {self.method} failed: {e}")
+            current = self._entry
+            if current is not None:
+                # Back off for a full window instead of retrying on every request.
+                self._entry = current.with_fetched_at(time.time(), None)
+        finally:
+            with self._lock:
+                self._inflight = None
+            event.set()
+
+    def _fetch(self):
+        current = self._entry
+        headers = {'Accept-Encoding': 'gzip', 'User-Agent': 'skilltree-cf-mirror'}
+        if current is not None:
+            if current.validators.get('etag'):
+                headers['If-None-Match'] = current.validators['etag']
+            if current.validators.get('last_modified'):
+                headers['If-Modified-Since'] = current.validators['last_modified']
+
+        try:
+            with urllib.request.urlopen(urllib.request.Request(self.url, headers=headers),
+                                        timeout=UPSTREAM_TIMEOUT) as response:
+                raw = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    raw = gzip.decompress(raw)
+                validators = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                }
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and current is not None:
+                self._store(current.with_fetched_at(time.time(), None), write_data=False)
+                return
+            raise
+
+        payload = json.loads(raw)
+        if payload.get('status') != 'OK':
+            raise RuntimeError(payload.get('comment') or 'Codeforces API error')
+
+        etag = content_etag(raw)
+        if current is not None and current.etag == etag:
+            self._store(current.with_fetched_at(time.time(), validators), write_data=False)
+            return
+        entry = MirrorEntry(compress(raw, 'gzip'), etag, time.time(), validators)
+        entry._encoded[None] = raw
+        entry._result = payload['result']
+        self._store(entry, write_data=True)
+
+    # -- disk ----------------------------------------------------------------
+
+    def _store(self, entry, write_data):
+        self._entry = entry
+        try:
+            self.data_path.parent.mkdir(parents=True, exist_ok=True)
+            if write_data:
+                _atomic_write(self.data_path, entry.gzipped)
+            meta = {'etag': entry.etag, 'fetchedAt': entry.fetched_at, 'validators': entry.validators}
+            _atomic_write(self.meta_path, json.dumps(meta).encode('utf-8'))
+        except OSError as e:
+            # Read-only filesystem: keep serving from memory.
+            print(f"[WARNING] Cannot persist Codeforces mirror {self.method}: {e}")
+
+    def _load_disk(self):
+        try:
+            meta = json.loads(self.meta_path.read_bytes())
+            gzipped = self.data_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if not meta.get('etag'):
+            return None
+        return MirrorEntry(gzipped, meta['etag'], meta.get('fetchedAt', 0), meta.get('validators'))
+
+
+def call(method, api_base=None, **params):
+    """Uncached Codeforces API call; returns `result` or raises RuntimeError."""
+    url = f'{(api_base or CF_API_BASE)}/{method}?{urllib.parse.urlencode(params)}'
+    request = urllib.request.Request(url, headers={'Accept-Encoding': 'gzip', 'User-Agent': 'skilltree-cf-mirror'})
+    try:
+        with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT) as response:
+            raw, encoding = response.read(), response.headers.get('Content-Encoding')
+    except urllib.error.HTTPError as e:
+        # Codeforces answers errors (unknown handle, ...) with 400 and a JSON comment,
+        # gzipped like any other response.
+        raw, encoding = e.read(), e.headers.get('Content-Encoding')
+    except OSError as e:
+        # Unreachable, DNS failure, timeout (URLError and socket.timeout are OSErrors).
+        raise RuntimeError(f'{method}: Codeforces is unreachable: {e}') from e
+    try:
+        if encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        payload = json.loads(raw)
+    except (OSError, EOFError, ValueError):
+        raise RuntimeError(f'{method}: invalid response from Codeforces') from None
+    if payload.get('status') != 'OK':
+        raise RuntimeError(payload.get('comment') or f'{method}: Codeforces API error')
+    return payload['result']
+
+
+def _atomic_write(path, data):
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+problemset = Mirror('problemset.problems', PROBLEMSET_MAX_AGE)
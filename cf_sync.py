@@ -0,0 +1,188 @@
+"""
+Incremental Codeforces submission sync.
+
+Instead of downloading a handle's whole user.status history on every page
+load, the server keeps one `cf_sync` document per handle:
+
+    {_id: <handle, lowercased>, handle, lastSubmissionId,
+     solved: ["4A", ...], byTag: {"math": 12}, byRating: {"800": 30},
+     history: [[solvedAtSeconds, rating, [tags]], ...],  # first solves, oldest first
+     syncedAt, etag}
+
+A sync fetches user.status pages newest-first with from/count and stops at
+the first submission it has already seen, so a returning user costs one
+small request. Counters only move when a problem is solved for the first
+time. Syncs of the same handle are serialized; a handle synced less than
+CF_SYNC_INTERVAL seconds ago is answered from the stored document.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import cf_mirror
+from http_cache import json_etag
+
+CF_SYNC_INTERVAL = int(os.getenv('CF_SYNC_INTERVAL', 60))
+INITIAL_PAGE_SIZE = 10000
+PAGE_SIZE = 100
+
+_handle_locks = {}  # handle -> [lock, syncs holding or waiting for it]
+_handle_locks_guard = threading.Lock()
+
+
+class SyncConflict(RuntimeError):
+    """Another process advanced the same handle while we were fetching."""
+
+
+@contextmanager
+def _locked(handle):
+    """Serialize syncs of `handle`; its entry is dropped once no sync needs it."""
+    with _handle_locks_guard:
+        entry = _handle_locks.get(handle)
+        if entry is None:
+            entry = _handle_locks[handle] = [threading.Lock(), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _handle_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _handle_locks[handle]
+
+
+def problem_key(problem):
+    return f"{problem.get('contestId', '')}{problem.get('index', '')}"
+
+
+def fetch_new_submissions(handle, last_id, call=cf_mirror.call):
+    """Submissions with id > last_id, newest first, paging with from/count."""
+    count = PAGE_SIZE if last_id else INITIAL_PAGE_SIZE
+    start = 1
+    seen = set()
+    fresh = []
+    while True:
+        page = call('user.status', handle=handle, **{'from': start, 'count': count})
+        for sub in page:
+            if sub['id'] <= last_id:
+                return fresh
+            # New submissions arriving between pages shift them; skip repeats.
+            if sub['id'] not in seen:
+                seen.add(sub['id'])
+                fresh.append(sub)
+        if len(page) < count:
+            return fresh
+        start += count
+
+
+def apply_submissions(doc, submissions):
+    """
+    Fold new submissions into `doc` (not mutated). Returns the MongoDB update
+    and the new solved keys; counters only count first solves.
+    """
+    known = set(doc.get('solved', []))
+    new_keys = []
+    history = []
+    inc = {}
+    last_id = doc.get('lastSubmissionId', 0)
+    # Oldest first, so the first accepted submission of a problem wins.
+    for sub in reversed(submissions):
+        last_id = max(last_id, sub['id'])
+        if sub.get('verdict') != 'OK':
+            continue
+        problem = sub.get('problem', {})
+        key = problem_key(problem)
+        if key in known:
+            continue
+        known.add(key)
+        new_keys.append(key)
+        history.append([sub.get('creationTimeSeconds', 0), problem.get('rating') or 0, problem.get('tags', [])])
+        for tag in problem.get('tags', []):
+            field = 'byTag.' + tag.replace('.', '_').replace('$', '_')
+            inc[field] = inc.get(field, 0) + 1
+        if problem.get('rating'):
+            field = f"byRating.{problem['rating']}"
+            inc[field] = inc.get(field, 0) + 1
+
+    update = {'$set': {'lastSubmissionId': last_id, 'syncedAt': datetime.now(timezone.utc)}}
+    if new_keys:
+        update['$push'] = {'solved': {'$each': new_keys}, 'history': {'$each': history}}
+    if inc:
+        update['$inc'] = inc
+    return update, new_keys
+
+
+def _as_replacement(update):
+    """Turn an incremental update built from an empty document into plain $sets."""
+    fields = dict(update['$set'])
+    for name, value in update.get('$push', {}).items():
+        fields[name] = value['$each']
+    fields.setdefault('solved', [])
+    fields.setdefault('history', [])
+    fields['byTag'], fields['byRating'] = {}, {}
+    for path, n in update.get('$inc', {}).items():
+        group, _, name = path.partition('.')
+        fields[group][name] = n
+    return {'$set': fields}
+
+
+def sync_handle(db, handle, force=False, call=cf_mirror.call):
+    """Bring the stored solved set of `handle` up to date; returns the document."""
+    key = handle.lower()
+    with _locked(key):
+        doc = db.cf_sync.find_one({'_id': key}) or {}
+        synced_at = doc.get('syncedAt')
+        if synced_at and not force:
+            if synced_at.tzinfo is None:
+                synced_at = synced_at.replace(tzinfo=timezone.utc)
+            if (datetime.now(timezone.utc) - synced_at).total_seconds() < CF_SYNC_INTERVAL:
+                return doc
+
+        last_id = doc.get('lastSubmissionId', 0)
+        if 'history' not in doc:
+            # First sync, or synced before first-solve history was stored:
+            # build every field from the full history.
+            update, new_keys = apply_submissions({}, fetch_new_submissions(handle, 0, call))
+            update = _as_replacement(update)
+        else:
+            submissions = fetch_new_submissions(handle, last_id, call)
+            update, new_keys = apply_submissions(doc, submissions)
+        update['$set']['handle'] = handle
+        if new_keys or 'etag' not in doc:
+            state = {
+                'solved': update['$set'].get('solved', doc.get('solved', []) + new_keys),
+                'lastSubmissionId': update['$set']['lastSubmissionId'],
+            }
+            update['$set']['etag'] = json_etag(state)
+
+        # Only apply on top of the state we read; another process may have synced.
+        try:
+            doc = db.cf_sync.find_one_and_update(
+                {'_id': key, 'lastSubmissionId': last_id} if doc else {'_id': key},
+                update,
+                upsert=not doc,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            doc = None
+        if doc is None:
+            raise SyncConflict(handle)
+        return doc
+
+
+def solved_view(doc):
+    return {
+        'handle': doc.get('handle'),
+        'solved': doc.get('solved', []),
+        'solvedCount': len(doc.get('solved', [])),
+        'byTag': doc.get('byTag', {}),
+        'byRating': doc.get('byRating', {}),
+        'lastSubmissionId': doc.get('lastSubmissionId', 0),
+        'syncedAt': doc['syncedAt'].isoformat() if doc.get('syncedAt') else None,
+    }
@@ -982,6 +982,40 @@ function toggleInfoBox() {
 }
 
 // ===== API Calls =====
+// Served from the server's cached mirror; codeforces.com directly if that is down.
+async function fetchProblemset() {
+    try {
+        const response = await fetch(`${API_BASE_URL}/cf/problemset`);
+        if (response.ok) return await response.json();
+    } catch (error) {
+        console.warn('Problemset mirror unavailable:', error.message);
+    }
+    const response = await fetch('https://codeforces.com/api/problemset.problems');
+    return await response.json();
+}
+
+// Incrementally synced on the server; the full user.status history only as a fallback.
+async function fetchSolvedProblems(handle) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/cf/solved?handle=${encodeURIComponent(handle)}`);
+        if (response.ok) return new Set((await response.json()).solved);
+    } catch (error) {
+        console.warn('Solved-set sync unavailable:', error.message);
+    }
+
+    const submissionsResponse = await fetch(`https://codeforces.com/api/user.status?handle=${handle}`);
+    const submissionsData = await submissionsResponse.json();
+    if (submissionsData.status !== 'OK') throw new Error('Failed to fetch submissions');
+
+    const solved = new Set();
+    submissionsData.result.forEach(sub => {
+        if (sub.verdict === 'OK') {
+            solved.add(`${sub.problem.contestId}${sub.problem.index}`);
+        }
+    });
+    return solved;
+}
+
 async function loadUserProfile() {
     const handle = document.getElementById('handleInput').value.trim();
     if (!handle) {
@@ -1004,20 +1038,9 @@ async function loadUserProfile() {
         showLoading('Loading your contest data...');
         await loadFromAPI(handle);
 
-        const submissionsResponse = await fetch(`https://codeforces.com/api/user.status?handle=${handle}`);
-        const submissionsData = await submissionsResponse.json();
-        
-        if (submissionsData.status !== 'OK') throw new Error('Failed to fetch submissions');
+        state.solvedProblems = await fetchSolvedProblems(handle);
 
-        state.solvedProblems = new Set();
-        submissionsData.result.forEach(sub => {
-            if (sub.verdict === 'OK') {
-                state.solvedProblems.add(`${sub.problem.contestId}${sub.problem.index}`);
-            }
-        });
-
-        const problemsResponse = await fetch('https://codeforces.com/api/problemset.problems');
-        const problemsData = await problemsResponse.json();
+        const problemsData = await fetchProblemset();
         
         if (problemsData.status !== 'OK') throw new Error('Failed to fetch problemset');
 
@@ -1257,11 +1280,32 @@ async function generatePresetContest(type) {
     hideLoading();
 }
 
+async function pickProblemsFromServer(config) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/contest/pick`, {
+            method: 'POST',
+            headers: getAuthHeaders(),
+            body: JSON.stringify({
+                slots: config.problems.map(p => ({ index: p.index, rating: p.rating })),
+                tags: config.tags || [],
+                solved: [...state.solvedProblems]
+            })
+        });
+        if (!response.ok) return null;
+        return (await response.json()).problems;
+    } catch (error) {
+        console.warn('Server picker unavailable:', error.message);
+        return null;
+    }
+}
+
 async function startContest(type, config) {
     const contestProblems = [];
+    // Indexed picker on the server; the local scan is the offline fallback.
+    const serverPicks = await pickProblemsFromServer(config);
     
-    for (const problemSpec of config.problems) {
-        const problem = findUnsolvedProblem(problemSpec.rating, config.tags);
+    for (const [i, problemSpec] of config.problems.entries()) {
+        const problem = (serverPicks && serverPicks[i]) || findUnsolvedProblem(problemSpec.rating, config.tags);
         if (problem) {
             contestProblems.push({
                 ...problem,
@@ -0,0 +1,282 @@
+"""
+Transport-independent halves of the contest API handlers.
+
+contest_server.py (Flask, any ContestStore) and contest_server_async.py
+(Starlette, AsyncMongoStore) only differ in how they read the request, call
+the store and send the response. Validating the input, building the write
+and shaping the response bodies happens here, once:
+
+    user, doc = save_request(body, now)       # raises ApiError -> 4xx
+    version = store.save(user, doc)           # or: await store.save(...)
+    return save_response(user, version, doc)  # the JSON body
+
+Invalid input raises ApiError; both servers answer it with its status and
+`{"error": message, ...extra}`.
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+
+from contest_storage import (
+    DIVISIONS, InvalidUpdatePath, NoActiveContest, UserNotFound, VersionConflict, _empty_rollup, compile_ops,
+    patch_etag,
+)
+
+API_VERSION = '2.1.0'
+HISTORY_MAX_BUCKETS = 10
+LEADERBOARD_DEFAULT_LIMIT = 20
+LEADERBOARD_MAX_LIMIT = 50
+
+# Store errors of a PATCH that are the client's to resolve (see patch_error()).
+PATCH_ERRORS = (UserNotFound, VersionConflict, NoActiveContest, InvalidUpdatePath)
+
+
+class ApiError(Exception):
+    """A request the API refuses: `status` and the `{"error": ...}` body."""
+
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.extra = extra
+
+    def body(self):
+        return {'error': self.message, **self.extra}
+
+
+def query_user(args):
+    user = (args.get('user') or '').strip()
+    if not user:
+        raise ApiError(400, 'User parameter required')
+    return user
+
+
+def _json_object(data):
+    if not data or not isinstance(data, dict):
+        raise ApiError(400, 'Invalid JSON body')
+    return data
+
+
+# -- /api/health --------------------------------------------------------------------
+
+def health_payload(is_healthy, probe, storage):
+    """Body for /api/health; `probe` is a HealthMonitor.snapshot() (or its fields, all None)."""
+    return {
+        'status': 'healthy' if is_healthy else 'unhealthy',
+        'database': 'connected' if is_healthy else 'disconnected',
+        'latencyMs': probe['latencyMs'],
+        'checkedAt': probe['checkedAt'],
+        'consecutiveFailures': probe['consecutiveFailures'],
+        'storage': storage,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'version': API_VERSION
+    }
+
+
+# -- /api/contest/data --------------------------------------------------------------
+
+def empty_data(user):
+    """What GET returns for a user without a saved document."""
+    return {
+        'user': user,
+        'pastContests': [],
+        'streak': {'current': 0, 'lastDate': None, 'best': 0, 'history': []},
+        'settings': {'soundEnabled': False, 'autoRefresh': True, 'showTags': False},
+        'dailyGoal': {'target': 1, 'completed': 0, 'date': None},
+        'activeContest': None,
+        'lastSyncTime': None,
+        'archivedContests': 0,
+        'historyCursor': None
+    }
+
+
+def history_view(data):
+    """Replace the stored `archive` summary with what clients need to page through it."""
+    archive = data.pop('archive', None) or {}
+    data['archivedContests'] = archive.get('count', 0)
+    data['historyCursor'] = archive.get('count') or None
+    return data
+
+
+def data_payload(user, data):
+    """(etag, body) for GET /api/contest/data from store.load(user)."""
+    if not data:
+        return None, empty_data(user)
+    etag = data.pop('etag', None)
+    return etag, history_view(data)
+
+
+def save_request(data, now):
+    """(user, doc) for store.save() from a POST body."""
+    data = _json_object(data)
+    user = (data.get('user') or data.get('lastUser', '')).strip()
+    if not user:
+        raise ApiError(400, 'User field required')
+    return user, {
+        'user': user,
+        'pastContests': data.get('pastContests', []),
+        'streak': data.get('streak', {}),
+        'settings': data.get('settings', {}),
+        'dailyGoal': data.get('dailyGoal', {}),
+        'activeContest': data.get('activeContest'),
+        'lastSyncTime': now.isoformat(),
+        'updatedAt': now
+    }
+
+
+def save_response(user, version, doc):
+    return {
+        'success': True,
+        'user': user,
+        'version': version,
+        'lastSyncTime': doc['lastSyncTime']
+    }
+
+
+def patch_request(data, now):
+    """(user, version, update, array_filters, touches_stats) for store.patch() from a PATCH body."""
+    data = _json_object(data)
+    user = (data.get('user') or '').strip()
+    if not user:
+        raise ApiError(400, 'User field required')
+
+    version = data.get('version')
+    if not isinstance(version, int) or isinstance(version, bool):
+        raise ApiError(400, 'Integer version field required')
+
+    try:
+        update, array_filters, touches_stats = compile_ops(data.get('ops'))
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+
+    update.setdefault('$set', {}).update({
+        'lastSyncTime': now.isoformat(),
+        'updatedAt': now,
+        'etag': patch_etag(user, version + 1, now)
+    })
+    update.setdefault('$inc', {})['version'] = 1
+    return user, version, update, array_filters, touches_stats
+
+
+def patch_error(e):
+    """ApiError for one of PATCH_ERRORS."""
+    if isinstance(e, UserNotFound):
+        return ApiError(404, 'No saved data for user; POST the full document first')
+    if isinstance(e, VersionConflict):
+        return ApiError(409, 'Version conflict', version=e.version)
+    if isinstance(e, NoActiveContest):
+        return ApiError(409, 'No active contest to update')
+    return ApiError(409, str(e))
+
+
+def patch_response(user, saved, now):
+    return {
+        'success': True,
+        'user': user,
+        'version': saved['version'],
+        'lastSyncTime': now.isoformat()
+    }
+
+
+# -- /api/contest/history ----------------------------------------------------------
+
+def history_request(args):
+    """(user, before, limit) from the query string."""
+    user = query_user(args)
+    try:
+        before = args.get('before')
+        before = int(before) if before else None
+        limit = max(min(int(args.get('limit', 1)), HISTORY_MAX_BUCKETS), 1)
+    except ValueError:
+        raise ApiError(400, 'before and limit must be integers') from None
+    if before is not None and before < 0:
+        raise ApiError(400, 'before must not be negative')
+    return user, before, limit
+
+
+def history_page(user, buckets):
+    """Response body for /api/contest/history; `buckets` come newest first."""
+    contests = [c for bucket in reversed(buckets) for c in bucket['contests']]
+    oldest = buckets[-1]['bucketStart'] if buckets else 0
+    return {'user': user, 'contests': contests, 'nextBefore': oldest or None}
+
+
+# -- /api/contest/stats ------------------------------------------------------------
+
+def stats_from_rollup(user, rollup, streak):
+    count = rollup.get('count', 0)
+    by_division = {}
+    for div in DIVISIONS:
+        counters = rollup.get('byDivision', {}).get(div)
+        if counters and counters.get('count'):
+            by_division[div] = {
+                'count': counters['count'],
+                'avgScore': round(counters['score'] / counters['count']),
+                'solved': counters['solved'],
+                'total': counters['total']
+            }
+
+    return {
+        'user': user,
+        'totalContests': count,
+        'totalSolved': rollup.get('solved', 0),
+        'totalProblems': rollup.get('problems', 0),
+        'averageScore': round(rollup.get('score', 0) / count, 2) if count else 0,
+        'bestScore': rollup.get('best', 0),
+        'currentStreak': streak.get('current', 0),
+        'bestStreak': streak.get('best', 0),
+        'avgSolveTime': round(rollup.get('time', 0) / count) if count else 0,
+        'byDivision': by_division
+    }
+
+
+def stats_payload(user, data):
+    """Body for /api/contest/stats from store.stats(user)."""
+    if not data:
+        return stats_from_rollup(user, _empty_rollup(), {})
+    return stats_from_rollup(user, data['stats'], data['streak'])
+
+
+# -- /api/contest/leaderboard ------------------------------------------------------
+
+def encode_cursor(entry):
+    raw = json.dumps([entry['avgScore'], entry['user']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    avg_score, user = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return avg_score, user
+
+
+def leaderboard_request(args):
+    """(limit, offset, after) for store.leaderboard() from the query string."""
+    try:
+        limit = max(min(int(args.get('limit', LEADERBOARD_DEFAULT_LIMIT)), LEADERBOARD_MAX_LIMIT), 1)
+        offset = max(int(args.get('offset', 0)), 0)
+    except ValueError:
+        raise ApiError(400, 'limit and offset must be integers') from None
+    after = None
+    cursor = args.get('cursor')
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except Exception:
+            raise ApiError(400, 'Invalid cursor') from None
+    return limit, offset, after
+
+
+def leaderboard_page(rows, limit):
+    entries = [{
+        'user': row['user'],
+        'totalContests': row['totalContests'],
+        'totalScore': row['totalScore'],
+        'totalSolved': row['totalSolved'],
+        'avgScore': int(row['avgScore']),
+        'streak': row.get('streak', 0)
+    } for row in rows]
+    return {
+        'leaderboard': entries,
+        'nextCursor': encode_cursor(entries[-1]) if len(entries) == limit else None
+    }
@@ -0,0 +1,20 @@
+"""
+Environment settings shared by contest_server.py and contest_server_async.py.
+
+Kept apart from contest_server.py so the ASGI app can read them without
+importing Flask. A local .env file is loaded first (python-dotenv only
+matters for local runs).
+"""
+
+import os
+
+if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')):
+    from dotenv import load_dotenv
+    load_dotenv()
+
+MONGODB_URI = os.getenv('MONGODB_URI')
+DB_NAME = os.getenv('DB_NAME', 'skilltree')
+
+# Seconds between background database probes, and the cap of the backoff while it is down.
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', 15))
+HEALTH_CHECK_MAX_BACKOFF = float(os.getenv('HEALTH_CHECK_MAX_BACKOFF', 120))
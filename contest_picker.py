@@ -0,0 +1,204 @@
+"""
+Contest problem picker.
+
+Replaces the per-slot linear scans of findUnsolvedProblem/selectByPopularity
+in contest/script.js. The Codeforces problemset is indexed once:
+
+  - rated problems get dense ids ordered by rating, so a rating range is a
+    contiguous id range;
+  - every tag has a posting bitmap (a Python int, bit i = problem id i);
+  - popularity percentiles are precomputed per rating, and the problems in
+    the middle 60% by solve count form the `mid` bitmap.
+
+A user's solved set is a bitmap over the same ids, so "unsolved, in
+[lo, hi], with one of these tags, mid-popularity" is a handful of integer
+AND/OR operations, and a problem is drawn by probing random ids in the range.
+"""
+
+import bisect
+import math
+import random
+import threading
+
+import cf_mirror
+
+# Same band as selectByPopularity(): skip the least and most solved 20%.
+POPULARITY_BAND = (0.2, 0.8)
+RANDOM_PROBES = 24
+
+
+class PickError(ValueError):
+    """Invalid picker request."""
+
+
+def problem_key(contest_id, index):
+    return f'{contest_id}{index}'
+
+
+def _bits_in_range(start, end):
+    return ((1 << (end - start)) - 1) << start
+
+
+def _iter_bits(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class ProblemIndex:
+    def __init__(self, problems, statistics=None):
+        solved_counts = {
+            problem_key(s.get('contestId'), s.get('index')): s.get('solvedCount', 0)
+            for s in statistics or []
+        }
+        rated = [p for p in problems if p.get('rating') and p.get('contestId')]
+        rated.sort(key=lambda p: (p['rating'], solved_counts.get(problem_key(p['contestId'], p['index']), 0)))
+
+        self.problems = []
+        self.ids = {}
+        self.tags = {}
+        self.rating_start = {}  # rating -> first id with that rating
+        self.ratings = []  # sorted distinct ratings
+        self.mid = 0
+        rating_runs = []
+
+        for pid, p in enumerate(rated):
+            key = problem_key(p['contestId'], p['index'])
+            self.ids[key] = pid
+            self.problems.append({
+                'contestId': p['contestId'],
+                'index': p['index'],
+                'name': p.get('name', ''),
+                'rating': p['rating'],
+                'tags': p.get('tags', []),
+                'solvedCount': solved_counts.get(key, 0),
+            })
+            for tag in p.get('tags', []):
+                tag = tag.lower()
+                self.tags[tag] = self.tags.get(tag, 0) | (1 << pid)
+            if p['rating'] not in self.rating_start:
+                self.rating_start[p['rating']] = pid
+                self.ratings.append(p['rating'])
+                rating_runs.append([pid, pid + 1])
+            else:
+                rating_runs[-1][1] = pid + 1
+
+        # Within a rating, ids are already ordered by solve count, so the
+        # percentile band is a contiguous slice of each run.
+        lo_frac, hi_frac = POPULARITY_BAND
+        for start, end in rating_runs:
+            size = end - start
+            if size <= 3:
+                self.mid |= _bits_in_range(start, end)
+                continue
+            lo = start + int(size * lo_frac)
+            hi = start + math.ceil(size * hi_frac)
+            self.mid |= _bits_in_range(lo, hi)
+
+    def __len__(self):
+        return len(self.problems)
+
+    def id_range(self, lo, hi):
+        """[start, end) ids of problems rated within [lo, hi]."""
+        first = bisect.bisect_left(self.ratings, lo)
+        last = bisect.bisect_right(self.ratings, hi)
+        if first >= last:
+            return 0, 0
+        start = self.rating_start[self.ratings[first]]
+        end = self.rating_start[self.ratings[last]] if last < len(self.ratings) else len(self.problems)
+        return start, end
+
+    def solved_bitmap(self, keys):
+        bits = 0
+        for key in keys:
+            pid = self.ids.get(key)
+            if pid is not None:
+                bits |= 1 << pid
+        return bits
+
+    def tag_bitmap(self, tags):
+        bits = 0
+        for tag in tags:
+            bits |= self.tags.get(tag.lower(), 0)
+        return bits
+
+    def pick(self, rating_range, tags=None, exclude=0, rng=random):
+        """
+        One problem id rated within `rating_range`, not in the `exclude`
+        bitmap, preferring the given tags and mid popularity. None if every
+        problem in the range is excluded.
+        """
+        start, end = self.id_range(*rating_range)
+        if start == end:
+            return None
+        in_range = _bits_in_range(start, end) & ~exclude
+        if not in_range:
+            return None
+        candidates = [in_range]
+        if tags:
+            # Like findUnsolvedProblem(): drop the tag filter only if nothing matches.
+            tagged = in_range & self.tag_bitmap(tags)
+            if tagged:
+                candidates = [tagged]
+        for bits in (candidates[0] & self.mid, candidates[0]):
+            if bits:
+                return _sample(bits, start, end, rng)
+        return None
+
+    def pick_contest(self, slots, tags=None, solved=0, rng=random):
+        """One problem per slot ({'rating': [lo, hi]}), never repeating a problem."""
+        exclude = solved
+        picked = []
+        for slot in slots:
+            pid = self.pick(slot['rating'], slot.get('tags', tags), exclude, rng)
+            if pid is not None:
+                exclude |= 1 << pid
+            picked.append(pid)
+        return picked
+
+
+def _sample(bits, start, end, rng):
+    # Dense sets: a few random probes hit a member in expected O(1).
+    for _ in range(RANDOM_PROBES):
+        pid = rng.randrange(start, end)
+        if bits >> pid & 1:
+            return pid
+    # Sparse sets: enumerate the members instead.
+    return rng.choice(list(_iter_bits(bits)))
+
+
+_index = None
+_index_etag = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide problem index, rebuilt when the mirrored problemset changes."""
+    global _index, _index_etag
+    entry = cf_mirror.problemset.get()
+    if entry.etag == _index_etag:
+        return _index
+    with _index_lock:
+        if entry.etag != _index_etag:
+            result = entry.result()
+            _index = ProblemIndex(result.get('problems', []), result.get('problemStatistics', []))
+            _index_etag = entry.etag
+        return _index
+
+
+def parse_slots(body):
+    slots = body.get('slots')
+    if not isinstance(slots, list) or not slots or len(slots) > 26:
+        raise PickError('slots must be a list of 1-26 entries')
+    parsed = []
+    for slot in slots:
+        rating = slot.get('rating') if isinstance(slot, dict) else None
+        if (not isinstance(rating, list) or len(rating) != 2
+                or not all(isinstance(r, int) and not isinstance(r, bool) for r in rating)):
+            raise PickError('each slot needs rating: [lo, hi]')
+        entry = {'rating': rating}
+        if isinstance(slot.get('tags'), list):
+            entry['tags'] = [str(t) for t in slot['tags']]
+        parsed.append(entry)
+    return parsed
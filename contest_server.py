@@ -3,261 +3,552 @@ Contest API Server - Production Ready for Vercel + Local
 
 Endpoints:
   GET  /api/health              -> health check with DB status
-  GET  /api/contest/data?user=  -> load user contest data
+  GET  /api/contest/data?user=  -> load user contest data (ETag / If-None-Match -> 304);
+                                   only the recent contests, plus historyCursor
+  GET  /api/contest/history?user=&before=&limit= -> archived contests, newest buckets first
   POST /api/contest/data        -> save user contest data
+  PATCH /api/contest/data       -> apply typed operations (optimistic concurrency on `version`)
   GET  /api/contest/stats?user= -> aggregated user statistics
   GET  /api/contest/leaderboard -> top performers across all users
+                                   (?limit=&offset= or ?limit=&cursor=)
+  POST /api/contest/pick        -> unsolved problems for contest slots
+  GET  /api/cf/problemset       -> cached mirror of Codeforces problemset.problems
+  GET  /api/cf/solved?handle=   -> incrementally synced solved set and counters
+  GET  /api/analysis/summary?handle=&from=&to= -> dashboard aggregates for a date range
+  GET  /api/metrics             -> Prometheus metrics (latency, sizes, Mongo commands)
+
+Storage (CONTEST_STORAGE, see contest_storage.py):
+  mongo (default, MONGODB_URI) | sqlite (CONTEST_SQLITE_PATH, WAL) | memory
+
+Caching: /api/contest/data and /api/contest/stats bodies are kept in an
+in-process LRU (doc_cache.py, CONTEST_CACHE_BYTES / CONTEST_CACHE_TTL),
+invalidated by this process's POST and PATCH.
+
+Maintenance:
+  python contest_server.py --migrate             -> create indexes (run once per deployment)
+  python contest_server.py --backfill-stats      -> build the stats rollup for existing users
+  python contest_server.py --rebuild-leaderboard -> rebuild the materialized leaderboard
+
+Async mode (needs requirements-async.txt):
+  python contest_server.py --async  (or CONTEST_SERVER_MODE=async) -> contest_server_async.py on uvicorn
 """
 
 import os
+import re
+import argparse
+import threading
+import time
 from datetime import datetime, timezone
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from pymongo import MongoClient, ASCENDING
-from dotenv import load_dotenv
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+from http_cache import MIN_COMPRESS_SIZE, choose_encoding, compress, etag_matches, negotiated_etag
+from health_monitor import HEALTHY, UNKNOWN, HealthMonitor
+from doc_cache import DocCache
+# First: loads .env before the modules below read their settings.
+from contest_config import DB_NAME, HEALTH_CHECK_INTERVAL, HEALTH_CHECK_MAX_BACKOFF, MONGODB_URI
+import cf_mirror
+import contest_api
+import contest_picker
+import contest_storage
+import metrics
+from contest_storage import CONTEST_STORAGE
+
+# Heavy dependencies are imported where they are first needed, so a cold
+# serverless instance only pays for them on the requests that use them:
+# pymongo on the first database access, NumPy (analytics) and cf_sync on
+# their endpoints.
+
+api = Blueprint('api', __name__)
+
+CF_HANDLE_RE = re.compile(r'^[A-Za-z0-9_.-]{1,24}$')
+
+# Byte budget and lifetime of the per-user response cache (0 disables it). The TTL
+# bounds staleness after writes made by other processes.
+CONTEST_CACHE_BYTES = int(os.getenv('CONTEST_CACHE_BYTES', 16 * 1024 * 1024))
+CONTEST_CACHE_TTL = float(os.getenv('CONTEST_CACHE_TTL', 30))
+
+doc_cache = DocCache(CONTEST_CACHE_BYTES, CONTEST_CACHE_TTL, name='contest')
+
+_client = None
+_db = None
+_connect_lock = threading.Lock()
+_store = None
 
-load_dotenv()
 
-app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "*"}})
+def _connect():
+    """Create the client. No network I/O: pymongo connects in the background."""
+    global _client, _db
+    from pymongo import MongoClient
+    _client = MongoClient(
+        MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=5000,
+        socketTimeoutMS=10000,
+        retryWrites=True,
+        maxPoolSize=10,
+        event_listeners=[metrics.mongo_listener()],
+    )
+    _db = _client[DB_NAME]
 
-MONGODB_URI = os.getenv('MONGODB_URI')
-DB_NAME = os.getenv('DB_NAME', 'skilltree')
 
-_client = None
-_db = None
+def _probe_db():
+    if _client is None:
+        with _connect_lock:
+            if _client is None:
+                _connect()
+    _client.admin.command('ping')
+
+
+db_health = HealthMonitor(_probe_db, interval=HEALTH_CHECK_INTERVAL, max_backoff=HEALTH_CHECK_MAX_BACKOFF)
 
 
 def get_db():
-    """Lazy database connection — connects on first request, reuses afterward."""
-    global _client, _db
-    if _db is not None:
-        return _db
+    """
+    Lazy database handle — the client is created on first use, without a
+    blocking ping; the health monitor verifies it in the background.
+    Returns None without touching the network while the circuit is open.
+    """
     if not MONGODB_URI:
         return None
-    try:
-        _client = MongoClient(
-            MONGODB_URI,
-            serverSelectionTimeoutMS=5000,
-            connectTimeoutMS=5000,
-            socketTimeoutMS=10000,
-            retryWrites=True,
-            maxPoolSize=10,
-        )
-        _client.admin.command('ping')
-        _db = _client[DB_NAME]
-        _db.contest_data.create_index([("user", ASCENDING)], unique=True)
-        return _db
-    except Exception as e:
-        print(f"[ERROR] MongoDB Connection Failed: {e}")
-        _client = None
-        _db = None
+    db_health.start()
+    if not db_health.allow_request():
         return None
+    if _db is None:
+        with _connect_lock:
+            if _db is None:
+                try:
+                    _connect()
+                except Exception as e:  # e.g. a malformed URI
+                    print(f"[ERROR] MongoDB Connection Failed: {e}")
+                    db_health.record_failure(e)
+                    return None
+    return _db
+
+
+def get_store():
+    """
+    The ContestStore selected by CONTEST_STORAGE, or None while it is
+    unavailable (MongoDB only). Codeforces sync and analytics keep using
+    get_db() directly.
+    """
+    global _store
+    if CONTEST_STORAGE == 'mongo':
+        db = get_db()
+        if db is None:
+            return None
+        if _store is None or _store.db is not db:
+            _store = contest_storage.MongoStore(db)
+        return _store
+    if _store is None:
+        with _connect_lock:
+            if _store is None:
+                _store = contest_storage.open_store(CONTEST_STORAGE)
+    return _store
+
+
+def _server_error(e):
+    """500 for a failed handler; connection errors also open the circuit."""
+    from pymongo.errors import ConnectionFailure
+    if isinstance(e, ConnectionFailure):
+        db_health.record_failure(e)
+        return jsonify({'error': 'Database unavailable'}), 503
+    return jsonify({'error': str(e)}), 500
+
+
+def _cache_keys(user):
+    return ('data', user), ('stats', user)
+
+
+def _encode_json(payload):
+    """The body jsonify() would send, for caching."""
+    with metrics.timed_serialization(_route_label(), 'json'):
+        return current_app.json.dumps(payload).encode('utf-8')
+
+
+def _json_body(body, etag=None):
+    response = Response(body, mimetype='application/json')
+    if etag:
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _load_data(store, user):
+    """Cache loader: ((etag, body), size) for /api/contest/data."""
+    etag, payload = contest_api.data_payload(user, store.load(user))
+    body = _encode_json(payload)
+    return (etag, body), len(body)
+
+
+def _load_stats(store, user):
+    body = _encode_json(contest_api.stats_payload(user, store.stats(user)))
+    return body, len(body)
+
 
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
 
-@app.route('/api/health', methods=['GET'])
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """jsonify() that records its encoding time per route."""
+
+    def response(self, *args, **kwargs):
+        with metrics.timed_serialization(_route_label(), 'json'):
+            return super().response(*args, **kwargs)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _record_request(response):
+    """Runs after compress_response, so the size is what goes on the wire."""
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe_request(
+            _route_label(), request.method, response.status_code, time.perf_counter() - started,
+            request.content_length or 0, response.content_length or 0,
+        )
+    return response
+
+
+@api.after_app_request
+def compress_response(response):
+    """Negotiated gzip/brotli for JSON bodies, and the ETag that goes with it (also on 304s)."""
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if response.status_code in (200, 304) and 'ETag' in response.headers:
+        response.headers['ETag'] = negotiated_etag(response.headers['ETag'], encoding)
+    if (response.status_code != 200
+            or response.mimetype != 'application/json'
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return response
+    with metrics.timed_serialization(_route_label(), 'compress'):
+        response.set_data(compress(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@api.route('/api/health', methods=['GET'])
 def health():
-    db = get_db()
-    is_healthy = db is not None
-    try:
-        if db is not None:
-            db.command('ping')
-    except Exception:
-        is_healthy = False
-    status_code = 200 if is_healthy else 503
-    return jsonify({
-        'status': 'healthy' if is_healthy else 'unhealthy',
-        'database': 'connected' if is_healthy else 'disconnected',
-        'timestamp': datetime.now(timezone.utc).isoformat(),
-        'version': '2.1.0'
-    }), status_code
-
-
-@app.route('/api/contest/data', methods=['GET'])
+    """Cached result of the background probe; never waits on the database."""
+    if CONTEST_STORAGE != 'mongo':
+        probe = {'latencyMs': None, 'checkedAt': None, 'consecutiveFailures': 0}
+        is_healthy = get_store() is not None
+    else:
+        if get_db() is not None and db_health.snapshot()['status'] == UNKNOWN:
+            db_health.check_now()  # first hit on a cold instance
+        probe = db_health.snapshot()
+        is_healthy = bool(MONGODB_URI) and probe['status'] == HEALTHY
+    return jsonify(contest_api.health_payload(is_healthy, probe, CONTEST_STORAGE)), 200 if is_healthy else 503
+
+
+@api.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request and MongoDB command metrics of this instance (metrics.py)."""
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@api.errorhandler(contest_api.ApiError)
+def api_error(e):
+    return jsonify(e.body()), e.status
+
+
+@api.route('/api/contest/data', methods=['GET'])
 def get_data():
-    db = get_db()
-    if db is None:
+    store = get_store()
+    if store is None:
         return jsonify({'error': 'Database unavailable'}), 503
-
-    user = request.args.get('user', '').strip()
-    if not user:
-        return jsonify({'error': 'User parameter required'}), 400
+    user = contest_api.query_user(request.args)
 
     try:
-        data = db.contest_data.find_one({'user': user})
-        if not data:
-            return jsonify({
-                'user': user,
-                'pastContests': [],
-                'streak': {'current': 0, 'lastDate': None, 'best': 0, 'history': []},
-                'settings': {'soundEnabled': False, 'autoRefresh': True, 'showTags': False},
-                'dailyGoal': {'target': 1, 'completed': 0, 'date': None},
-                'activeContest': None,
-                'lastSyncTime': None
-            })
-
-        data.pop('_id', None)
-        return jsonify(data)
+        if_none_match = request.headers.get('If-None-Match')
+        data_key = _cache_keys(user)[0]
+        cached = doc_cache.peek(data_key)
+        if cached is None and if_none_match:
+            # Cheap validator check before loading the whole history.
+            current = store.get_etag(user)
+            if current and etag_matches(if_none_match, current):
+                cached = (current, None)
+
+        etag, body = cached or doc_cache.get(data_key, lambda: _load_data(store, user))
+        if etag and etag_matches(if_none_match, etag):
+            response = Response(status=304)
+            response.headers['ETag'] = etag
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return _json_body(body, etag)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _server_error(e)
 
 
-@app.route('/api/contest/data', methods=['POST'])
+@api.route('/api/contest/data', methods=['POST'])
 def save_data():
-    db = get_db()
-    if db is None:
+    store = get_store()
+    if store is None:
         return jsonify({'error': 'Database unavailable'}), 503
+    user, doc = contest_api.save_request(request.get_json(silent=True), datetime.now(timezone.utc))
 
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'Invalid JSON body'}), 400
-
-        user = (data.get('user') or data.get('lastUser', '')).strip()
-        if not user:
-            return jsonify({'error': 'User field required'}), 400
-
-        now = datetime.now(timezone.utc)
-        doc = {
-            'user': user,
-            'pastContests': data.get('pastContests', []),
-            'streak': data.get('streak', {}),
-            'settings': data.get('settings', {}),
-            'dailyGoal': data.get('dailyGoal', {}),
-            'activeContest': data.get('activeContest'),
-            'lastSyncTime': now.isoformat(),
-            'updatedAt': now
-        }
-
-        db.contest_data.update_one({'user': user}, {'$set': doc}, upsert=True)
-
-        return jsonify({
-            'success': True,
-            'user': user,
-            'lastSyncTime': doc['lastSyncTime']
-        })
+        # The store archives old contests and adds stats/etag (contest_storage.prepare_save).
+        try:
+            version = store.save(user, doc)
+        finally:
+            # Also after a failure: part of the write may have landed.
+            doc_cache.invalidate(*_cache_keys(user))
+        return jsonify(contest_api.save_response(user, version, doc))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _server_error(e)
 
 
-@app.route('/api/contest/stats', methods=['GET'])
-def get_stats():
-    db = get_db()
-    if db is None:
+@api.route('/api/contest/data', methods=['PATCH'])
+def patch_data():
+    store = get_store()
+    if store is None:
+        return jsonify({'error': 'Database unavailable'}), 503
+    now = datetime.now(timezone.utc)
+    user, version, update, array_filters, touches_stats = contest_api.patch_request(request.get_json(silent=True), now)
+
+    try:
+        try:
+            saved = store.patch(user, version, update, array_filters, touches_stats)
+        except contest_api.PATCH_ERRORS as e:
+            return api_error(contest_api.patch_error(e))
+        finally:
+            doc_cache.invalidate(*_cache_keys(user))
+        return jsonify(contest_api.patch_response(user, saved, now))
+    except Exception as e:
+        return _server_error(e)
+
+
+@api.route('/api/contest/history', methods=['GET'])
+def get_history():
+    store = get_store()
+    if store is None:
         return jsonify({'error': 'Database unavailable'}), 503
+    user, before, limit = contest_api.history_request(request.args)
+
+    try:
+        return jsonify(contest_api.history_page(user, store.history(user, before, limit)))
+    except Exception as e:
+        return _server_error(e)
+
 
-    user = request.args.get('user', '').strip()
-    if not user:
-        return jsonify({'error': 'User parameter required'}), 400
+@api.route('/api/contest/stats', methods=['GET'])
+def get_stats():
+    store = get_store()
+    if store is None:
+        return jsonify({'error': 'Database unavailable'}), 503
+    user = contest_api.query_user(request.args)
 
     try:
-        data = db.contest_data.find_one({'user': user})
-        if not data:
-            return jsonify({
-                'user': user,
-                'totalContests': 0,
-                'totalSolved': 0,
-                'totalProblems': 0,
-                'averageScore': 0,
-                'bestScore': 0,
-                'currentStreak': 0,
-                'bestStreak': 0,
-                'avgSolveTime': 0,
-                'byDivision': {}
-            })
-
-        contests = [c for c in data.get('pastContests', []) if not c.get('inProgress')]
-        total_solved = sum(c.get('solvedCount', 0) for c in contests)
-        total_problems = sum(c.get('totalProblems', 0) for c in contests)
-        total_score = sum(c.get('totalScore', 0) for c in contests)
-        avg_score = round(total_score / len(contests), 2) if contests else 0
-        best_score = max((c.get('totalScore', 0) for c in contests), default=0)
-        avg_time = round(
-            sum(c.get('timeTaken', 0) for c in contests) / len(contests)
-        ) if contests else 0
-        streak = data.get('streak', {})
-
-        by_division = {}
-        for div in ['div1', 'div2', 'div3', 'div4', 'custom']:
-            div_contests = [c for c in contests if c.get('contestType') == div]
-            if div_contests:
-                by_division[div] = {
-                    'count': len(div_contests),
-                    'avgScore': round(sum(c.get('totalScore', 0) for c in div_contests) / len(div_contests)),
-                    'solved': sum(c.get('solvedCount', 0) for c in div_contests),
-                    'total': sum(c.get('totalProblems', 0) for c in div_contests)
-                }
-
-        return jsonify({
-            'user': user,
-            'totalContests': len(contests),
-            'totalSolved': total_solved,
-            'totalProblems': total_problems,
-            'averageScore': avg_score,
-            'bestScore': best_score,
-            'currentStreak': streak.get('current', 0),
-            'bestStreak': streak.get('best', 0),
-            'avgSolveTime': avg_time,
-            'byDivision': by_division
-        })
+        return _json_body(doc_cache.get(_cache_keys(user)[1], lambda: _load_stats(store, user)))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _server_error(e)
 
 
-@app.route('/api/contest/leaderboard', methods=['GET'])
+@api.route('/api/contest/leaderboard', methods=['GET'])
 def leaderboard():
-    db = get_db()
-    if db is None:
+    store = get_store()
+    if store is None:
         return jsonify({'error': 'Database unavailable'}), 503
+    limit, offset, after = contest_api.leaderboard_request(request.args)
 
     try:
-        limit = min(int(request.args.get('limit', 20)), 50)
-        users = list(db.contest_data.find(
-            {},
-            {'user': 1, 'pastContests': 1, 'streak': 1, '_id': 0}
-        ).limit(100))
-
-        entries = []
-        for u in users:
-            contests = [c for c in u.get('pastContests', []) if not c.get('inProgress')]
-            if not contests:
-                continue
-            total_score = sum(c.get('totalScore', 0) for c in contests)
-            total_solved = sum(c.get('solvedCount', 0) for c in contests)
-            entries.append({
-                'user': u['user'],
-                'totalContests': len(contests),
-                'totalScore': total_score,
-                'totalSolved': total_solved,
-                'avgScore': round(total_score / len(contests)) if contests else 0,
-                'streak': u.get('streak', {}).get('current', 0)
-            })
-
-        entries.sort(key=lambda x: x['avgScore'], reverse=True)
-        return jsonify({'leaderboard': entries[:limit]})
+        return jsonify(contest_api.leaderboard_page(store.leaderboard(limit, offset, after), limit))
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return _server_error(e)
 
 
-if __name__ == '__main__':
-    print("=" * 50)
-    print("Contest API Server v2.1")
-    print("=" * 50)
+@api.route('/api/contest/pick', methods=['POST'])
+def pick_problems():
+    """
+    Body: {"slots": [{"index": "A", "rating": [800, 900]}, ...],
+           "tags": ["math", ...], "solved": ["4A", "71A", ...]}
+    Returns one problem per slot (null when nothing unsolved is left).
+    """
+    body = request.get_json(silent=True) or {}
+    try:
+        slots = contest_picker.parse_slots(body)
+    except contest_picker.PickError as e:
+        return jsonify({'error': str(e)}), 400
+    tags = body.get('tags') if isinstance(body.get('tags'), list) else None
+    solved = body.get('solved') if isinstance(body.get('solved'), list) else []
+
+    try:
+        index = contest_picker.get_index()
+    except cf_mirror.MirrorUnavailable as e:
+        return jsonify({'error': f'Problemset unavailable: {e}'}), 503
+
+    picked = index.pick_contest(slots, tags, index.solved_bitmap(str(k) for k in solved))
+    return jsonify({'problems': [None if pid is None else index.problems[pid] for pid in picked]})
+
 
+@api.route('/api/cf/problemset', methods=['GET'])
+def cf_problemset():
+    """Codeforces problemset.problems, served from the local mirror (precompressed)."""
+    try:
+        entry = cf_mirror.problemset.get()
+    except cf_mirror.MirrorUnavailable as e:
+        return jsonify({'status': 'FAILED', 'comment': str(e)}), 503
+
+    if etag_matches(request.headers.get('If-None-Match'), entry.etag):
+        response = Response(status=304)
+    else:
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+        response = Response(entry.encoded(encoding), mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['ETag'] = entry.etag
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
+
+
+@api.route('/api/cf/solved', methods=['GET'])
+def cf_solved():
+    """Solved problems of a Codeforces handle, synced incrementally (?refresh=1 forces a sync)."""
+    import cf_sync
     db = get_db()
     if db is None:
-        print("[WARNING] Starting without database")
+        return jsonify({'error': 'Database unavailable'}), 503
+
+    handle = request.args.get('handle', '').strip()
+    if not CF_HANDLE_RE.match(handle):
+        return jsonify({'error': 'Valid handle parameter required'}), 400
+
+    stale = False
+    try:
+        doc = cf_sync.sync_handle(db, handle, force=request.args.get('refresh') == '1')
+    except cf_sync.SyncConflict:
+        # Another instance synced this handle at the same time; its result is current.
+        doc = db.cf_sync.find_one({'_id': handle.lower()})
+    except RuntimeError as e:
+        doc = db.cf_sync.find_one({'_id': handle.lower()})
+        if doc is None:
+            return jsonify({'error': str(e)}), 502
+        stale = True
+
+    etag = doc.get('etag')
+    if not stale and etag_matches(request.headers.get('If-None-Match'), etag):
+        response = Response(status=304)
+    else:
+        response = jsonify({**cf_sync.solved_view(doc), 'stale': stale})
+    if etag:
+        response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api.route('/api/analysis/summary', methods=['GET'])
+def analysis_summary():
+    """Problems per day, daily scores, topics and rating buckets for ?from=&to= (YYYY-MM-DD)."""
+    import analytics
+    import cf_sync
+    db = get_db()
+    if db is None:
+        return jsonify({'error': 'Database unavailable'}), 503
+
+    handle = request.args.get('handle', '').strip()
+    if not CF_HANDLE_RE.match(handle):
+        return jsonify({'error': 'Valid handle parameter required'}), 400
+    try:
+        start = analytics.parse_day(request.args.get('from'))
+        end = analytics.parse_day(request.args.get('to'))
+        analytics.check_range(start, end)
+    except analytics.AnalyticsQueryError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        doc = cf_sync.sync_handle(db, handle)
+    except cf_sync.SyncConflict:
+        doc = db.cf_sync.find_one({'_id': handle.lower()})
+    except RuntimeError as e:
+        doc = db.cf_sync.find_one({'_id': handle.lower()})
+        if doc is None:
+            return jsonify({'error': str(e)}), 502
+
+    summary = analytics.analytics_for(doc).summary(start, end)
+    return jsonify({'handle': doc.get('handle', handle), **summary})
+
+
+def create_app():
+    """The Flask app used by Vercel (`app` below), `python contest_server.py` and simple_server.py."""
+    from flask_cors import CORS
+    flask_app = Flask(__name__)
+    flask_app.json = TimedJSONProvider(flask_app)
+    CORS(flask_app, resources={r"/api/*": {"origins": "*"}}, expose_headers=['ETag'])
+    # Registered before the blueprint so it runs after compress_response.
+    flask_app.before_request(_start_timer)
+    flask_app.after_request(_record_request)
+    flask_app.register_blueprint(api)
+    return flask_app
+
+
+app = create_app()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Contest API Server')
+    parser.add_argument('--migrate', action='store_true',
+                        help='create the database indexes (idempotent) and exit')
+    parser.add_argument('--backfill-stats', action='store_true',
+                        help='compute the stats rollup for existing users and exit')
+    parser.add_argument('--rebuild-leaderboard', action='store_true',
+                        help='rebuild the materialized leaderboard and exit')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        default=os.getenv('CONTEST_SERVER_MODE', 'sync') == 'async',
+                        help='serve the asyncio app (contest_server_async.py) with uvicorn')
+    args = parser.parse_args()
+
+    if args.migrate or args.backfill_stats or args.rebuild_leaderboard:
+        store = get_store()
+        if store is None:
+            raise SystemExit("[ERROR] Database unavailable")
+        if args.migrate:
+            for name in store.migrate():
+                print(f"[OK] {store.name}: {name}")
+        if args.backfill_stats:
+            print(f"[OK] Backfilled stats for {store.backfill_stats()} user(s)")
+        if args.rebuild_leaderboard:
+            print(f"[OK] Leaderboard rebuilt with {store.rebuild_leaderboard()} user(s)")
+        raise SystemExit(0)
 
     port = int(os.getenv('PORT', 5000))
     host = os.getenv('HOST', '0.0.0.0')
 
+    if args.use_async:
+        import uvicorn
+        print(f"Contest API Server v2.1 (async) on http://{host}:{port}")
+        uvicorn.run('contest_server_async:app', host=host, port=port, log_level='warning')
+        raise SystemExit(0)
+
+    print("=" * 50)
+    print(f"Contest API Server v2.1 (storage: {CONTEST_STORAGE})")
+    print("=" * 50)
+
+    if get_store() is None:
+        print("[WARNING] Starting without database")
+
     print(f"\nServer: http://{host}:{port}")
     print("\nEndpoints:")
     print("  GET  /api/health")
     print("  GET  /api/contest/data?user=<handle>")
     print("  POST /api/contest/data")
+    print("  GET  /api/contest/history?user=<handle>&before=")
     print("  GET  /api/contest/stats?user=<handle>")
-    print("  GET  /api/contest/leaderboard")
+    print("  GET  /api/contest/leaderboard?limit=&offset=|cursor=")
+    print("  POST /api/contest/pick")
+    print("  GET  /api/cf/problemset")
+    print("  GET  /api/cf/solved?handle=<handle>")
+    print("  GET  /api/analysis/summary?handle=<handle>&from=&to=")
+    print("  GET  /api/metrics")
     print("=" * 50)
 
     app.run(host=host, port=port, debug=False)
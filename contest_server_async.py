@@ -0,0 +1,321 @@
+"""
+Contest API Server - asyncio variant (ASGI: Starlette + Motor)
+
+Same endpoints and response shapes as contest_server.py, but every handler
+awaits a non-blocking Mongo client instead of pinning a worker thread for
+each round trip, so one process can serve hundreds of concurrent clients.
+MongoDB only: CONTEST_STORAGE (contest_storage.py) applies to contest_server.py.
+Request parsing and response bodies come from contest_api.py and the Mongo
+operations from contest_storage.AsyncMongoStore, so only the transport differs.
+
+  GET  /api/health
+  GET  /api/contest/data?user=     (ETag / If-None-Match -> 304)
+  GET  /api/contest/history?user=&before=&limit=
+  POST /api/contest/data
+  PATCH /api/contest/data
+  GET  /api/contest/stats?user=
+  GET  /api/contest/leaderboard    (?limit=&offset= or ?limit=&cursor=)
+  GET  /api/metrics                (Prometheus, see metrics.py)
+
+Run with:
+  python contest_server.py --async      (or CONTEST_SERVER_MODE=async)
+  uvicorn contest_server_async:app
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import ConnectionFailure
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Route
+
+from contest_config import DB_NAME, HEALTH_CHECK_INTERVAL, HEALTH_CHECK_MAX_BACKOFF, MONGODB_URI
+import contest_api
+from contest_storage import AsyncMongoStore
+from health_monitor import HEALTHY, UNKNOWN, AsyncHealthMonitor
+from http_cache import MIN_COMPRESS_SIZE, choose_encoding, compress, etag_matches, negotiated_etag
+import metrics
+
+MAX_POOL_SIZE = 100
+
+_client = None
+_db = None
+_store = None
+
+
+def _connect():
+    """Create the client. No network I/O: Motor connects on the first operation."""
+    global _client, _db
+    _client = AsyncIOMotorClient(
+        MONGODB_URI,
+        serverSelectionTimeoutMS=5000,
+        connectTimeoutMS=5000,
+        socketTimeoutMS=10000,
+        retryWrites=True,
+        maxPoolSize=MAX_POOL_SIZE,
+        event_listeners=[metrics.mongo_listener()],
+    )
+    # Indexes come from `python contest_server.py --migrate`.
+    _db = _client[DB_NAME]
+
+
+async def _probe_db():
+    if _client is None:
+        _connect()
+    await _client.admin.command('ping')
+
+
+db_health = AsyncHealthMonitor(_probe_db, interval=HEALTH_CHECK_INTERVAL, max_backoff=HEALTH_CHECK_MAX_BACKOFF)
+
+
+def get_db():
+    """
+    Same policy as contest_server.get_db(): the client is created on first
+    use without a ping, db_health probes it in the background, and None is
+    returned without touching the network while the circuit is open.
+    """
+    if not MONGODB_URI:
+        return None
+    db_health.start()
+    if not db_health.allow_request():
+        return None
+    if _db is None:
+        try:
+            _connect()
+        except Exception as e:  # e.g. a malformed URI
+            print(f"[ERROR] MongoDB Connection Failed: {e}")
+            db_health.record_failure(e)
+            return None
+    return _db
+
+
+async def get_store():
+    """The AsyncMongoStore over get_db(), or None without a database."""
+    global _store
+    db = get_db()
+    if db is None:
+        return None
+    if _store is None or _store.db is not db:
+        _store = AsyncMongoStore(db)
+    return _store
+
+
+def _json_default(value):
+    # Same encoding as Flask's jsonify: datetimes as HTTP dates (UTC).
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+    return str(value)
+
+
+def json_response(request, payload, status=200, headers=None):
+    """JSON body with the same gzip/brotli negotiation as the Flask app."""
+    route = request.url.path
+    with metrics.timed_serialization(route, 'json'):
+        body = json.dumps(payload, separators=(',', ':'), sort_keys=True, default=_json_default).encode('utf-8')
+    response = Response(body, status_code=status, media_type='application/json', headers=headers)
+    if status != 200:
+        return response
+    response.headers['Vary'] = 'Accept-Encoding'
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = negotiated_etag(response.headers['ETag'], encoding)
+    if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+        return response
+    with metrics.timed_serialization(route, 'compress'):
+        compressed = compress(body, encoding)
+    response.body = compressed
+    response.headers['Content-Length'] = str(len(compressed))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def error(request, message, status, **extra):
+    return json_response(request, {'error': message, **extra}, status)
+
+
+def server_error(request, e):
+    """500 for a failed handler; connection errors also open the circuit (as contest_server._server_error)."""
+    if isinstance(e, ConnectionFailure):
+        db_health.record_failure(e)
+        return error(request, 'Database unavailable', 503)
+    return error(request, str(e), 500)
+
+
+async def api_error(request, e):
+    return error(request, e.message, e.status, **e.extra)
+
+
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+class MetricsMiddleware:
+    """Per-route latency, status and sizes for metrics.py (plain ASGI, sees the compressed body)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        response = {'status': 500, 'bytes': 0}
+
+        async def send_and_count(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['bytes'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_count)
+        finally:
+            headers = dict(scope.get('headers') or [])
+            try:
+                request_bytes = int(headers.get(b'content-length', 0))
+            except ValueError:
+                request_bytes = 0
+            route = scope['path'] if scope['path'] in ROUTE_PATHS else 'unmatched'
+            metrics.observe_request(route, scope['method'], response['status'],
+                                    time.perf_counter() - started, request_bytes, response['bytes'])
+
+
+# -- endpoints ---------------------------------------------------------------
+
+async def prometheus_metrics(request):
+    if not metrics.authorized(request.headers.get('Authorization')):
+        return error(request, 'Unauthorized', 401)
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+async def health(request):
+    """Cached result of the background probe, as in contest_server.health()."""
+    if get_db() is not None and db_health.snapshot()['status'] == UNKNOWN:
+        await db_health.check_now()  # first hit after startup
+    probe = db_health.snapshot()
+    is_healthy = bool(MONGODB_URI) and probe['status'] == HEALTHY
+    return json_response(request, contest_api.health_payload(is_healthy, probe, 'mongo'),
+                         200 if is_healthy else 503)
+
+
+async def get_data(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    user = contest_api.query_user(request.query_params)
+
+    try:
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            current = await store.get_etag(user)
+            if current and etag_matches(if_none_match, current):
+                etag = negotiated_etag(current, choose_encoding(request.headers.get('Accept-Encoding')))
+                return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': 'private, no-cache'})
+
+        etag, payload = contest_api.data_payload(user, await store.load(user))
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'} if etag else None
+        return json_response(request, payload, headers=headers)
+    except Exception as e:
+        return server_error(request, e)
+
+
+async def save_data(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    user, doc = contest_api.save_request(await read_json(request), datetime.now(timezone.utc))
+
+    try:
+        version = await store.save(user, doc)
+        return json_response(request, contest_api.save_response(user, version, doc))
+    except Exception as e:
+        return server_error(request, e)
+
+
+async def patch_data(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    now = datetime.now(timezone.utc)
+    user, version, update, array_filters, touches_stats = contest_api.patch_request(await read_json(request), now)
+
+    try:
+        try:
+            saved = await store.patch(user, version, update, array_filters, touches_stats)
+        except contest_api.PATCH_ERRORS as e:
+            return await api_error(request, contest_api.patch_error(e))
+        return json_response(request, contest_api.patch_response(user, saved, now))
+    except Exception as e:
+        return server_error(request, e)
+
+
+async def get_history(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    user, before, limit = contest_api.history_request(request.query_params)
+
+    try:
+        return json_response(request, contest_api.history_page(user, await store.history(user, before, limit)))
+    except Exception as e:
+        return server_error(request, e)
+
+
+async def get_stats(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    user = contest_api.query_user(request.query_params)
+
+    try:
+        return json_response(request, contest_api.stats_payload(user, await store.stats(user)))
+    except Exception as e:
+        return server_error(request, e)
+
+
+async def leaderboard(request):
+    store = await get_store()
+    if store is None:
+        return error(request, 'Database unavailable', 503)
+    limit, offset, after = contest_api.leaderboard_request(request.query_params)
+
+    try:
+        return json_response(request, contest_api.leaderboard_page(await store.leaderboard(limit, offset, after), limit))
+    except Exception as e:
+        return server_error(request, e)
+
+
+ROUTES = [
+    Route('/api/health', health, methods=['GET']),
+    Route('/api/metrics', prometheus_metrics, methods=['GET']),
+    Route('/api/contest/data', get_data, methods=['GET']),
+    Route('/api/contest/data', save_data, methods=['POST']),
+    Route('/api/contest/data', patch_data, methods=['PATCH']),
+    Route('/api/contest/history', get_history, methods=['GET']),
+    Route('/api/contest/stats', get_stats, methods=['GET']),
+    Route('/api/contest/leaderboard', leaderboard, methods=['GET']),
+]
+ROUTE_PATHS = {route.path for route in ROUTES}
+
+app = Starlette(
+    routes=ROUTES,
+    exception_handlers={contest_api.ApiError: api_error},
+    middleware=[
+        Middleware(MetricsMiddleware),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                   allow_headers=['*'], expose_headers=['ETag']),
+    ],
+)
@@ -0,0 +1,1214 @@
+"""
+Storage backends for the contest API.
+
+contest_server.py talks to a ContestStore instead of pymongo collections,
+so the same API runs against
+
+  mongo   - MongoDB (MONGODB_URI), the production backend and the default
+  sqlite  - a single SQLite file in WAL mode (CONTEST_SQLITE_PATH)
+  memory  - a process-local dict, for load tests and local development
+
+selected with CONTEST_STORAGE. contest_server_async.py uses AsyncMongoStore,
+the same MongoDB operations (_MongoOps) awaited over Motor. Every backend
+keeps the same user document (the POST body plus the `stats` rollup, `etag`
+and `version`) and updates the user's leaderboard_entry() row on each write. MongoDB additionally
+rebuilds the materialized leaderboard from pastContests every
+LEADERBOARD_MAX_AGE seconds, to pick up documents written by other clients.
+
+PATCH bodies are compiled once by compile_ops() into a MongoDB update
+document; the sqlite and memory backends apply that same document with
+apply_update(), so the operations behave identically everywhere.
+
+`etag` (the ETag of GET /api/contest/data) is a content hash of the stored
+document after a POST, but a version token after a PATCH (patch_etag()):
+hashing the patched document would mean reading it back on every PATCH.
+
+History archive: `pastContests` only keeps the most recent contests. Once
+more than RECENT_CONTESTS + HISTORY_BUCKET_SIZE are live, the oldest ones
+move in whole buckets of HISTORY_BUCKET_SIZE into `contest_history`
+({user, bucketStart, contests}, bucketStart = sequence number of the
+bucket's first contest). The document keeps an `archive` summary (count,
+highest archived contestId, rollup of the archived contests), so `stats`
+and the leaderboard still cover every contest, and a client that POSTs
+its full local history does not archive the same contests twice.
+"""
+
+import asyncio
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from http_cache import json_etag
+
+STORAGE_BACKENDS = ['mongo', 'sqlite', 'memory']
+CONTEST_STORAGE = os.getenv('CONTEST_STORAGE', 'mongo').strip().lower()
+CONTEST_SQLITE_PATH = os.getenv('CONTEST_SQLITE_PATH', 'contest_data.sqlite3')
+
+# Contests kept in the user document; older ones are archived in buckets.
+RECENT_CONTESTS = int(os.getenv('CONTEST_RECENT_WINDOW', 50))
+HISTORY_BUCKET_SIZE = int(os.getenv('CONTEST_HISTORY_BUCKET', 50))
+
+# Seconds before the materialized MongoDB leaderboard is rebuilt in the background.
+LEADERBOARD_MAX_AGE = int(os.getenv('LEADERBOARD_MAX_AGE', 300))
+# Documents read per round trip by backfill_stats().
+BACKFILL_BATCH = 100
+
+DIVISIONS = ['div1', 'div2', 'div3', 'div4', 'custom']
+
+# Active-contest problem fields a client may change through PATCH.
+ACTIVE_PROBLEMS = 'activeContest.currentContest.problems'
+PROBLEM_FIELDS = ['status', 'attempts', 'solvedAt', 'currentScore']
+STREAK_HISTORY_LIMIT = 365
+
+# BadValue, TypeMismatch, PathNotViable: what MongoDB reports for paths apply_update() rejects.
+MONGO_PATH_ERRORS = (2, 14, 28)
+
+
+def _indexes():
+    """Indexes created by `python contest_server.py --migrate`, not at request time."""
+    from pymongo import ASCENDING, DESCENDING
+
+    return {
+        'contest_data': [([('user', ASCENDING)], {'unique': True})],
+        'leaderboard': [([('avgScore', DESCENDING), ('_id', ASCENDING)], {})],
+        'contest_history': [([('user', ASCENDING), ('bucketStart', DESCENDING)], {'unique': True})],
+    }
+
+
+class StorageError(RuntimeError):
+    """A write the backend could not apply."""
+
+
+class UserNotFound(StorageError):
+    """PATCH for a user without a saved document."""
+
+
+class NoActiveContest(StorageError):
+    """setProblemStatus for a user whose document has no active contest problems."""
+
+
+class InvalidUpdatePath(StorageError):
+    """An update path the stored document's shape does not allow; MongoDB rejects the same write."""
+
+
+class VersionConflict(StorageError):
+    """PATCH based on a stale `version`; `version` is the current one."""
+
+    def __init__(self, version):
+        super().__init__(f'Version conflict (current version {version})')
+        self.version = version
+
+
+# -- stats rollup ---------------------------------------------------------------
+
+def _empty_rollup():
+    return {
+        'count': 0,
+        'solved': 0,
+        'problems': 0,
+        'score': 0,
+        'time': 0,
+        'best': 0,
+        'byDivision': {}
+    }
+
+
+def _add_to_rollup(rollup, contest):
+    """Fold one finished contest into a stats rollup (in place)."""
+    score = contest.get('totalScore', 0)
+    solved = contest.get('solvedCount', 0)
+    problems = contest.get('totalProblems', 0)
+    rollup['count'] += 1
+    rollup['solved'] += solved
+    rollup['problems'] += problems
+    rollup['score'] += score
+    rollup['time'] += contest.get('timeTaken', 0)
+    rollup['best'] = max(rollup['best'], score)
+
+    div = contest.get('contestType')
+    if div in DIVISIONS:
+        counters = rollup['byDivision'].setdefault(
+            div, {'count': 0, 'score': 0, 'solved': 0, 'total': 0}
+        )
+        counters['count'] += 1
+        counters['score'] += score
+        counters['solved'] += solved
+        counters['total'] += problems
+
+
+def build_rollup(contests):
+    """
+    Compact per-user counters stored under `stats` on every save, so the
+    stats endpoint never has to load `pastContests`.
+    """
+    rollup = _empty_rollup()
+    for c in contests:
+        if not c.get('inProgress'):
+            _add_to_rollup(rollup, c)
+    return rollup
+
+
+def leaderboard_entry(user, rollup, streak):
+    """Leaderboard row for a user, or None if the user has no finished contests."""
+    count = rollup.get('count', 0)
+    if not count:
+        return None
+    return {
+        '_id': user,
+        'user': user,
+        'totalContests': count,
+        'totalScore': rollup.get('score', 0),
+        'totalSolved': rollup.get('solved', 0),
+        'avgScore': round(rollup.get('score', 0) / count),
+        'streak': streak.get('current', 0)
+    }
+
+
+def merge_rollups(a, b):
+    """Sum of two stats rollups (a new dict)."""
+    merged = _empty_rollup()
+    for rollup in (a, b):
+        for field in ['count', 'solved', 'problems', 'score', 'time']:
+            merged[field] += rollup.get(field, 0)
+        merged['best'] = max(merged['best'], rollup.get('best', 0))
+        for div, counters in rollup.get('byDivision', {}).items():
+            target = merged['byDivision'].setdefault(div, {'count': 0, 'score': 0, 'solved': 0, 'total': 0})
+            for field, value in counters.items():
+                target[field] = target.get(field, 0) + value
+    return merged
+
+
+# -- history archive ----------------------------------------------------------------
+
+def empty_archive():
+    return {'count': 0, 'maxId': None, 'stats': _empty_rollup()}
+
+
+def _contest_id(contest):
+    value = contest.get('contestId')
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def archive_overflow(user, contests, archive):
+    """
+    Split whole buckets of the oldest contests off `contests` once more than
+    RECENT_CONTESTS + HISTORY_BUCKET_SIZE are live. Returns
+    (buckets, live contests, archive summary); nothing moves below the threshold.
+    """
+    overflow = len(contests) - RECENT_CONTESTS
+    if overflow < HISTORY_BUCKET_SIZE:
+        return [], contests, archive
+    moved_count = overflow - overflow % HISTORY_BUCKET_SIZE
+    moved = contests[:moved_count]
+    buckets = [
+        {'user': user, 'bucketStart': archive['count'] + i, 'contests': moved[i:i + HISTORY_BUCKET_SIZE]}
+        for i in range(0, moved_count, HISTORY_BUCKET_SIZE)
+    ]
+    ids = [i for i in map(_contest_id, moved) if i is not None]
+    if archive['maxId'] is not None:
+        ids.append(archive['maxId'])
+    archive = {
+        'count': archive['count'] + moved_count,
+        'maxId': max(ids) if ids else None,
+        'stats': merge_rollups(archive['stats'], build_rollup(moved)),
+    }
+    return buckets, contests[moved_count:], archive
+
+
+def patch_etag(user, version, at):
+    """
+    `etag` for the document a PATCH turns into `version` at time `at`. A
+    version token, not a content hash: every write bumps `version`, and `at`
+    keeps the token unique should the document ever be recreated.
+    """
+    return json_etag({'user': user, 'version': version, 'at': at})
+
+
+def prepare_save(user, doc, archive):
+    """
+    POST body -> (document to store, buckets to archive). Contests that are
+    already archived (contestId up to the archive's maxId) are dropped, the
+    overflow is archived, and `stats`/`etag` are computed for the result.
+    """
+    archive = archive or empty_archive()
+    live = doc.get('pastContests', [])
+    if archive['maxId'] is not None:
+        live = [c for c in live if _contest_id(c) is None or _contest_id(c) > archive['maxId']]
+    buckets, live, archive = archive_overflow(user, live, archive)
+    stored = {**doc, 'pastContests': live, 'archive': archive}
+    stored['stats'] = rollup_of(stored)
+    stored['etag'] = json_etag(stored)
+    return stored, buckets
+
+
+def rollup_of(doc):
+    """Stats rollup of a whole document: archived contests plus the live ones."""
+    archive = doc.get('archive') or empty_archive()
+    return merge_rollups(archive['stats'], build_rollup(doc.get('pastContests', [])))
+
+
+def compact_after_append(user, doc):
+    """Archive the overflow of a document PATCHed with appendContest (in place); returns the buckets."""
+    buckets, live, archive = archive_overflow(user, doc.get('pastContests') or [], doc.get('archive') or empty_archive())
+    if buckets:
+        doc['pastContests'] = live
+        doc['archive'] = archive
+    return buckets
+
+
+# Recomputes every row from pastContests (plus the archived rollup) inside
+# Mongo, so documents written by other clients (or before the rollup
+# existed) are picked up as well.
+LEADERBOARD_PIPELINE = [
+    {'$match': {'user': {'$type': 'string'}}},
+    {'$project': {
+        '_id': 0,
+        'user': 1,
+        'streak': {'$ifNull': ['$streak.current', 0]},
+        'archived': {'$ifNull': ['$archive.stats', {}]},
+        'finished': {'$filter': {
+            'input': {'$ifNull': ['$pastContests', []]},
+            'as': 'c',
+            'cond': {'$ne': ['$$c.inProgress', True]}
+        }}
+    }},
+    {'$project': {
+        '_id': '$user',
+        'user': 1,
+        'streak': 1,
+        'totalContests': {'$add': [{'$size': '$finished'}, {'$ifNull': ['$archived.count', 0]}]},
+        'totalScore': {'$add': [{'$sum': '$finished.totalScore'}, {'$ifNull': ['$archived.score', 0]}]},
+        'totalSolved': {'$add': [{'$sum': '$finished.solvedCount'}, {'$ifNull': ['$archived.solved', 0]}]}
+    }},
+    {'$match': {'totalContests': {'$gt': 0}}},
+    {'$addFields': {
+        'avgScore': {'$round': [{'$divide': ['$totalScore', '$totalContests']}, 0]}
+    }},
+    {'$out': 'leaderboard'}
+]
+
+
+# -- PATCH operations -------------------------------------------------------------
+
+def compile_ops(ops):
+    """
+    Translate PATCH operations into a single Mongo update so the write is
+    proportional to the change rather than to the whole document:
+
+      {"op": "appendContest", "contest": {...}}
+      {"op": "setProblemStatus", "index": "B", "status": "solved", "attempts": 2, ...}
+      {"op": "bumpStreak", "date": "Mon Feb 17 2025", "current": 4, "best": 9}
+
+    Returns (update, array_filters, touches_stats); array filters are only
+    present when the update targets ACTIVE_PROBLEMS. Raises ValueError on bad input.
+    """
+    if not isinstance(ops, list) or not ops:
+        raise ValueError('ops must be a non-empty list')
+
+    push_contests = []
+    sets = {}
+    incs = {}
+    maxes = {}
+    history = []
+    array_filters = []
+    filter_names = {}  # problem index -> its array filter; one per index, or Mongo reports a conflict
+    rollup = _empty_rollup()
+
+    for op in ops:
+        kind = op.get('op') if isinstance(op, dict) else None
+        if kind == 'appendContest':
+            contest = op.get('contest')
+            if not isinstance(contest, dict):
+                raise ValueError('appendContest requires a contest object')
+            push_contests.append(contest)
+            if not contest.get('inProgress'):
+                _add_to_rollup(rollup, contest)
+        elif kind == 'setProblemStatus':
+            index = op.get('index')
+            if not isinstance(index, str) or not index:
+                raise ValueError('setProblemStatus requires a problem index')
+            changed = [f for f in PROBLEM_FIELDS if f in op]
+            if not changed:
+                raise ValueError('setProblemStatus requires at least one of ' + ', '.join(PROBLEM_FIELDS))
+            name = filter_names.get(index)
+            if name is None:
+                name = filter_names[index] = f'p{len(array_filters)}'
+                array_filters.append({f'{name}.index': index})
+            for field in changed:
+                # A later op on the same problem and field wins, as if applied in order.
+                sets[f'{ACTIVE_PROBLEMS}.$[{name}].{field}'] = op[field]
+        elif kind == 'bumpStreak':
+            if 'current' in op:
+                sets['streak.current'] = op['current']
+            if 'best' in op:
+                maxes['streak.best'] = op['best']
+            if op.get('date'):
+                sets['streak.lastDate'] = op['date']
+                history.append(op['date'])
+        else:
+            raise ValueError(f'Unknown op: {kind!r}')
+
+    update = {}
+    if push_contests:
+        update['$push'] = {'pastContests': {'$each': push_contests}}
+    if history:
+        update.setdefault('$push', {})['streak.history'] = {
+            '$each': history, '$slice': -STREAK_HISTORY_LIMIT
+        }
+
+    touches_stats = rollup['count'] > 0
+    if touches_stats:
+        for field in ['count', 'solved', 'problems', 'score', 'time']:
+            incs[f'stats.{field}'] = rollup[field]
+        for div, counters in rollup['byDivision'].items():
+            for field, value in counters.items():
+                incs[f'stats.byDivision.{div}.{field}'] = value
+        maxes['stats.best'] = rollup['best']
+
+    if sets:
+        update['$set'] = sets
+    if incs:
+        update['$inc'] = incs
+    if maxes:
+        update['$max'] = maxes
+    return update, array_filters, touches_stats
+
+
+def _targets(node, parts, filters, done=''):
+    """
+    (container, key) pairs a dotted update path refers to; `$[name]` matches
+    array elements. Raises InvalidUpdatePath where MongoDB rejects the path.
+    """
+    head, rest = parts[0], parts[1:]
+    if not rest:
+        yield node, head
+        return
+    here = f'{done}.{head}' if done else head
+    if head.startswith('$[') and head.endswith(']'):
+        condition = filters.get(head[2:-1], {})
+        for item in node:
+            if isinstance(item, dict) and all(item.get(k) == v for k, v in condition.items()):
+                yield from _targets(item, rest, filters, here)
+        return
+    child = node.get(head)
+    if rest[0].startswith('$['):
+        if child is None:
+            raise InvalidUpdatePath(f"The path '{here}' must exist in the document in order to apply array updates.")
+        if not isinstance(child, list):
+            raise InvalidUpdatePath(f"Cannot apply array updates to non-array element {here}")
+    elif child is None:
+        child = node[head] = {}
+    elif not isinstance(child, dict):
+        raise InvalidUpdatePath(f"Cannot create field '{rest[0]}' in element {{{head}: {child!r}}}")
+    yield from _targets(child, rest, filters, here)
+
+
+def apply_update(doc, update, array_filters=None):
+    """
+    Apply the subset of MongoDB update operators that compile_ops() and the
+    save path produce ($set, $inc, $max, $push with $each/$slice, and
+    `$[name]` array filters on equality) to `doc`, in place. Paths MongoDB
+    would reject raise InvalidUpdatePath; `doc` may then be half-updated.
+    """
+    filters = {}
+    for spec in array_filters or []:
+        for path, value in spec.items():
+            name, _, field = path.partition('.')
+            filters.setdefault(name, {})[field] = value
+
+    for path, value in update.get('$set', {}).items():
+        for node, key in _targets(doc, path.split('.'), filters):
+            node[key] = value
+    for path, value in update.get('$inc', {}).items():
+        for node, key in _targets(doc, path.split('.'), filters):
+            current = node.get(key)
+            if current is not None and (not isinstance(current, (int, float)) or isinstance(current, bool)):
+                raise InvalidUpdatePath(f"Cannot apply $inc to a value of non-numeric type at '{path}'")
+            node[key] = (current or 0) + value
+    for path, value in update.get('$max', {}).items():
+        for node, key in _targets(doc, path.split('.'), filters):
+            if node.get(key) is None or value > node[key]:
+                node[key] = value
+    for path, spec in update.get('$push', {}).items():
+        items = spec['$each'] if isinstance(spec, dict) and '$each' in spec else [spec]
+        for node, key in _targets(doc, path.split('.'), filters):
+            current = node.get(key)
+            if current is not None and not isinstance(current, list):
+                raise InvalidUpdatePath(f"The field '{path}' must be an array")
+            values = list(current or []) + list(items)
+            limit = spec.get('$slice') if isinstance(spec, dict) else None
+            if limit is not None:
+                values = values[limit:] if limit < 0 else values[:limit]
+            node[key] = values
+    return doc
+
+
+def _has_active_problems(doc):
+    node = doc
+    for part in ACTIVE_PROBLEMS.split('.'):
+        node = node.get(part) if isinstance(node, dict) else None
+    return isinstance(node, list)
+
+
+def _apply_patch(user, doc, version, update, array_filters, touches_stats):
+    """
+    Shared PATCH path of the Python backends. Returns (leaderboard row
+    changed, buckets to archive); the archiving happens in the same write.
+    """
+    current = doc.get('version') or 0
+    if current != version:
+        raise VersionConflict(current)
+    if array_filters and not _has_active_problems(doc):
+        raise NoActiveContest(user)
+    if touches_stats and doc.get('stats') is None:
+        doc['stats'] = rollup_of(doc)
+    apply_update(doc, update, array_filters)
+    buckets = compact_after_append(user, doc) if 'pastContests' in update.get('$push', {}) else []
+    return touches_stats or 'streak.current' in update.get('$set', {}), buckets
+
+
+def _stats_view(doc):
+    return {'stats': doc.get('stats'), 'streak': doc.get('streak') or {}}
+
+
+# -- backends -----------------------------------------------------------------------
+
+class ContestStore:
+    """
+    What the contest API needs from storage. Documents are plain dicts
+    shaped like the MongoDB ones, without `_id`.
+    """
+
+    name = None
+
+    def get_etag(self, user):
+        """Current ETag of the user's document (None if missing) without loading it."""
+        raise NotImplementedError
+
+    def load(self, user):
+        """The user's document without `stats`, or None."""
+        raise NotImplementedError
+
+    def save(self, user, doc):
+        """
+        Replace the document with the fields of a POST body; prepare_save()
+        archives the overflow and adds stats/etag. Returns the new version.
+        """
+        raise NotImplementedError
+
+    def patch(self, user, version, update, array_filters, touches_stats):
+        """
+        Apply a compile_ops() update on top of `version`, archiving the
+        overflow when contests were appended. Returns {'version', 'stats',
+        'streak'} after the write; raises UserNotFound, VersionConflict,
+        NoActiveContest (array filters but no active contest problems) or
+        InvalidUpdatePath.
+        """
+        raise NotImplementedError
+
+    def history(self, user, before=None, limit=1):
+        """Up to `limit` archived buckets with bucketStart < before (any if None), newest first."""
+        raise NotImplementedError
+
+    def stats(self, user):
+        """{'stats': rollup, 'streak': {...}} for the stats endpoint, or None."""
+        raise NotImplementedError
+
+    def leaderboard(self, limit, offset=0, after=None):
+        """Rows ordered by (avgScore desc, user asc); `after` = (avgScore, user) of the previous page."""
+        raise NotImplementedError
+
+    def migrate(self):
+        """Idempotent schema setup; returns the names of what exists afterwards."""
+        return []
+
+    def backfill_stats(self, user=None):
+        """Compute `stats` for documents saved before the rollup existed; returns the count."""
+        return 0
+
+    def rebuild_leaderboard(self):
+        """Recompute every leaderboard row; returns the number of rows."""
+        raise NotImplementedError
+
+
+def _call(collection, method, *args, **kwargs):
+    """One MongoDB operation, yielded by the _MongoOps steps. `find` and `aggregate` produce lists."""
+    return collection, method, args, kwargs
+
+
+class _MongoOps:
+    """
+    The MongoDB logic of MongoStore and AsyncMongoStore, written once. Each
+    operation is a generator that yields _call()s and receives their results
+    (exceptions are thrown back in), so a blocking pymongo loop and an
+    awaiting Motor loop (the stores' _run) can drive the same steps.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._leaderboard_refreshed_at = None  # time.time() of the last rebuild we know of
+
+    def _get_etag(self, user):
+        current = yield _call('contest_data', 'find_one', {'user': user}, {'etag': 1, '_id': 0})
+        return current.get('etag') if current else None
+
+    def _load(self, user):
+        return (yield _call('contest_data', 'find_one', {'user': user}, {'_id': 0, 'stats': 0}))
+
+    def _save(self, user, doc):
+        from pymongo import ReturnDocument
+
+        current = yield _call('contest_data', 'find_one', {'user': user}, {'archive': 1, '_id': 0})
+        doc, buckets = prepare_save(user, doc, (current or {}).get('archive'))
+        # Buckets first: if the document write fails they are rewritten by the next save.
+        yield from self._write_buckets(buckets)
+        saved = yield _call(
+            'contest_data', 'find_one_and_update',
+            {'user': user},
+            {'$set': doc, '$inc': {'version': 1}},
+            projection={'version': 1, '_id': 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        yield from self._set_entry(user, doc['stats'], doc['streak'])
+        return saved['version']
+
+    def _patch(self, user, version, update, array_filters, touches_stats):
+        from pymongo import ReturnDocument
+        from pymongo.errors import OperationFailure
+
+        # Documents written before `version` existed count as version 0.
+        query = {'user': user, 'version': version if version else {'$in': [0, None]}}
+        if touches_stats:
+            query['stats'] = {'$exists': True}
+        if array_filters:
+            # Without the array Mongo fails the whole update ("path must exist").
+            query[ACTIVE_PROBLEMS] = {'$type': 'array'}
+
+        for attempt in range(2):
+            try:
+                saved = yield _call(
+                    'contest_data', 'find_one_and_update',
+                    query,
+                    update,
+                    projection={'version': 1, 'stats': 1, 'streak': 1, '_id': 0},
+                    array_filters=array_filters or None,
+                    return_document=ReturnDocument.AFTER
+                )
+            except OperationFailure as e:
+                if e.code in MONGO_PATH_ERRORS:
+                    raise InvalidUpdatePath((e.details or {}).get('errmsg', str(e))) from e
+                raise
+            if saved is not None:
+                break
+
+            current = yield _call(
+                'contest_data', 'find_one', {'user': user}, {'version': 1, 'stats': 1, ACTIVE_PROBLEMS: 1, '_id': 0}
+            )
+            if current is None:
+                raise UserNotFound(user)
+            if (current.get('version') or 0) != version:
+                raise VersionConflict(current.get('version') or 0)
+            if array_filters and not _has_active_problems(current):
+                raise NoActiveContest(user)
+            if attempt == 0 and 'stats' not in current:
+                yield from self._backfill_stats(user)
+                continue
+            raise StorageError('Update failed')
+
+        if touches_stats or 'streak.current' in update.get('$set', {}):
+            yield from self._set_entry(user, saved.get('stats', {}), saved.get('streak') or {})
+        if 'pastContests' in update.get('$push', {}):
+            yield from self._compact(user)
+        return saved
+
+    def _history(self, user, before, limit):
+        from pymongo import DESCENDING
+
+        query = {'user': user}
+        if before is not None:
+            query['bucketStart'] = {'$lt': before}
+        return (yield _call('contest_history', 'find', query, {'_id': 0},
+                            sort=[('bucketStart', DESCENDING)], limit=limit))
+
+    def _write_buckets(self, buckets):
+        for bucket in buckets:
+            yield _call(
+                'contest_history', 'replace_one',
+                {'user': bucket['user'], 'bucketStart': bucket['bucketStart']}, bucket, upsert=True
+            )
+
+    def _compact(self, user):
+        """Archive the overflow after an append; skipped if another write got in between."""
+        doc = yield _call(
+            'contest_data', 'find_one',
+            {'user': user}, {'pastContests': 1, 'archive': 1, 'version': 1, 'etag': 1, '_id': 0}
+        )
+        if doc is None:
+            return
+        buckets = compact_after_append(user, doc)
+        if not buckets:
+            return
+        yield from self._write_buckets(buckets)
+        yield _call(
+            'contest_data', 'update_one',
+            {'user': user, 'version': doc.get('version')},
+            {'$set': {
+                'pastContests': doc['pastContests'],
+                'archive': doc['archive'],
+                # The body changes without a new version, so it needs a new validator.
+                'etag': json_etag({'base': doc.get('etag'), 'archived': doc['archive']['count']})
+            }}
+        )
+
+    def _stats(self, user):
+        data = yield _call('contest_data', 'find_one', {'user': user}, {'user': 1, 'stats': 1, 'streak': 1, '_id': 0})
+        if not data:
+            return None
+        if data.get('stats') is None:
+            # Saved before the rollup existed and not yet backfilled.
+            past = yield _call('contest_data', 'find_one', {'user': user}, {'pastContests': 1, 'archive': 1, '_id': 0})
+            data['stats'] = rollup_of(past or {})
+            yield _call('contest_data', 'update_one', {'user': user}, {'$set': {'stats': data['stats']}})
+        return _stats_view(data)
+
+    def _leaderboard(self, limit, offset, after):
+        from pymongo import ASCENDING, DESCENDING
+
+        query = {}
+        if after is not None:
+            avg_score, last_user = after
+            # Keyset pagination over the (avgScore desc, _id asc) index.
+            query = {'$or': [
+                {'avgScore': {'$lt': avg_score}},
+                {'avgScore': avg_score, '_id': {'$gt': last_user}}
+            ]}
+            offset = 0
+        return (yield _call('leaderboard', 'find', query,
+                            sort=[('avgScore', DESCENDING), ('_id', ASCENDING)], skip=offset, limit=limit))
+
+    def _migrate(self):
+        created = []
+        for collection, indexes in _indexes().items():
+            for keys, options in indexes:
+                name = yield _call(collection, 'create_index', keys, **options)
+                created.append(f'{collection}.{name}')
+        return created
+
+    def _backfill_stats(self, user=None):
+        query = {'stats': {'$exists': False}}
+        if user is not None:
+            query['user'] = user
+        updated = 0
+        while True:
+            # Every pass fills in the batch it read, so the query moves on.
+            batch = yield _call('contest_data', 'find', query, {'pastContests': 1, 'archive': 1},
+                                limit=BACKFILL_BATCH)
+            for doc in batch:
+                yield _call('contest_data', 'update_one', {'_id': doc['_id']}, {'$set': {'stats': rollup_of(doc)}})
+            updated += len(batch)
+            if len(batch) < BACKFILL_BATCH:
+                return updated
+
+    def _rebuild_leaderboard(self):
+        """Rebuild the materialized leaderboard ($out keeps the existing indexes)."""
+        yield _call('contest_data', 'aggregate', LEADERBOARD_PIPELINE)
+        now = datetime.now(timezone.utc)
+        yield _call('meta', 'update_one', {'_id': 'leaderboard'}, {'$set': {'refreshedAt': now}}, upsert=True)
+        self._leaderboard_refreshed_at = now.timestamp()
+        return (yield _call('leaderboard', 'count_documents', {}))
+
+    def _set_entry(self, user, rollup, streak):
+        entry = leaderboard_entry(user, rollup, streak)
+        if entry is None:
+            yield _call('leaderboard', 'delete_one', {'_id': user})
+        else:
+            yield _call('leaderboard', 'replace_one', {'_id': user}, entry, upsert=True)
+
+    def _leaderboard_due(self):
+        """
+        None while the materialized leaderboard is younger than
+        LEADERBOARD_MAX_AGE, else how to rebuild it: 'inline' for the very
+        first build, 'background' otherwise.
+        """
+        now = time.time()
+        if self._leaderboard_refreshed_at is not None and now - self._leaderboard_refreshed_at < LEADERBOARD_MAX_AGE:
+            return None
+
+        meta = yield _call('meta', 'find_one', {'_id': 'leaderboard'})
+        if meta and meta.get('refreshedAt'):
+            refreshed = meta['refreshedAt']
+            if refreshed.tzinfo is None:
+                refreshed = refreshed.replace(tzinfo=timezone.utc)
+            self._leaderboard_refreshed_at = refreshed.timestamp()
+            if now - self._leaderboard_refreshed_at < LEADERBOARD_MAX_AGE:
+                return None
+        return 'inline' if meta is None else 'background'
+
+    def _rebuild_failed(self, e):
+        print(f"[ERROR] Leaderboard rebuild failed: {e}")
+        # Back off for a full window instead of retrying on every request.
+        self._leaderboard_refreshed_at = time.time()
+
+
+class MongoStore(_MongoOps, ContestStore):
+    name = 'mongo'
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._leaderboard_lock = threading.Lock()
+
+    def _run(self, steps):
+        """Drive _MongoOps steps with blocking pymongo calls."""
+        result, error = None, None
+        while True:
+            try:
+                collection, method, args, kwargs = steps.throw(error) if error is not None else steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                result = getattr(self.db[collection], method)(*args, **kwargs)
+                if method in ('find', 'aggregate'):
+                    result = list(result)
+            except Exception as e:
+                error = e
+
+    def get_etag(self, user):
+        return self._run(self._get_etag(user))
+
+    def load(self, user):
+        return self._run(self._load(user))
+
+    def save(self, user, doc):
+        return self._run(self._save(user, doc))
+
+    def patch(self, user, version, update, array_filters, touches_stats):
+        return self._run(self._patch(user, version, update, array_filters, touches_stats))
+
+    def history(self, user, before=None, limit=1):
+        return self._run(self._history(user, before, limit))
+
+    def stats(self, user):
+        return self._run(self._stats(user))
+
+    def leaderboard(self, limit, offset=0, after=None):
+        self.ensure_leaderboard_fresh()
+        return self._run(self._leaderboard(limit, offset, after))
+
+    def migrate(self):
+        return self._run(self._migrate())
+
+    def backfill_stats(self, user=None):
+        return self._run(self._backfill_stats(user))
+
+    def rebuild_leaderboard(self):
+        return self._run(self._rebuild_leaderboard())
+
+    def _rebuild_leaderboard_locked(self):
+        try:
+            self.rebuild_leaderboard()
+        except Exception as e:
+            self._rebuild_failed(e)
+        finally:
+            self._leaderboard_lock.release()
+
+    def ensure_leaderboard_fresh(self):
+        """Kick off a rebuild once the materialized leaderboard is older than LEADERBOARD_MAX_AGE."""
+        due = self._run(self._leaderboard_due())
+        if due is None or not self._leaderboard_lock.acquire(blocking=False):
+            return  # fresh, or a rebuild is already running
+        if due == 'inline':
+            self._rebuild_leaderboard_locked()
+        else:
+            threading.Thread(target=self._rebuild_leaderboard_locked, daemon=True).start()
+
+
+class AsyncMongoStore(_MongoOps):
+    """
+    MongoStore for an asyncio server: the same methods (and the same
+    _MongoOps steps), as coroutines over a Motor database.
+    """
+
+    name = 'mongo'
+
+    def __init__(self, db):
+        super().__init__(db)
+        self._rebuilding = False
+        self._rebuild_task = None  # keeps the background rebuild referenced while it runs
+
+    async def _run(self, steps):
+        """Drive _MongoOps steps with awaited Motor calls."""
+        result, error = None, None
+        while True:
+            try:
+                collection, method, args, kwargs = steps.throw(error) if error is not None else steps.send(result)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                call = getattr(self.db[collection], method)(*args, **kwargs)
+                result = await (call.to_list(None) if method in ('find', 'aggregate') else call)
+            except Exception as e:
+                error = e
+
+    async def get_etag(self, user):
+        return await self._run(self._get_etag(user))
+
+    async def load(self, user):
+        return await self._run(self._load(user))
+
+    async def save(self, user, doc):
+        return await self._run(self._save(user, doc))
+
+    async def patch(self, user, version, update, array_filters, touches_stats):
+        return await self._run(self._patch(user, version, update, array_filters, touches_stats))
+
+    async def history(self, user, before=None, limit=1):
+        return await self._run(self._history(user, before, limit))
+
+    async def stats(self, user):
+        return await self._run(self._stats(user))
+
+    async def leaderboard(self, limit, offset=0, after=None):
+        await self.ensure_leaderboard_fresh()
+        return await self._run(self._leaderboard(limit, offset, after))
+
+    async def rebuild_leaderboard(self):
+        return await self._run(self._rebuild_leaderboard())
+
+    async def _rebuild_leaderboard_guarded(self):
+        try:
+            await self.rebuild_leaderboard()
+        except Exception as e:
+            self._rebuild_failed(e)
+        finally:
+            self._rebuilding = False
+            self._rebuild_task = None
+
+    async def ensure_leaderboard_fresh(self):
+        """Same policy as MongoStore.ensure_leaderboard_fresh(), with a background task."""
+        due = await self._run(self._leaderboard_due())
+        if due is None or self._rebuilding:
+            return
+        self._rebuilding = True
+        if due == 'inline':
+            await self._rebuild_leaderboard_guarded()
+        else:
+            self._rebuild_task = asyncio.get_running_loop().create_task(self._rebuild_leaderboard_guarded())
+
+
+class MemoryStore(ContestStore):
+    """
+    Documents in a dict, leaderboard keys in a sorted list. Stored documents
+    are never mutated in place (writes swap in copies), so readers can
+    serialize what load() returns without holding the lock.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._docs = {}
+        self._board = {}   # user -> leaderboard row
+        self._order = []   # sorted (-avgScore, user)
+        self._history = {}  # user -> archived buckets, oldest first
+        self._lock = threading.Lock()
+
+    def get_etag(self, user):
+        doc = self._docs.get(user)
+        return doc.get('etag') if doc else None
+
+    def load(self, user):
+        doc = self._docs.get(user)
+        if doc is None:
+            return None
+        return {k: v for k, v in doc.items() if k != 'stats'}
+
+    def save(self, user, doc):
+        with self._lock:
+            current = self._docs.get(user, {})
+            doc, buckets = prepare_save(user, copy.deepcopy(doc), current.get('archive'))
+            self._add_buckets(user, buckets)
+            stored = {**current, **doc}
+            stored['version'] = (current.get('version') or 0) + 1
+            self._docs[user] = stored
+            self._set_entry(user, stored['stats'], stored['streak'])
+            return stored['version']
+
+    def patch(self, user, version, update, array_filters, touches_stats):
+        touched = {path.split('.', 1)[0] for fields in update.values() for path in fields}
+        with self._lock:
+            current = self._docs.get(user)
+            if current is None:
+                raise UserNotFound(user)
+            doc = dict(current)
+            for field in touched:
+                if field in doc:
+                    doc[field] = copy.deepcopy(doc[field])
+            ranked, buckets = _apply_patch(user, doc, version, copy.deepcopy(update), array_filters, touches_stats)
+            self._add_buckets(user, buckets)
+            self._docs[user] = doc
+            if ranked:
+                self._set_entry(user, doc.get('stats') or {}, doc.get('streak') or {})
+        return {'version': doc['version'], 'stats': doc.get('stats'), 'streak': doc.get('streak')}
+
+    def history(self, user, before=None, limit=1):
+        buckets = [b for b in self._history.get(user, []) if before is None or b['bucketStart'] < before]
+        return copy.deepcopy(buckets[::-1][:limit])
+
+    def _add_buckets(self, user, buckets):
+        """Caller holds the lock; a bucketStart that already exists is replaced."""
+        if buckets:
+            starts = {b['bucketStart'] for b in buckets}
+            kept = [b for b in self._history.get(user, []) if b['bucketStart'] not in starts]
+            self._history[user] = sorted(kept + buckets, key=lambda b: b['bucketStart'])
+
+    def stats(self, user):
+        doc = self._docs.get(user)
+        return _stats_view(doc) if doc else None
+
+    def leaderboard(self, limit, offset=0, after=None):
+        with self._lock:
+            start = bisect_right(self._order, (-after[0], after[1])) if after is not None else offset
+            return [dict(self._board[user]) for _, user in self._order[start:start + limit]]
+
+    def rebuild_leaderboard(self):
+        with self._lock:
+            self._board, self._order = {}, []
+            for user, doc in self._docs.items():
+                self._set_entry(user, doc.get('stats') or rollup_of(doc),
+                                doc.get('streak') or {})
+            return len(self._board)
+
+    def _set_entry(self, user, rollup, streak):
+        """Caller holds the lock."""
+        old = self._board.pop(user, None)
+        if old is not None:
+            del self._order[bisect_left(self._order, (-old['avgScore'], user))]
+        entry = leaderboard_entry(user, rollup, streak)
+        if entry is not None:
+            self._board[user] = entry
+            insort(self._order, (-entry['avgScore'], user))
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return {'$date': value.isoformat()}
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _json_hook(obj):
+    if len(obj) == 1 and '$date' in obj:
+        return datetime.fromisoformat(obj['$date'])
+    return obj
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=_json_default)
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_json_hook) if text is not None else None
+
+
+SQLITE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS contest_data (
+    user    TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    etag    TEXT,
+    doc     TEXT NOT NULL,  -- JSON without stats/streak/etag/version
+    stats   TEXT,
+    streak  TEXT
+);
+CREATE TABLE IF NOT EXISTS leaderboard (
+    user      TEXT PRIMARY KEY,
+    avg_score INTEGER NOT NULL,
+    entry     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leaderboard_rank ON leaderboard (avg_score DESC, user ASC);
+CREATE TABLE IF NOT EXISTS contest_history (
+    user         TEXT NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    contests     TEXT NOT NULL,  -- JSON list, oldest first
+    PRIMARY KEY (user, bucket_start)
+);
+'''
+
+_SPLIT_FIELDS = ('stats', 'streak', 'etag', 'version')
+
+
+class SQLiteStore(ContestStore):
+    """
+    One SQLite file in WAL mode: readers never block the writer, and
+    writes use BEGIN IMMEDIATE so PATCH read-check-write is atomic across
+    threads and processes. `stats` and `streak` live in their own columns
+    so the stats endpoint and the version check skip the contest history.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path=CONTEST_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(SQLITE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _write(self):
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _read_doc(self, conn, user):
+        row = conn.execute(
+            'SELECT doc, stats, streak, etag, version FROM contest_data WHERE user = ?', (user,)
+        ).fetchone()
+        if row is None:
+            return None
+        doc = _loads(row[0])
+        doc.update(stats=_loads(row[1]), streak=_loads(row[2]), etag=row[3], version=row[4])
+        return doc
+
+    def _write_doc(self, conn, user, doc):
+        conn.execute(
+            'INSERT OR REPLACE INTO contest_data (user, version, etag, doc, stats, streak) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (user, doc['version'], doc.get('etag'),
+             _dumps({k: v for k, v in doc.items() if k not in _SPLIT_FIELDS}),
+             _dumps(doc.get('stats')), _dumps(doc.get('streak')))
+        )
+
+    def get_etag(self, user):
+        row = self._conn().execute('SELECT etag FROM contest_data WHERE user = ?', (user,)).fetchone()
+        return row[0] if row else None
+
+    def load(self, user):
+        doc = self._read_doc(self._conn(), user)
+        if doc is not None:
+            del doc['stats']
+        return doc
+
+    def save(self, user, doc):
+        with self._write() as conn:
+            row = conn.execute('SELECT version, doc FROM contest_data WHERE user = ?', (user,)).fetchone()
+            doc, buckets = prepare_save(user, doc, _loads(row[1]).get('archive') if row else None)
+            self._write_buckets(conn, buckets)
+            stored = {**doc, 'version': (row[0] if row else 0) + 1}
+            self._write_doc(conn, user, stored)
+            self._set_entry(conn, user, stored['stats'], stored['streak'])
+        return stored['version']
+
+    def patch(self, user, version, update, array_filters, touches_stats):
+        with self._write() as conn:
+            doc = self._read_doc(conn, user)
+            if doc is None:
+                raise UserNotFound(user)
+            ranked, buckets = _apply_patch(user, doc, version, update, array_filters, touches_stats)
+            self._write_buckets(conn, buckets)
+            self._write_doc(conn, user, doc)
+            if ranked:
+                self._set_entry(conn, user, doc.get('stats') or {}, doc.get('streak') or {})
+        return {'version': doc['version'], 'stats': doc.get('stats'), 'streak': doc.get('streak')}
+
+    def history(self, user, before=None, limit=1):
+        rows = self._conn().execute(
+            'SELECT bucket_start, contests FROM contest_history WHERE user = ? AND bucket_start < ? '
+            'ORDER BY bucket_start DESC LIMIT ?',
+            (user, before if before is not None else 2 ** 62, limit)
+        )
+        return [{'user': user, 'bucketStart': start, 'contests': _loads(contests)} for start, contests in rows]
+
+    def _write_buckets(self, conn, buckets):
+        conn.executemany(
+            'INSERT OR REPLACE INTO contest_history (user, bucket_start, contests) VALUES (?, ?, ?)',
+            [(b['user'], b['bucketStart'], _dumps(b['contests'])) for b in buckets]
+        )
+
+    def stats(self, user):
+        row = self._conn().execute(
+            'SELECT stats, streak FROM contest_data WHERE user = ?', (user,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[0] is None or row[0] == 'null':
+            self.backfill_stats(user)
+            return self.stats(user)
+        return _stats_view({'stats': _loads(row[0]), 'streak': _loads(row[1])})
+
+    def leaderboard(self, limit, offset=0, after=None):
+        if after is not None:
+            rows = self._conn().execute(
+                'SELECT entry FROM leaderboard WHERE avg_score < ? OR (avg_score = ? AND user > ?) '
+                'ORDER BY avg_score DESC, user ASC LIMIT ?',
+                (after[0], after[0], after[1], limit)
+            )
+        else:
+            rows = self._conn().execute(
+                'SELECT entry FROM leaderboard ORDER BY avg_score DESC, user ASC LIMIT ? OFFSET ?',
+                (limit, offset)
+            )
+        return [json.loads(entry) for entry, in rows]
+
+    def migrate(self):
+        conn = self._conn()
+        rows = conn.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'index') "
+                            "AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        return [f'{kind} {name}' for kind, name in rows]
+
+    def backfill_stats(self, user=None):
+        query = "SELECT user FROM contest_data WHERE (stats IS NULL OR stats = 'null')"
+        params = ()
+        if user is not None:
+            query, params = query + ' AND user = ?', (user,)
+        updated = 0
+        with self._write() as conn:
+            for (name,) in conn.execute(query, params).fetchall():
+                doc = self._read_doc(conn, name)
+                doc['stats'] = rollup_of(doc)
+                self._write_doc(conn, name, doc)
+                updated += 1
+        return updated
+
+    def rebuild_leaderboard(self):
+        with self._write() as conn:
+            conn.execute('DELETE FROM leaderboard')
+            rows = conn.execute('SELECT user, stats, streak FROM contest_data').fetchall()
+            for user, stats, streak in rows:
+                self._set_entry(conn, user, _loads(stats) or {}, _loads(streak) or {})
+            return conn.execute('SELECT COUNT(*) FROM leaderboard').fetchone()[0]
+
+    def _set_entry(self, conn, user, rollup, streak):
+        entry = leaderboard_entry(user, rollup, streak)
+        if entry is None:
+            conn.execute('DELETE FROM leaderboard WHERE user = ?', (user,))
+        else:
+            conn.execute('INSERT OR REPLACE INTO leaderboard (user, avg_score, entry) VALUES (?, ?, ?)',
+                         (user, entry['avgScore'], json.dumps(entry)))
+
+
+def open_store(kind=CONTEST_STORAGE):
+    """A sqlite or memory store; MongoStore is built by contest_server around its client."""
+    if kind == 'sqlite':
+        return SQLiteStore()
+    if kind == 'memory':
+        return MemoryStore()
+    raise ValueError(f'Unknown CONTEST_STORAGE {kind!r} (expected one of {", ".join(STORAGE_BACKENDS)})')
@@ -0,0 +1,172 @@
+"""
+Zone/level structure of a progress document.
+
+A progress document mixes two kinds of data:
+  - the curriculum: zone and level titles, markdown `details`, XP, prereqs.
+    It is the same for everyone and never changes at runtime;
+  - per-user state: level `status`, notes, journal entries and XP.
+
+split_curriculum() separates them so the curriculum can be cached as an
+immutable resource and the state stays a few KB. apply_patch() updates
+state for `zone-id/level-id` paths, copying only what it touches.
+"""
+
+from __future__ import annotations
+
+import copy
+
+LEVEL_STATUSES = ("locked", "unlocked", "in-progress", "complete")
+# Per-user fields of a level; everything else on a level is curriculum.
+LEVEL_STATE_FIELDS = ("status",)
+# XP per user level, as CONFIG.XP_PER_LEVEL in app.js.
+XP_PER_LEVEL = 230
+
+
+class PatchError(ValueError):
+    """A PATCH body that cannot be applied; `status` is the HTTP code to answer with."""
+
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def split_curriculum(doc: dict) -> dict:
+    """The static part of a progress document (no statuses, no user data)."""
+    zones = []
+    for zone in doc.get("zones", []):
+        levels = [
+            {k: v for k, v in level.items() if k not in LEVEL_STATE_FIELDS}
+            for level in zone.get("levels", [])
+        ]
+        zones.append({**zone, "levels": levels})
+    return {"version": doc.get("version", "1.0"), "zones": zones}
+
+
+def level_statuses(doc: dict) -> dict[str, str]:
+    return {
+        level["id"]: level.get("status", "locked")
+        for zone in doc.get("zones", [])
+        for level in zone.get("levels", [])
+    }
+
+
+def state_view(doc: dict, curriculum_etag: str | None = None) -> dict:
+    """The per-user part of a progress document: statuses keyed by level id, plus user/settings."""
+    return {
+        "version": doc.get("version", "1.0"),
+        "updatedAt": doc.get("updatedAt"),
+        "curriculum": curriculum_etag,
+        "levels": level_statuses(doc),
+        "user": doc.get("user", {}),
+        "settings": doc.get("settings", {}),
+    }
+
+
+def _find_level(doc: dict, path: str) -> tuple[int, int]:
+    zone_id, _, level_id = path.partition("/")
+    for zi, zone in enumerate(doc.get("zones", [])):
+        if zone.get("id") != zone_id:
+            continue
+        for li, level in enumerate(zone.get("levels", [])):
+            if level.get("id") == level_id:
+                return zi, li
+    raise PatchError(f"Unknown level path: {path}", status=404)
+
+
+def level_for_xp(xp: int) -> int:
+    """User level for an XP total (calculateLevel() in app.js)."""
+    return xp // XP_PER_LEVEL + 1
+
+
+def apply_patch(doc: dict, patch: dict) -> tuple[dict, list[str]]:
+    """
+    Apply a PATCH body to a progress document without mutating it:
+
+      {"levels": {"zone-1/level-1-2": {"status": "complete",
+                                        "note": "...",
+                                        "journal": [{"id": "...", "text": "...", "timestamp": "..."}]}},
+       "xp": 350,
+       "settings": {"view": "list"}}
+
+    Only the zones, levels and user maps that change are copied; the rest
+    is shared with `doc`. Setting "xp" also sets user.level to match.
+    Returns (new_doc, ids of levels whose status was set).
+    """
+    if not isinstance(patch, dict):
+        raise PatchError("Expected a JSON object")
+    levels = patch.get("levels", {})
+    if not isinstance(levels, dict):
+        raise PatchError("levels must be an object keyed by zone-id/level-id")
+
+    new = dict(doc)
+    new["zones"] = list(doc.get("zones", []))
+    user = new["user"] = dict(doc.get("user") or {})
+    notes = journal = None
+    copied_zones = set()
+    status_changed = []
+
+    for path, change in levels.items():
+        if not isinstance(change, dict):
+            raise PatchError(f"Update for {path} must be an object")
+        zi, li = _find_level(new, path)
+        level_id = new["zones"][zi]["levels"][li]["id"]
+
+        if "status" in change:
+            if change["status"] not in LEVEL_STATUSES:
+                raise PatchError(f"Invalid status for {path}: {change['status']!r}")
+            if zi not in copied_zones:
+                zone = new["zones"][zi]
+                new["zones"][zi] = {**zone, "levels": list(zone.get("levels", []))}
+                copied_zones.add(zi)
+            levels_copy = new["zones"][zi]["levels"]
+            levels_copy[li] = {**levels_copy[li], "status": change["status"]}
+            status_changed.append(level_id)
+
+        if "note" in change:
+            if notes is None:
+                notes = user["notes"] = dict(user.get("notes") or {})
+            if change["note"]:
+                notes[level_id] = str(change["note"])
+            else:
+                notes.pop(level_id, None)
+
+        if "journal" in change:
+            entries = change["journal"]
+            if not isinstance(entries, list) or not all(isinstance(e, dict) and e.get("text") for e in entries):
+                raise PatchError(f"journal for {path} must be a list of entries with text")
+            if journal is None:
+                journal = user["journal"] = dict(user.get("journal") or {})
+            journal[level_id] = [*journal.get(level_id, []), *copy.deepcopy(entries)]
+
+    if "xp" in patch:
+        xp = patch["xp"]
+        if not isinstance(xp, int) or isinstance(xp, bool) or xp < 0:
+            raise PatchError("xp must be a non-negative integer")
+        user["current_xp"] = xp
+        user["level"] = level_for_xp(xp)
+
+    if "settings" in patch:
+        if not isinstance(patch["settings"], dict):
+            raise PatchError("settings must be an object")
+        new["settings"] = {**(doc.get("settings") or {}), **patch["settings"]}
+
+    if "updatedAt" in patch:
+        new["updatedAt"] = patch["updatedAt"]
+
+    return new, status_changed
+
+
+def set_statuses(doc: dict, statuses: dict[str, str]) -> dict:
+    """Copy of `doc` with the given level statuses; untouched zones are shared."""
+    if not statuses:
+        return doc
+    new = dict(doc)
+    zones = new["zones"] = list(doc.get("zones", []))
+    for zi, zone in enumerate(zones):
+        if not any(level.get("id") in statuses for level in zone.get("levels", [])):
+            continue
+        zones[zi] = {**zone, "levels": [
+            {**level, "status": statuses[level["id"]]} if level.get("id") in statuses else level
+            for level in zone["levels"]
+        ]}
+    return new
@@ -0,0 +1,162 @@
+"""
+Bounded read-through cache for encoded per-user API responses.
+
+contest_server.py keeps the JSON bodies of /api/contest/data and
+/api/contest/stats here, so a page load, the stats modal and the resume
+check that follow each other hit the store once instead of three times.
+
+- LRU by bytes: every entry is weighted by the size of its encoded value
+  (plus a fixed overhead) and the least recently used ones are evicted
+  once `max_bytes` is exceeded.
+- TTL: entries expire after `ttl` seconds. Writes in this process
+  invalidate their keys right away; the TTL bounds how stale a read can be
+  after a write made by another process or server instance.
+- Single flight: concurrent misses for the same key wait for one load
+  instead of each querying the database.
+
+Hits, misses, coalesced waits and evictions are exported as cache_* in metrics.py.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Rough per-entry cost of the key, tuple and dict slot, added to the value size.
+ENTRY_OVERHEAD = 200
+
+
+class _Flight:
+    """One in-progress load that concurrent misses wait on."""
+
+    __slots__ = ('done', 'value', 'error', 'stale')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.stale = False  # invalidated while loading: hand out, but do not cache
+
+
+class DocCache:
+    def __init__(self, max_bytes, ttl, name='cache'):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self._entries = OrderedDict()  # key -> (expires_at, size, value), least recent first
+        self._bytes = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.ttl > 0
+
+    def peek(self, key):
+        """The cached value, or None; never loads."""
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+        if value is not None:
+            metrics.CACHE_REQUESTS.inc(cache=self.name, result='hit')
+        return value
+
+    def get(self, key, loader):
+        """
+        The cached value, or `loader()` -> (value, size in bytes) run once for
+        all concurrent callers and cached. Loader exceptions propagate to
+        every waiting caller and are not cached.
+        """
+        if not self.enabled:
+            return loader()[0]
+
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            if value is not None:
+                result = 'hit'
+            else:
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                result = 'miss' if leader else 'coalesced'
+        metrics.CACHE_REQUESTS.inc(cache=self.name, result=result)
+        if value is not None:
+            return value
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value, size = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                if not flight.stale:
+                    self._store(key, value, size)
+            return value
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, *keys):
+        """Drop `keys`; a load already running for one of them is not cached."""
+        with self._lock:
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[1]
+                flight = self._flights.pop(key, None)
+                if flight is not None:
+                    flight.stale = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for flight in self._flights.values():
+                flight.stale = True
+            self._flights.clear()
+
+    def info(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'maxBytes': self.max_bytes,
+                    'ttl': self.ttl}
+
+    def _lookup(self, key, now):
+        """Caller holds the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            self._bytes -= entry[1]
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _store(self, key, value, size):
+        """Caller holds the lock."""
+        size += ENTRY_OVERHEAD
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self._bytes += size
+        evicted = 0
+        while self._bytes > self.max_bytes:
+            _, (_, old_size, _) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            evicted += 1
+        if evicted:
+            metrics.CACHE_EVICTIONS.inc(evicted, cache=self.name)
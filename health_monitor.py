@@ -0,0 +1,152 @@
+"""
+Background database health monitor with a circuit breaker.
+
+A daemon thread runs `probe` (e.g. a Mongo ping) every `interval` seconds
+and publishes the result: status, latency and when it was checked. /api/health
+reads that cached status instead of pinging on every hit.
+
+After a failure the circuit opens: request handlers ask `allow_request()`
+and answer 503 immediately instead of each waiting for a connection
+timeout. The monitor keeps probing with exponential backoff (interval,
+2x, 4x, ... up to `max_backoff`) and closes the circuit on the first
+successful probe. Handlers that hit a connection error themselves call
+`record_failure()`, which opens the circuit without waiting for the next probe.
+
+AsyncHealthMonitor is the same monitor for an asyncio server: the probe is
+a coroutine function and probing runs as a task on the event loop.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime, timezone
+
+HEALTHY = 'healthy'
+UNHEALTHY = 'unhealthy'
+UNKNOWN = 'unknown'
+
+
+class HealthMonitor:
+    def __init__(self, probe, interval=15.0, max_backoff=120.0, name='db-health'):
+        self.probe = probe
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.name = name
+        self._status = UNKNOWN
+        self._latency_ms = None
+        self._checked_at = None
+        self._last_error = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    # -- circuit breaker -----------------------------------------------------
+
+    def allow_request(self):
+        """False while the circuit is open (the last probe or request failed)."""
+        return self._status != UNHEALTHY
+
+    def record_success(self, latency_ms=None):
+        with self._lock:
+            self._status = HEALTHY
+            self._failures = 0
+            self._last_error = None
+            self._latency_ms = latency_ms if latency_ms is not None else self._latency_ms
+            self._checked_at = datetime.now(timezone.utc)
+
+    def record_failure(self, error):
+        with self._lock:
+            opened = self._status != UNHEALTHY
+            self._status = UNHEALTHY
+            self._failures += 1
+            self._last_error = str(error)
+            self._checked_at = datetime.now(timezone.utc)
+        if opened:
+            print(f"[WARNING] {self.name}: circuit open ({error})")
+        self._wake.set()  # restart the backoff schedule from now
+
+    # -- probing ---------------------------------------------------------------
+
+    def check_now(self):
+        """Run one probe synchronously and record its outcome; returns True if healthy."""
+        started = time.perf_counter()
+        try:
+            self.probe()
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        self._probe_succeeded(started)
+        return True
+
+    def _probe_succeeded(self, started):
+        was_open = self._status == UNHEALTHY
+        self.record_success(round((time.perf_counter() - started) * 1000, 1))
+        if was_open:
+            print(f"[OK] {self.name}: circuit closed")
+
+    def next_delay(self):
+        if self._failures == 0:
+            return self.interval
+        return min(self.interval * (2 ** (self._failures - 1)), self.max_backoff)
+
+    def start(self):
+        """Start the probing thread once (safe to call from every request)."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            woke = self._wake.wait(self.next_delay())
+            self._wake.clear()
+            if woke:
+                continue  # a request reported a failure: back off from now
+            self.check_now()
+
+    def snapshot(self):
+        return {
+            'status': self._status,
+            'latencyMs': self._latency_ms,
+            'checkedAt': self._checked_at.isoformat() if self._checked_at else None,
+            'consecutiveFailures': self._failures,
+            'lastError': self._last_error,
+        }
+
+
+class AsyncHealthMonitor(HealthMonitor):
+    def __init__(self, probe, interval=15.0, max_backoff=120.0, name='db-health'):
+        super().__init__(probe, interval, max_backoff, name)
+        self._wake = asyncio.Event()
+        self._task = None
+
+    async def check_now(self):
+        """Await one probe and record its outcome; returns True if healthy."""
+        started = time.perf_counter()
+        try:
+            await self.probe()
+        except Exception as e:
+            self.record_failure(e)
+            return False
+        self._probe_succeeded(started)
+        return True
+
+    def start(self):
+        """Start the probing task once, on the running loop (safe to call from every request)."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.next_delay())
+                woke = True
+            except asyncio.TimeoutError:
+                woke = False
+            self._wake.clear()
+            if woke:
+                continue  # a request reported a failure: back off from now
+            await self.check_now()
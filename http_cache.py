@@ -0,0 +1,119 @@
+"""
+HTTP validators and response compression shared by server.py and contest_server.py.
+
+- ETags are content hashes (or version tokens, see contest_storage.patch_etag),
+  computed once when a document is written. Responses negotiated to gzip/br
+  carry their weak form (negotiated_etag()).
+- Bodies are compressed with brotli when the client accepts it and the
+  optional `brotli` package is installed, otherwise with gzip.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+
+# Compressing tiny bodies costs more than it saves.
+MIN_COMPRESS_SIZE = 1024
+
+
+def content_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def json_etag(obj) -> str:
+    """Strong ETag for a JSON-serializable object, independent of key order."""
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return content_etag(canonical.encode("utf-8"))
+
+
+def negotiated_etag(etag: str, encoding: str | None) -> str:
+    """
+    The ETag to send with a response whose Accept-Encoding negotiated to
+    `encoding` (choose_encoding()). The compressed bytes differ from the
+    identity body, so they only get the weak form: it still matches
+    If-None-Match, but not a strong comparison.
+    """
+    if encoding is None or etag.startswith("W/"):
+        return etag
+    return "W/" + etag
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """True if an If-None-Match header value matches `etag` (weak comparison, RFC 9110)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def strong_etag_matches(if_match: str | None, etag: str | None) -> bool:
+    """True if an If-Match header value matches `etag` (strong comparison, RFC 9110): weak tags never match."""
+    if not if_match or not etag:
+        return False
+    if if_match.strip() == "*":
+        return True
+    if etag.startswith("W/"):
+        return False
+    return any(candidate.strip() == etag for candidate in if_match.split(","))
+
+
+def _accepted_codings(accept_encoding: str) -> dict[str, float]:
+    codings = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            codings[name.strip().lower()] = q
+    return codings
+
+
+def accepts_encoding(accept_encoding: str | None, coding: str) -> bool:
+    """True if an Accept-Encoding header value allows `coding` (q > 0, explicitly or via *)."""
+    if not accept_encoding:
+        return False
+    codings = _accepted_codings(accept_encoding)
+    return codings.get(coding, codings.get("*", 0.0)) > 0
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """Pick "br", "gzip" or None for an Accept-Encoding header value."""
+    if not accept_encoding:
+        return None
+    codings = _accepted_codings(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    if brotli is not None and codings.get("br", wildcard) > 0:
+        return "br"
+    if codings.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    raise ValueError(f"Unsupported encoding: {encoding}")
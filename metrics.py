@@ -0,0 +1,264 @@
+"""
+In-process metrics in the Prometheus text format, shared by server.py,
+contest_server.py and contest_server_async.py (GET /api/metrics).
+
+- http_*     per-route latency, status codes, request/response sizes and
+             time spent serializing (JSON encoding, compression)
+- mongodb_*  per-command duration, outcome and document sizes, recorded by
+             the pymongo CommandListener from mongo_listener() (sizes are
+             sampled, see MONGO_SIZE_SAMPLE_EVERY)
+- cache_*    hits, misses and evictions of the doc_cache read-through caches
+
+Routes are labelled by their pattern (e.g. /api/contest/data), never the
+raw URL, to keep the number of series bounded. Values are per process;
+scrape every worker (or sum them) when running several.
+
+Set METRICS_TOKEN to require `Authorization: Bearer <token>` on the endpoint.
+"""
+
+from __future__ import annotations
+
+import hmac
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterator
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+# BSON-encoding a command just to size it costs about as much as pymongo's own
+# encoding, so only every Nth command (and its reply) is sized.
+MONGO_SIZE_SAMPLE_EVERY = max(int(os.getenv("MONGO_SIZE_SAMPLE_EVERY", "50")), 1)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 500, 1000, 10000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative buckets as Prometheus expects; each observation is one bisect."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                labels = _format_labels(self.labels, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Counter | Histogram] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> bytes:
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route, method and status code.",
+    ("route", "method", "status")))
+HTTP_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time from request start until the response was produced.",
+    ("route", "method")))
+HTTP_REQUEST_SIZE = REGISTRY.register(Histogram(
+    "http_request_size_bytes", "Request body size.", ("route", "method"), SIZE_BUCKETS))
+HTTP_RESPONSE_SIZE = REGISTRY.register(Histogram(
+    "http_response_size_bytes", "Response body size as sent (after compression).",
+    ("route", "method"), SIZE_BUCKETS))
+HTTP_SERIALIZATION = REGISTRY.register(Histogram(
+    "http_serialization_seconds", "Time spent encoding response bodies (stage=json|compress).",
+    ("route", "stage"), FAST_BUCKETS))
+
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "cache_requests_total", "Read-through cache lookups (result=hit|miss|coalesced).", ("cache", "result")))
+CACHE_EVICTIONS = REGISTRY.register(Counter(
+    "cache_evictions_total", "Entries dropped to stay within the cache's byte budget.", ("cache",)))
+
+MONGO_DURATION = REGISTRY.register(Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command round trip as reported by the driver.",
+    ("command", "collection", "outcome")))
+MONGO_COMMAND_SIZE = REGISTRY.register(Histogram(
+    "mongodb_command_size_bytes", "BSON size of the command sent (every MONGO_SIZE_SAMPLE_EVERY-th command).",
+    ("command", "collection"), SIZE_BUCKETS))
+MONGO_REPLY_SIZE = REGISTRY.register(Histogram(
+    "mongodb_reply_size_bytes", "BSON size of successful replies (of the sampled commands).",
+    ("command", "collection"), SIZE_BUCKETS))
+MONGO_REPLY_DOCUMENTS = REGISTRY.register(Histogram(
+    "mongodb_reply_documents", "Documents returned per reply (cursor batch or findAndModify value).",
+    ("command", "collection"), COUNT_BUCKETS))
+
+
+def observe_request(route: str, method: str, status: int, seconds: float,
+                    request_bytes: int = 0, response_bytes: int = 0) -> None:
+    HTTP_REQUESTS.inc(route=route, method=method, status=str(status))
+    HTTP_DURATION.observe(seconds, route=route, method=method)
+    if request_bytes:
+        HTTP_REQUEST_SIZE.observe(request_bytes, route=route, method=method)
+    HTTP_RESPONSE_SIZE.observe(response_bytes, route=route, method=method)
+
+
+@contextmanager
+def timed_serialization(route: str, stage: str) -> Iterator[None]:
+    """`with timed_serialization(route, "json"): body = json.dumps(...)`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        HTTP_SERIALIZATION.observe(time.perf_counter() - started, route=route, stage=stage)
+
+
+def authorized(authorization: str | None) -> bool:
+    """True if the metrics endpoint may be served for this Authorization header."""
+    if not METRICS_TOKEN:
+        return True
+    # Constant-time, so the token cannot be guessed from response timings.
+    return hmac.compare_digest((authorization or "").encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8"))
+
+
+def _command_target(command_name: str, command) -> str:
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    return command.get("collection", "") if command_name == "getMore" else ""
+
+
+def _reply_documents(reply) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", ())))
+    if "value" in reply:
+        return 0 if reply["value"] is None else 1
+    return 0
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def mongo_listener():
+    """
+    A pymongo CommandListener feeding the mongodb_* metrics; pass it as
+    MongoClient(event_listeners=[...]). pymongo is only imported here, so
+    importing this module stays cheap.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+
+        import bson
+        from pymongo import monitoring
+
+        class CommandMetrics(monitoring.CommandListener):
+            def __init__(self) -> None:
+                self._pending: dict[int, tuple[str, bool]] = {}  # request_id -> (collection, sized)
+                self._commands = 0
+
+            def started(self, event) -> None:
+                collection = _command_target(event.command_name, event.command)
+                self._commands += 1
+                sized = self._commands % MONGO_SIZE_SAMPLE_EVERY == 0
+                self._pending[event.request_id] = (collection, sized)
+                if sized:
+                    try:
+                        size = len(bson.encode(event.command))
+                    except Exception:
+                        return
+                    MONGO_COMMAND_SIZE.observe(size, command=event.command_name, collection=collection)
+
+            def succeeded(self, event) -> None:
+                collection, sized = self._pending.pop(event.request_id, ("", False))
+                MONGO_DURATION.observe(event.duration_micros / 1e6, command=event.command_name,
+                                       collection=collection, outcome="ok")
+                MONGO_REPLY_DOCUMENTS.observe(_reply_documents(event.reply), command=event.command_name,
+                                              collection=collection)
+                if sized:
+                    try:
+                        size = len(bson.encode(event.reply))
+                    except Exception:
+                        return
+                    MONGO_REPLY_SIZE.observe(size, command=event.command_name, collection=collection)
+
+            def failed(self, event) -> None:
+                collection, _ = self._pending.pop(event.request_id, ("", False))
+                MONGO_DURATION.observe(event.duration_micros / 1e6, command=event.command_name,
+                                       collection=collection, outcome="error")
+
+        _listener = CommandMetrics()
+        return _listener
@@ -0,0 +1,161 @@
+"""
+Prerequisite DAG for Skill Tree levels.
+
+Mirrors the unlock rules of updateUnlockStatus() in app.js:
+  - complete / in-progress levels keep their status;
+  - a level with `prereqs` unlocks when all of them are complete;
+  - a level without prereqs unlocks when the previous level of its zone is
+    complete; the first level of a zone unlocks when 70% of the previous
+    zone is complete (the very first level is always unlocked).
+
+The graph is built and validated (dangling prereqs, cycles) once, with
+reverse-dependency lists, so completing a level only re-evaluates the
+levels that depend on it instead of rescanning every zone.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+
+LOCKED = "locked"
+UNLOCKED = "unlocked"
+IN_PROGRESS = "in-progress"
+COMPLETE = "complete"
+
+ZONE_UNLOCK_THRESHOLD = 0.7
+
+
+class DagError(ValueError):
+    """The curriculum's prerequisites do not form a valid DAG."""
+
+
+class ProgressDag:
+    def __init__(self, zones: list[dict]) -> None:
+        self.order: list[str] = []  # level ids in document order
+        self.zone_of: dict[str, int] = {}
+        self.zone_levels: list[list[str]] = []
+        self.prereqs: dict[str, tuple[str, ...]] = {}
+        # Rule used for levels without explicit prereqs.
+        self.implicit: dict[str, tuple[str, int | str | None]] = {}
+        self.dependents: dict[str, list[str]] = {}
+
+        for zi, zone in enumerate(zones):
+            ids = []
+            for level in zone.get("levels", []):
+                level_id = level["id"]
+                if level_id in self.zone_of:
+                    raise DagError(f"Duplicate level id: {level_id}")
+                self.zone_of[level_id] = zi
+                self.order.append(level_id)
+                ids.append(level_id)
+                self.prereqs[level_id] = tuple(level.get("prereqs") or ())
+            self.zone_levels.append(ids)
+
+        for level_id in self.order:
+            deps = self.prereqs[level_id]
+            for dep in deps:
+                if dep not in self.zone_of:
+                    raise DagError(f"{level_id} has unknown prereq {dep}")
+            if not deps:
+                zi = self.zone_of[level_id]
+                li = self.zone_levels[zi].index(level_id)
+                if li > 0:
+                    self.implicit[level_id] = ("previous", self.zone_levels[zi][li - 1])
+                    deps = (self.zone_levels[zi][li - 1],)
+                elif zi > 0:
+                    self.implicit[level_id] = ("zone", zi - 1)
+                    deps = tuple(self.zone_levels[zi - 1])
+                else:
+                    self.implicit[level_id] = ("root", None)
+            for dep in deps:
+                self.dependents.setdefault(dep, []).append(level_id)
+
+        self._check_acyclic()
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "ProgressDag":
+        return cls(doc.get("zones", []))
+
+    def _check_acyclic(self) -> None:
+        # Kahn's algorithm over the effective dependency edges.
+        indegree = {level_id: 0 for level_id in self.order}
+        for level_id in self.order:
+            for dep in self.dependents.get(level_id, ()):
+                indegree[dep] += 1
+        ready = deque(level_id for level_id, n in indegree.items() if n == 0)
+        seen = 0
+        while ready:
+            level_id = ready.popleft()
+            seen += 1
+            for dep in self.dependents.get(level_id, ()):
+                indegree[dep] -= 1
+                if indegree[dep] == 0:
+                    ready.append(dep)
+        if seen != len(self.order):
+            stuck = sorted(level_id for level_id, n in indegree.items() if n > 0)
+            raise DagError(f"Prerequisite cycle involving: {', '.join(stuck)}")
+
+    def unlockable(self, level_id: str, statuses: dict[str, str]) -> bool:
+        """Whether the level's prerequisites are satisfied."""
+        deps = self.prereqs[level_id]
+        if deps:
+            return all(statuses.get(dep) == COMPLETE for dep in deps)
+        rule, arg = self.implicit[level_id]
+        if rule == "root":
+            return True
+        if rule == "previous":
+            return statuses.get(arg) == COMPLETE
+        zone = self.zone_levels[arg]
+        done = sum(1 for dep in zone if statuses.get(dep) == COMPLETE)
+        return done >= int(len(zone) * ZONE_UNLOCK_THRESHOLD)
+
+    def evaluate(self, level_id: str, statuses: dict[str, str]) -> str:
+        status = statuses.get(level_id, LOCKED)
+        if status in (COMPLETE, IN_PROGRESS):
+            return status
+        return UNLOCKED if self.unlockable(level_id, statuses) else LOCKED
+
+    def evaluate_all(self, statuses: dict[str, str]) -> dict[str, str]:
+        """Statuses that differ from a full evaluation (used when no delta is known)."""
+        current = dict(statuses)
+        changed = {}
+        for level_id in self.order:
+            status = self.evaluate(level_id, current)
+            if status != current.get(level_id):
+                current[level_id] = changed[level_id] = status
+        return changed
+
+    def propagate(self, statuses: dict[str, str], touched: list[str]) -> dict[str, str]:
+        """
+        Re-evaluate only what depends on the `touched` levels, whose statuses
+        in `statuses` are already updated. Returns {level_id: new_status}
+        for every level whose status changes, `touched` included.
+        """
+        current = dict(statuses)
+        changed = {}
+        queue = deque()
+        for level_id in touched:
+            if level_id not in self.zone_of:
+                continue
+            status = self.evaluate(level_id, current)
+            if status != statuses.get(level_id):
+                changed[level_id] = status
+            current[level_id] = status
+            queue.extend(self.dependents.get(level_id, ()))
+
+        visited = set()
+        while queue:
+            level_id = queue.popleft()
+            if level_id in visited:
+                continue
+            visited.add(level_id)
+            before = current.get(level_id)
+            status = self.evaluate(level_id, current)
+            if status == before:
+                continue
+            current[level_id] = changed[level_id] = status
+            # Unlock rules only look at completion, which evaluate() never
+            # changes, but keep walking in case that ever stops being true.
+            if (status == COMPLETE) != (before == COMPLETE):
+                queue.extend(self.dependents.get(level_id, ()))
+        return changed
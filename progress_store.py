@@ -0,0 +1,287 @@
+"""
+In-memory progress document with write-behind persistence.
+
+The parsed document, its served JSON bytes and ETag live in an immutable
+Snapshot. Readers just grab the current snapshot (copy-on-write, no lock),
+so a GET never waits behind a writer and never touches the disk. Writers
+swap in a new snapshot and wake a flusher thread, which coalesces rapid
+successive writes into one fsync'd atomic file write.
+
+Edits made to the file outside this process are picked up by comparing its
+inode and mtime, checked at most once per `stat_interval` seconds.
+
+Shared mode (`shared=True`, for several server processes on one file):
+writes go straight to disk under an exclusive lock on `<file>.lock`,
+read-modify-write re-reads the file inside that lock, and every read
+checks the file's inode/mtime, so no process serves or builds on a stale
+copy. This gives up the write-behind coalescing.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator
+
+from http_cache import compress, content_etag
+
+
+def read_json(path: Path) -> dict:
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def atomic_write_json(path: Path, data: dict) -> None:
+    # Per-process temp name: concurrent writers never share a half-written file.
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8", newline="\n") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def create_json(path: Path, data: dict) -> bool:
+    """Write `path` only if it does not exist yet (atomically); returns True if this call created it."""
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    atomic_write_json(tmp, data)  # fsync'd copy under a private name...
+    try:
+        os.link(tmp, path)  # ...published only if nobody else got there first
+        return True
+    except FileExistsError:
+        return False
+    finally:
+        tmp.unlink()
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Exclusive advisory lock on `path` (created if missing), held across processes. POSIX only."""
+    import fcntl
+
+    with open(path, "a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _disk_stamp(path: Path) -> tuple[int, int] | None:
+    """(inode, mtime_ns): every atomic replace changes the inode, even within one mtime tick."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One immutable version of the document. Never mutate `data`."""
+
+    data: dict
+    body: bytes
+    etag: str
+    _encoded: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @classmethod
+    def of(cls, data: dict) -> "Snapshot":
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        return cls(data, body, content_etag(body))
+
+    def encoded(self, encoding: str) -> bytes:
+        """Compressed body, computed once per snapshot and encoding."""
+        cached = self._encoded.get(encoding)
+        if cached is None:
+            cached = self._encoded[encoding] = compress(self.body, encoding)
+        return cached
+
+
+class ProgressStore:
+    def __init__(
+        self,
+        path: Path,
+        seed: Callable[[], dict],
+        flush_delay: float = 0.25,
+        stat_interval: float = 1.0,
+        shared: bool = False,
+    ) -> None:
+        self.path = path
+        self.etag_path = path.with_name(path.name + ".etag")
+        self.lock_path = path.with_name(path.name + ".lock")
+        self.shared = shared
+        self._seed = seed
+        self.flush_delay = flush_delay
+        self.stat_interval = stat_interval
+
+        self._snapshot: Snapshot | None = None
+        self._disk_stamp: tuple[int, int] | None = None
+        self._last_stat = 0.0
+        self._version = 0  # bumped by every put()
+        self._written_version = -1
+        self._dirty = False
+        self._closed = False
+        self._lock = threading.Lock()  # guards the snapshot swap and dirty flag
+        self._io_lock = threading.Lock()  # serializes file writes
+        self._update_lock = threading.Lock()  # serializes put()/update()
+        self._wake = threading.Condition(self._lock)
+        self._flusher: threading.Thread | None = None
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self) -> Snapshot:
+        snap = self._snapshot
+        if snap is not None and not self._disk_changed():
+            return snap
+        with self._lock:
+            if self._snapshot is None or (not self._dirty and self._disk_changed(force=True)):
+                self._load()
+            return self._snapshot
+
+    def _disk_changed(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and not self.shared and now - self._last_stat < self.stat_interval:
+            return False
+        self._last_stat = now
+        return _disk_stamp(self.path) != self._disk_stamp
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            seed = Snapshot.of(self._seed())
+            if not self.shared:
+                # Persist right away if we just generated from seed/minimal.
+                self._snapshot = seed
+                self._write(self._version, seed)
+                return
+            # Another process may be seeding (or already writing) it: the first
+            # file wins and everyone reads that one.
+            with self._io_lock:
+                create_json(self.path, seed.data)
+        with self._io_lock:
+            snap = Snapshot.of(read_json(self.path))
+            self._disk_stamp = _disk_stamp(self.path)
+            if self._stored_etag() != snap.etag:
+                self._write_etag(snap.etag)
+        self._snapshot = snap
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """The cross-process write lock in shared mode; within a process _update_lock already serializes."""
+        if not self.shared:
+            yield
+            return
+        with file_lock(self.lock_path):
+            yield
+
+    # -- writes --------------------------------------------------------------
+
+    @property
+    def dirty(self) -> bool:
+        """True while a put() has not reached the disk yet (queued or being written)."""
+        return self._dirty or 0 < self._version != self._written_version
+
+    def put(self, data: dict) -> Snapshot:
+        """Replace the document; it reaches the disk within `flush_delay` seconds (at once if shared)."""
+        with self._update_lock, self._exclusive():
+            return self._put(data)
+
+    def update(self, fn: Callable[[Snapshot], dict]) -> Snapshot:
+        """
+        Read-modify-write: `fn` gets the current snapshot and returns a new
+        document (without mutating the old one). Updates never interleave.
+        """
+        with self._update_lock, self._exclusive():
+            return self._put(fn(self.get()))
+
+    def _put(self, data: dict) -> Snapshot:
+        snap = Snapshot.of(data)
+        if self.shared:
+            # Write-through: the other processes read the file, not our memory.
+            with self._lock:
+                self._version += 1
+                version = self._version
+            self._write(version, snap)
+            self._snapshot = snap
+            return snap
+        with self._lock:
+            self._snapshot = snap
+            self._version += 1
+            self._dirty = True
+            closed = self._closed
+            if not closed:
+                self._ensure_flusher()
+                self._wake.notify()
+        if closed:
+            self.flush()  # no flusher any more; write through
+        return snap
+
+    def flush(self) -> None:
+        """Write any pending snapshot now."""
+        pending = self._take_pending()
+        if pending is not None:
+            self._write(*pending)
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _take_pending(self) -> tuple[int, Snapshot] | None:
+        with self._lock:
+            if not self._dirty:
+                return None
+            self._dirty = False
+            return self._version, self._snapshot
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name="progress-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while not self._dirty and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                # Let a burst of POSTs land, then write only the latest one.
+                self._wake.wait(self.flush_delay)
+            self.flush()
+
+    def _write(self, version: int, snap: Snapshot) -> None:
+        # Disk I/O happens outside self._lock so writers are never blocked by it.
+        with self._io_lock:
+            if version <= self._written_version:
+                return  # a newer snapshot is already on disk
+            atomic_write_json(self.path, snap.data)
+            self._disk_stamp = _disk_stamp(self.path)
+            self._write_etag(snap.etag)
+            self._written_version = version
+
+    # -- ETag sidecar ----------------------------------------------------------
+
+    def _write_etag(self, etag: str) -> None:
+        st = self.path.stat()
+        atomic_write_json(self.etag_path, {"etag": etag, "mtime_ns": st.st_mtime_ns, "size": st.st_size})
+
+    def _stored_etag(self) -> str | None:
+        """ETag from the sidecar, if it still describes the current file."""
+        try:
+            meta = read_json(self.etag_path)
+            st = self.path.stat()
+        except (OSError, ValueError):
+            return None
+        if meta.get("mtime_ns") != st.st_mtime_ns or meta.get("size") != st.st_size:
+            return None  # the file was edited by hand
+        return meta.get("etag")
@@ -2,53 +2,102 @@
 Tiny local server for Skill Tree Dashboard.
 
 - Serves static files from this folder (index.html, app.js, styles.css, etc.)
-- Persists all progress into ONE real file: progress.json
+  over HTTP/1.1 keep-alive with sendfile(), precompressed .br/.gz sidecars,
+  ETag/Last-Modified revalidation and immutable caching of fingerprinted
+  names (see static_files.py). With a build from build_assets.py in dist/,
+  its minified, fingerprinted files are served first. `--dev` (or
+  STATIC_DEV=1) serves the plain source files with Cache-Control: no-store
+  instead, for editing JS/CSS.
+- Persists progress into real files, kept in memory and written behind
+  (see progress_store.py):
+    progress.json                      -> the default (single-user) document
+    progress/<shard>/<user>.json       -> one document per user key
+  The per-user files (and every .etag/.lock/.tmp file) are never served as
+  static files; PROGRESS_DATA_DIR keeps them outside this folder altogether.
 
 Endpoints:
-  GET  /progress  -> returns JSON from progress.json (creates it if missing)
-  POST /progress  -> overwrites progress.json with provided JSON
+  GET  /progress[?user=]  -> returns the JSON document (creates it if missing);
+                             honours If-None-Match and Accept-Encoding (gzip/br)
+  POST /progress[?user=]  -> overwrites the document with provided JSON
+  PATCH /progress[?user=] -> updates status/notes/journal/XP for zone-id/level-id paths
+                             (see curriculum.apply_patch; honours strong If-Match) and
+                             answers with only the statuses that changed, including
+                             levels unlocked or re-locked downstream (progress_dag.py)
+  GET  /progress/state[?user=] -> per-user state only (statuses, user, settings)
+  GET  /curriculum[?v=]   -> static zones/levels text; immutable when ?v= is its ETag
+  GET  /api/a2oj/problems?category=&difficulty=&page= -> filtered, paginated A2OJ problems
+                             (see a2oj_catalog.Catalog.query for all filters)
+  GET  /api/a2oj/lists    -> ladder/category metadata without problems
+  GET  /api/metrics       -> Prometheus metrics: per-route latency, status, sizes (metrics.py)
+
+`--workers N` pre-forks N server processes that each bind the port with
+SO_REUSEPORT (the kernel spreads connections over them), so JSON work is
+not serialized by one GIL. The progress files are then shared: writes go
+straight to disk under a file lock (ProgressStore shared mode). The parent
+only supervises: it restarts workers that die and, on SIGTERM/Ctrl-C, lets
+them finish in-flight requests before exiting. Metrics are per worker.
 """
 
 from __future__ import annotations
 
+import argparse
+import email.utils
+import hashlib
 import json
 import os
+import re
+import signal
+import socket
 import threading
+import time
+import traceback
+from collections import OrderedDict
+from contextlib import AbstractContextManager, contextmanager
 from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from urllib.parse import urlparse
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+from a2oj_catalog import CatalogQueryError, get_catalog
+from curriculum import PatchError, apply_patch, level_statuses, set_statuses, split_curriculum, state_view
+import metrics
+from http_cache import MIN_COMPRESS_SIZE, choose_encoding, etag_matches, negotiated_etag, strong_etag_matches
+from progress_dag import COMPLETE, IN_PROGRESS, LOCKED, DagError, ProgressDag
+from progress_store import ProgressStore, Snapshot, read_json
+from static_files import StaticFiles
 
 
 ROOT = Path(__file__).resolve().parent
 PROGRESS_PATH = ROOT / "progress.json"
 SEED_EXPORT_PATH = ROOT / "skilltree-progress-2025-11-26.json"
-
-_lock = threading.Lock()
-
-
-def _read_json(path: Path) -> dict:
-    with path.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _atomic_write_json(path: Path, data: dict) -> None:
-    tmp = path.with_suffix(path.suffix + ".tmp")
-    with tmp.open("w", encoding="utf-8", newline="\n") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-    os.replace(tmp, path)
-
-
-def _ensure_progress_file() -> dict:
+# Per-user documents; PROGRESS_DATA_DIR moves them out of the served tree.
+PROGRESS_DIR = Path(os.getenv("PROGRESS_DATA_DIR") or ROOT / "progress").resolve()
+BUILD_DIR = ROOT / "dist"
+
+USER_KEY_RE = re.compile(r"^[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}$")
+# The A2OJ datasets only change when the files are redeployed.
+A2OJ_CACHE_CONTROL = "public, max-age=3600"
+# Idle per-user stores kept in memory; least recently used ones are dropped.
+MAX_CACHED_USERS = 256
+# Seconds a stopping server waits for in-flight requests (and the supervisor for its workers).
+SHUTDOWN_GRACE = 10.0
+# A worker that dies sooner than this after starting is restarted after a pause (no crash loop).
+MIN_WORKER_UPTIME = 1.0
+# Store bookkeeping next to the documents (ETag sidecars, lock files, half-written temp files).
+PRIVATE_SUFFIXES = (".etag", ".lock", ".tmp")
+# Metrics label for each API path; everything else is reported as "static".
+API_ROUTES = frozenset({
+    "/progress", "/progress/state", "/curriculum", "/api/a2oj/problems", "/api/a2oj/lists", "/api/metrics",
+})
+
+
+def _seed_progress() -> dict:
     """
-    Ensure progress.json exists and return its contents.
-    If missing, create it from the existing exported JSON (seed file).
+    Contents for a missing progress.json: the existing exported JSON (seed file),
+    or a minimal empty document.
     """
-    if PROGRESS_PATH.exists():
-        return _read_json(PROGRESS_PATH)
-
     if SEED_EXPORT_PATH.exists():
-        seed = _read_json(SEED_EXPORT_PATH)
+        seed = read_json(SEED_EXPORT_PATH)
         # Normalize: make sure settings exist so front-end can persist them in same file.
         if "settings" not in seed or not isinstance(seed.get("settings"), dict):
             seed["settings"] = {"shortcutsEnabled": True, "view": "grid"}
@@ -63,35 +112,347 @@ def _ensure_progress_file() -> dict:
     }
 
 
+def _fresh_progress() -> dict:
+    """Seed for a new user key: same curriculum, progress reset (first level unlocked)."""
+    data = _seed_progress()
+    for zi, zone in enumerate(data.get("zones", [])):
+        for li, level in enumerate(zone.get("levels", [])):
+            level["status"] = "unlocked" if zi == 0 and li == 0 else "locked"
+    data["user"] = {"current_xp": 0, "level": 1, "badges": [], "notes": {}, "journal": {}, "lastVisit": None, "streakDays": 0}
+    return data
+
+
+def _user_progress_path(user: str) -> Path:
+    shard = hashlib.sha1(user.encode("utf-8")).hexdigest()[:2]
+    return PROGRESS_DIR / shard / f"{user}.json"
+
+
+_curriculum: Snapshot | None = None
+
+
+def _curriculum_snapshot() -> Snapshot:
+    """The curriculum never changes while the server runs; build it once."""
+    global _curriculum
+    if _curriculum is None:
+        _curriculum = Snapshot.of(split_curriculum(_seed_progress()))
+    return _curriculum
+
+
+_dag: ProgressDag | None = None
+
+
+def _progress_dag() -> ProgressDag:
+    """Prerequisite graph of the curriculum, validated once (raises DagError)."""
+    global _dag
+    if _dag is None:
+        _dag = ProgressDag.from_document(_curriculum_snapshot().data)
+    return _dag
+
+
+_store = ProgressStore(PROGRESS_PATH, _seed_progress)
+_user_stores: OrderedDict[str, ProgressStore] = OrderedDict()
+_user_holders: dict[str, int] = {}  # user -> requests using its store right now
+_user_stores_lock = threading.Lock()
+# Set before forking workers: every store then locks and writes through (see progress_store.py).
+_shared_stores = False
+
+
+@contextmanager
+def _store_for(user: str | None) -> Iterator[ProgressStore]:
+    """
+    Store for a user key (None -> the default progress.json), held for the
+    with-block. Each user has its own locks and flusher, so users never wait
+    on each other. Only stores nobody holds are evicted: a request never
+    writes through a store that a newer one for the same file has replaced.
+    """
+    if user is None:
+        yield _store
+        return
+    with _user_stores_lock:
+        store = _user_stores.get(user)
+        if store is not None:
+            _user_stores.move_to_end(user)
+            evicted = []
+        else:
+            path = _user_progress_path(user)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            store = _user_stores[user] = ProgressStore(path, _fresh_progress, shared=_shared_stores)
+            idle = [key for key, s in _user_stores.items() if key != user and key not in _user_holders and not s.dirty]
+            evicted = [_user_stores.pop(key) for key in idle[: max(len(_user_stores) - MAX_CACHED_USERS, 0)]]
+        _user_holders[user] = _user_holders.get(user, 0) + 1
+    for old in evicted:
+        old.close()
+    try:
+        yield store
+    finally:
+        with _user_stores_lock:
+            if _user_holders[user] == 1:
+                del _user_holders[user]
+            else:
+                _user_holders[user] -= 1
+
+
+def _close_stores() -> None:
+    with _user_stores_lock:
+        stores = [_store, *_user_stores.values()]
+    for store in stores:
+        store.close()
+
+
+def _is_private(path: str) -> bool:
+    """Progress documents (per-user, served only via /progress?user=) and store bookkeeping files."""
+    real = Path(os.path.realpath(path))
+    return real.name.endswith(PRIVATE_SUFFIXES) or real == PROGRESS_DIR or PROGRESS_DIR in real.parents
+
+
 class Handler(SimpleHTTPRequestHandler):
+    # Keep-alive: every response carries a Content-Length (or closes the connection).
+    protocol_version = "HTTP/1.1"
+    # Seconds an idle keep-alive connection may hold its thread.
+    timeout = 30
+    # None: development mode, static files go through the stock handler with no-store.
+    static: StaticFiles | None = StaticFiles(BUILD_DIR)
+    # Per-response override of the default no-store policy (see end_headers).
+    _cache_control: str | None = None
+    # Per-request bookkeeping for metrics.py (see handle_one_request).
+    _started: float | None = None
+    _status: int | None = None
+    _response_bytes = 0
+
     # Keep logs readable
     def log_message(self, format: str, *args) -> None:  # noqa: A002
         super().log_message(format, *args)
 
+    def handle_one_request(self) -> None:
+        # One handler serves every request of a keep-alive connection: nothing carries over.
+        self._started = self._status = self._cache_control = None
+        self._response_bytes = 0
+        try:
+            super().handle_one_request()
+        finally:
+            if self._started is not None:
+                _active.finish()
+        if self._started is not None and self._status is not None:
+            try:
+                request_bytes = int(self.headers.get("Content-Length", "0"))
+            except (AttributeError, ValueError):
+                request_bytes = 0
+            metrics.observe_request(self._route(), self.command or "", self._status,
+                                    time.perf_counter() - self._started, request_bytes, self._response_bytes)
+
+    def parse_request(self) -> bool:
+        # Timed from here, not from accept: keep-alive connections idle in readline().
+        self._started = time.perf_counter()
+        _active.start()
+        return super().parse_request()
+
+    def send_response(self, code: int, message: str | None = None) -> None:
+        self._status = code
+        super().send_response(code, message)
+
+    def send_header(self, keyword: str, value: str) -> None:
+        if keyword.lower() == "content-length":
+            self._response_bytes = int(value)
+        super().send_header(keyword, value)
+
+    def _route(self) -> str:
+        path = urlparse(self.path).path
+        return path if path in API_ROUTES else "static"
+
+    def _snapshot_of(self, obj: dict) -> Snapshot:
+        with metrics.timed_serialization(self._route(), "json"):
+            return Snapshot.of(obj)
+
     def end_headers(self) -> None:
-        # Avoid stale JS/CSS during local development
-        self.send_header("Cache-Control", "no-store")
-        self.send_header("Pragma", "no-cache")
-        self.send_header("Expires", "0")
+        if self._cache_control:
+            self.send_header("Cache-Control", self._cache_control)
+        else:
+            # Avoid stale JS/CSS during local development
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Pragma", "no-cache")
+            self.send_header("Expires", "0")
         super().end_headers()
 
+    def translate_path(self, path: str) -> str:
+        source = super().translate_path(path)
+        return self.static.locate(ROOT, source) if self.static is not None else source
+
+    def send_head(self):
+        """Static files in production mode; directories, listings and errors go to the stock handler."""
+        path = self.translate_path(self.path)
+        if _is_private(path):
+            self.send_error(404, "File not found")
+            return None
+        if self.static is None or (path.endswith("/") and not os.path.isdir(path)):
+            return super().send_head()
+        if os.path.isdir(path):
+            if not urlparse(self.path).path.endswith("/"):
+                return super().send_head()  # redirect to the slash URL
+            path = os.path.join(path, "index.html")
+
+        found = self.static.resolve(Path(path), self.headers.get("Accept-Encoding"))
+        if found is None:
+            return super().send_head()
+        try:
+            f = open(found.path, "rb")
+        except OSError:
+            return super().send_head()
+
+        self._cache_control = found.cache_control
+        if self._not_modified(found.etag, found.mtime):
+            f.close()
+            self.send_response(304)
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", self.guess_type(path))
+            self.send_header("Content-Length", str(found.size))
+            if found.encoding:
+                self.send_header("Content-Encoding", found.encoding)
+        self.send_header("ETag", found.etag)
+        self.send_header("Last-Modified", self.date_time_string(found.mtime))
+        if found.has_variants:
+            self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        return None if f.closed else f
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        """If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)."""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag_matches(if_none_match, etag)
+        try:
+            since = email.utils.parsedate_to_datetime(self.headers.get("If-Modified-Since", ""))
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since.timestamp()
+
+    def copyfile(self, source, outputfile) -> None:
+        # Zero-copy from the page cache to the socket; falls back to read/send where unsupported.
+        if self.static is not None and outputfile is self.wfile:
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+
     def _send_json(self, status: int, obj: dict) -> None:
-        body = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        self._send_snapshot(status, self._snapshot_of(obj))
+
+    def _send_snapshot(self, status: int, snap: Snapshot, etag: str | None = None) -> None:
+        body = snap.body
+        encoding = choose_encoding(self.headers.get("Accept-Encoding"))
+        if encoding is not None and len(body) >= MIN_COMPRESS_SIZE:
+            with metrics.timed_serialization(self._route(), "compress"):
+                body = snap.encoded(encoding)
+        else:
+            encoding = None
         self.send_response(status)
         self.send_header("Content-Type", "application/json; charset=utf-8")
         self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+        if etag:
+            self.send_header("ETag", etag)
         self.end_headers()
         self.wfile.write(body)
 
+    def _progress_store(self, query: str) -> AbstractContextManager[ProgressStore] | None:
+        """Hold on the store addressed by ?user= (see _store_for), or None after sending a 400 for a bad key."""
+        users = parse_qs(query).get("user")
+        if not users:
+            return _store_for(None)
+        user = users[0].strip()
+        if not USER_KEY_RE.match(user):
+            self.send_error(400, "Invalid user key")
+            return None
+        return _store_for(user)
+
+    def _read_json_body(self) -> tuple[bool, object]:
+        """(ok, payload); sends a 400 and returns (False, None) on invalid JSON."""
+        try:
+            length = int(self.headers.get("Content-Length", "0"))
+        except ValueError:
+            length = 0
+
+        raw = self.rfile.read(length) if length > 0 else b""
+        try:
+            return True, json.loads(raw.decode("utf-8") if raw else "null")
+        except json.JSONDecodeError:
+            self.send_error(400, "Invalid JSON")
+            return False, None
+
+    def _send_not_modified(self, etag: str) -> None:
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.end_headers()
+
+    def _send_validated(self, snap: Snapshot, cache_control: str) -> None:
+        """200 with the snapshot, or 304 if the client's copy is current."""
+        self._cache_control = cache_control
+        # Also weak on a 304 or a body too small to compress: the validator follows the negotiation.
+        etag = negotiated_etag(snap.etag, choose_encoding(self.headers.get("Accept-Encoding")))
+        if etag_matches(self.headers.get("If-None-Match"), snap.etag):
+            self._send_not_modified(etag)
+            return
+        self._send_snapshot(200, snap, etag)
+
     def do_GET(self) -> None:  # noqa: N802
         parsed = urlparse(self.path)
         if parsed.path == "/progress":
-            with _lock:
-                data = _ensure_progress_file()
-                # Persist if we just generated from seed/minimal
-                if not PROGRESS_PATH.exists():
-                    _atomic_write_json(PROGRESS_PATH, data)
-            self._send_json(200, data)
+            held = self._progress_store(parsed.query)
+            if held is None:
+                return
+            with held as store:
+                snap = store.get()
+            # Let browsers keep a copy but revalidate it on every load.
+            self._send_validated(snap, "no-cache")
+            return
+
+        if parsed.path == "/progress/state":
+            held = self._progress_store(parsed.query)
+            if held is None:
+                return
+            with held as store:
+                data = store.get().data
+            # `curriculum` is the ?v= value for the immutable /curriculum URL.
+            state = self._snapshot_of(state_view(data, _curriculum_snapshot().etag.strip('"')))
+            self._send_validated(state, "no-cache")
+            return
+
+        if parsed.path == "/curriculum":
+            curriculum = _curriculum_snapshot()
+            versions = parse_qs(parsed.query).get("v")
+            if versions and f'"{versions[0]}"' == curriculum.etag:
+                self._send_validated(curriculum, "public, max-age=31536000, immutable")
+            else:
+                self._send_validated(curriculum, "no-cache")
+            return
+
+        if parsed.path == "/api/a2oj/problems":
+            params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            try:
+                result = get_catalog().query(params)
+            except CatalogQueryError as e:
+                self.send_error(400, str(e))
+                return
+            self._send_validated(self._snapshot_of(result), A2OJ_CACHE_CONTROL)
+            return
+
+        if parsed.path == "/api/a2oj/lists":
+            catalog = get_catalog()
+            body = {"generated": catalog.generated, "lists": catalog.list_summaries()}
+            self._send_validated(self._snapshot_of(body), A2OJ_CACHE_CONTROL)
+            return
+
+        if parsed.path == "/api/metrics":
+            if not metrics.authorized(self.headers.get("Authorization")):
+                self.send_error(401, "Unauthorized")
+                return
+            body = metrics.REGISTRY.render()
+            self.send_response(200)
+            self.send_header("Content-Type", metrics.CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
             return
 
         return super().do_GET()
@@ -101,40 +462,223 @@ class Handler(SimpleHTTPRequestHandler):
         if parsed.path != "/progress":
             self.send_error(404, "Not Found")
             return
+        held = self._progress_store(parsed.query)
+        if held is None:
+            return
 
-        try:
-            length = int(self.headers.get("Content-Length", "0"))
-        except ValueError:
-            length = 0
-
-        raw = self.rfile.read(length) if length > 0 else b""
-        try:
-            payload = json.loads(raw.decode("utf-8") if raw else "null")
-        except json.JSONDecodeError:
-            self.send_error(400, "Invalid JSON")
+        ok, payload = self._read_json_body()
+        if not ok:
             return
 
         if not isinstance(payload, dict) or "zones" not in payload or not isinstance(payload.get("zones"), list):
             self.send_error(400, "Invalid payload (expected object with zones: [])")
             return
 
-        # Enforce single-file persistence: overwrite the file atomically.
-        with _lock:
-            _atomic_write_json(PROGRESS_PATH, payload)
+        # One file per document: the store overwrites it atomically shortly
+        # after, coalescing bursts of saves.
+        with held as store:
+            snap = store.put(payload)
 
-        self._send_json(200, {"ok": True})
+        self._send_json(200, {"ok": True, "etag": snap.etag})
+
+    def do_PATCH(self) -> None:  # noqa: N802
+        parsed = urlparse(self.path)
+        if parsed.path != "/progress":
+            self.send_error(404, "Not Found")
+            return
+        held = self._progress_store(parsed.query)
+        if held is None:
+            return
+
+        ok, patch = self._read_json_body()
+        if not ok:
+            return
+
+        if_match = self.headers.get("If-Match")
+        changed: dict[str, str] = {}
+
+        def _apply(snap: Snapshot) -> dict:
+            if if_match and not strong_etag_matches(if_match, snap.etag):
+                raise PatchError("Progress changed since it was loaded", status=412)
+            new, touched = apply_patch(snap.data, patch)
+            if not touched:
+                return new
+
+            dag = _progress_dag()
+            before = level_statuses(snap.data)
+            statuses = level_statuses(new)
+            for level_id in touched:
+                if (statuses[level_id] in (IN_PROGRESS, COMPLETE)
+                        and before.get(level_id) == LOCKED
+                        and level_id in dag.zone_of
+                        and not dag.unlockable(level_id, statuses)):
+                    raise PatchError(f"{level_id} is locked", status=409)
+
+            # Only dependents of the touched levels are re-evaluated.
+            derived = dag.propagate(statuses, touched)
+            changed.update({level_id: statuses[level_id] for level_id in touched})
+            changed.update(derived)
+            return set_statuses(new, derived)
+
+        try:
+            with held as store:
+                snap = store.update(_apply)
+        except PatchError as e:
+            self.send_error(e.status, str(e))
+            return
+
+        self._send_json(200, {"ok": True, "etag": snap.etag, "levels": changed})
+
+
+class _ActiveRequests:
+    """Requests being handled (not idle keep-alive connections), so shutdown can wait for them."""
+
+    def __init__(self) -> None:
+        self._count = 0
+        self._idle = threading.Condition()
+
+    def start(self) -> None:
+        with self._idle:
+            self._count += 1
+
+    def finish(self) -> None:
+        with self._idle:
+            self._count -= 1
+            if not self._count:
+                self._idle.notify_all()
+
+    def wait(self, timeout: float) -> bool:
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._count, timeout)
+
+
+_active = _ActiveRequests()
+
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """A worker's listener; every worker binds the same port."""
+
+    def server_bind(self) -> None:
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _serve(httpd: ThreadingHTTPServer) -> None:
+    """Serve until SIGTERM or Ctrl-C, then let in-flight requests finish and flush the stores."""
+
+    def stop(signum, frame) -> None:
+        # shutdown() waits for serve_forever(), which runs in this (the signalled) thread.
+        threading.Thread(target=httpd.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        _active.wait(SHUTDOWN_GRACE)
+        _close_stores()
+
+
+def _supervise(host: str, port: int, workers: int) -> None:
+    """Fork `workers` servers sharing the port, restart any that die, stop them all on SIGTERM/SIGINT."""
+    # Bound but never listening: fails fast if the port is taken, keeps it ours
+    # between worker restarts and fixes the number when PORT=0.
+    reserved = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    reserved.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    reserved.bind((host, port))
+    port = reserved.getsockname()[1]
+
+    children: dict[int, float] = {}  # pid -> start time
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                reserved.close()
+                signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C reaches the whole group; the parent decides
+                _serve(ReusePortHTTPServer((host, port), Handler))
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"Serving on http://{host}:{port} with {workers} workers (supervisor pid {os.getpid()})", flush=True)
+
+    deadline = None
+    while children:
+        if stopping and deadline is None:
+            deadline = time.monotonic() + SHUTDOWN_GRACE + 1
+            for pid in children:
+                os.kill(pid, signal.SIGTERM)
+        elif deadline is not None and time.monotonic() > deadline:
+            print(f"[WARNING] killing {len(children)} worker(s) that did not stop in time", flush=True)
+            for pid in children:
+                os.kill(pid, signal.SIGKILL)
+            deadline = float("inf")
+
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            time.sleep(0.1)
+            continue
+        started = children.pop(pid, None)
+        if started is None or stopping:
+            continue
+        print(f"[WARNING] worker {pid} exited with status {os.waitstatus_to_exitcode(status)}; restarting",
+              flush=True)
+        if time.monotonic() - started < MIN_WORKER_UPTIME:
+            time.sleep(MIN_WORKER_UPTIME)
+        spawn()
+    reserved.close()
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Skill Tree dashboard server")
+    parser.add_argument("--dev", action="store_true", default=os.getenv("STATIC_DEV", "") not in ("", "0"),
+                        help="serve static files uncached (no-store), without sidecars or sendfile")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", 1)),
+                        help="pre-forked server processes sharing the port (default 1: no fork)")
+    args = parser.parse_args()
+    if args.dev:
+        Handler.static = None
+    if args.workers > 1 and not (hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")):
+        raise SystemExit("--workers needs fork() and SO_REUSEPORT; run a single process on this platform")
+
+    try:
+        _progress_dag()
+    except DagError as e:
+        raise SystemExit(f"Invalid curriculum prerequisites: {e}")
     os.chdir(ROOT)  # serve files from this folder
-    host = "127.0.0.1"
-    port = 8000
-    httpd = ThreadingHTTPServer((host, port), Handler)
-    print(f"Serving on http://{host}:{port}", flush=True)
+    host = os.getenv("HOST", "127.0.0.1")
+    port = int(os.getenv("PORT", 8000))
+    if Handler.static is not None and Handler.static.build_dir is not None:
+        print(f"Static build: {Handler.static.build_dir} ({len(Handler.static.immutable)} fingerprinted files)",
+              flush=True)
     print("Progress file:", str(PROGRESS_PATH), flush=True)
-    httpd.serve_forever()
+
+    if args.workers > 1:
+        global _shared_stores
+        _shared_stores = _store.shared = True
+        _supervise(host, port, args.workers)
+        return
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"Serving on http://{host}:{port}" + (" (dev: no-store)" if args.dev else ""), flush=True)
+    _serve(httpd)
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,125 @@
+"""
+Static file responses for server.py's production mode.
+
+- Precompressed sidecars: `app.js.br` / `app.js.gz` next to `app.js` are
+  sent with Content-Encoding when the client accepts them and the sidecar
+  is at least as new as the original (e.g. from `gzip -k` / `brotli -k`).
+- Strong validators: the ETag is a content hash of the bytes actually sent
+  (so each encoding has its own), computed once per file version and
+  remembered by (path, mtime, size); Last-Modified comes from the file.
+- Cache policy: fingerprinted names (`app.3f9a1c2b7d.js`) never change
+  content and are cached for a year as immutable; everything else may be
+  stored but is revalidated on each use (cheap 304s).
+- Build output: when `build_dir` holds an asset-manifest.json from
+  build_assets.py, files are looked up there first (rewritten pages,
+  minified data, hashed copies) and the manifest's hashed files are immutable.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from http_cache import accepts_encoding
+
+# name.<8-64 hex digits>.ext, as produced by content-hashing asset builds.
+FINGERPRINT_RE = re.compile(r"\.[0-9a-f]{8,64}\.[A-Za-z0-9]+$")
+MANIFEST_NAME = "asset-manifest.json"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+# Preferred first.
+SIDECARS = (("br", ".br"), ("gzip", ".gz"))
+
+
+@dataclass(frozen=True)
+class StaticFile:
+    path: Path             # what to send: the original or a sidecar
+    size: int
+    mtime: float
+    etag: str
+    encoding: str | None   # Content-Encoding of `path`
+    has_variants: bool     # response depends on Accept-Encoding
+    cache_control: str
+
+
+def is_fingerprinted(path: str | Path) -> bool:
+    return FINGERPRINT_RE.search(os.path.basename(path)) is not None
+
+
+class StaticFiles:
+    """Chooses what to send for a file on disk; safe to share between threads."""
+
+    def __init__(self, build_dir: Path | None = None) -> None:
+        self.build_dir: Path | None = None
+        self.immutable: frozenset[str] = frozenset()
+        self._etags: dict[str, tuple[int, int, str]] = {}  # path -> (mtime_ns, size, etag)
+        self._lock = threading.Lock()
+        manifest_path = build_dir / MANIFEST_NAME if build_dir is not None else None
+        if manifest_path is not None and manifest_path.is_file():
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            self.build_dir = build_dir
+            self.immutable = frozenset(
+                str(build_dir.joinpath(*asset["file"].split("/"))) for asset in manifest.get("assets", {}).values()
+            )
+
+    def locate(self, source_root: Path, path: str) -> str:
+        """`path` (inside source_root) mapped into the build output when the build has it."""
+        if self.build_dir is None:
+            return path
+        built = os.path.join(self.build_dir, os.path.relpath(path, source_root))
+        return built if os.path.exists(built) else path
+
+    def resolve(self, path: Path, accept_encoding: str | None) -> StaticFile | None:
+        """The representation of the regular file `path` to send, or None if it is not one."""
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+
+        chosen, chosen_st, encoding, has_variants = path, st, None, False
+        for coding, suffix in SIDECARS:
+            sidecar = path.with_name(path.name + suffix)
+            try:
+                side_st = sidecar.stat()
+            except OSError:
+                continue
+            if side_st.st_mtime_ns < st.st_mtime_ns:
+                continue  # stale: the original was edited after the build
+            has_variants = True
+            if encoding is None and accepts_encoding(accept_encoding, coding):
+                chosen, chosen_st, encoding = sidecar, side_st, coding
+
+        immutable = str(path) in self.immutable or is_fingerprinted(path)
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL
+        return StaticFile(
+            path=chosen,
+            size=chosen_st.st_size,
+            mtime=st.st_mtime,
+            etag=self._etag(chosen, chosen_st),
+            encoding=encoding,
+            has_variants=has_variants,
+            cache_control=cache_control,
+        )
+
+    def _etag(self, path: Path, st: os.stat_result) -> str:
+        key = str(path)
+        with self._lock:
+            cached = self._etags.get(key)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        etag = '"' + digest.hexdigest()[:32] + '"'
+        with self._lock:
+            self._etags[key] = (st.st_mtime_ns, st.st_size, etag)
+        return etag
@@ -0,0 +1,164 @@
+"""
+A2OJ catalog (a2oj_catalog.py): indexed filters and pagination checked
+against a plain scan of the records, and the mmap snapshot round trip
+(a2oj_snapshot.py), on small source files in a temp dir.
+
+    python -m pytest -q test_a2oj_catalog.py
+"""
+
+import json
+import os
+
+import pytest
+
+import a2oj_catalog
+import a2oj_snapshot
+from a2oj_catalog import Catalog, CatalogQueryError
+from a2oj_snapshot import SnapshotError, StringTable, compile_snapshot, load_snapshot
+
+
+def _ladders():
+    problems = [
+        {'id': i, 'name': f'Ladder problem {i}', 'link': f'http://codeforces.com/problemset/problem/{1000 + i // 2}/A',
+         'rating': 800 + 100 * (i % 4), 'difficulty': i % 3, 'cfContestId': 1000 + i // 2,
+         'cfIndex': 'AB'[i % 2]}
+        for i in range(1, 31)
+    ]
+    return {'lastUpdated': '2026-01-01', 'ladders': [
+        {'slug': 'div2a', 'name': 'Div. 2A', 'problemCount': 20, 'problems': problems[:20]},
+        {'slug': 'div2b', 'name': 'Div. 2B', 'problemCount': 10, 'problems': problems[20:]},
+    ]}
+
+
+def _categories():
+    platforms = ['SPOJ', 'Codeforces', 'Live Archive']
+    problems = [
+        {'id': i, 'name': f'Category problem {i}', 'link': f'http://example.com/{i}', 'platform': platforms[i % 3],
+         'year': '2004' if i % 5 == 0 else '', 'contest': '', 'difficulty': 1 + i % 4}
+        for i in range(1, 26)
+    ]
+    return {'lastUpdated': '2026-01-02', 'categories': [
+        {'id': 1, 'slug': 'dynamic-programming', 'name': 'Dynamic Programming', 'problems': problems},
+    ]}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    ladders = tmp_path / 'ladders.json'
+    categories = tmp_path / 'categories.json'
+    ladders.write_text(json.dumps(_ladders()), encoding='utf-8')
+    categories.write_text(json.dumps(_categories()), encoding='utf-8')
+    return ladders, categories
+
+
+@pytest.fixture
+def catalog(sources):
+    return Catalog.from_sources(*sources)
+
+
+def _scan(catalog, keep):
+    return [rec for rec in (catalog.record(i) for i in range(len(catalog))) if keep(rec)]
+
+
+def test_records_and_lists(catalog):
+    assert len(catalog) == 55
+    assert catalog.generated == {'ladders': '2026-01-01', 'categories': '2026-01-02'}
+    assert [meta['slug'] for meta in catalog.list_summaries()] == ['div2a', 'div2b', 'dynamic-programming']
+    assert all('problems' not in meta for meta in catalog.list_summaries())
+    first = catalog.record(0)
+    assert first['kind'] == 'ladder' and first['platform'] == 'Codeforces'
+    assert first['cfContestId'] == 1000 and first['cfIndex'] == 'B'
+    # Empty optional strings are left out of a record.
+    assert 'year' not in catalog.record(30) and 'rating' not in catalog.record(30)
+    assert catalog.record(34)['year'] == '2004'
+
+
+@pytest.mark.parametrize('params, keep', [
+    ({'kind': 'category'}, lambda r: r['kind'] == 'category'),
+    ({'category': 'div2b'}, lambda r: r['list'] == 'div2b'),
+    ({'platform': 'spoj'}, lambda r: r['platform'] == 'SPOJ'),
+    ({'platform': 'codeforces', 'kind': 'category'},
+     lambda r: r['platform'] == 'Codeforces' and r['kind'] == 'category'),
+    ({'difficulty': '2'}, lambda r: r['difficulty'] == 2),
+    ({'rating': '900'}, lambda r: r.get('rating') == 900),
+    ({'minRating': '950', 'maxRating': '1100'}, lambda r: 950 <= r.get('rating', 0) <= 1100),
+    ({'cfContestId': '1005'}, lambda r: r.get('cfContestId') == 1005),
+    ({'cfContestId': '1005', 'cfIndex': 'A'}, lambda r: r.get('cfContestId') == 1005 and r['cfIndex'] == 'A'),
+    ({'category': 'div2a', 'difficulty': '1', 'minRating': '1000'},
+     lambda r: r['list'] == 'div2a' and r['difficulty'] == 1 and r.get('rating', 0) >= 1000),
+    ({'category': 'nope'}, lambda r: False),
+])
+def test_query_matches_a_scan(catalog, params, keep):
+    expected = _scan(catalog, keep)
+    result = catalog.query({**params, 'pageSize': '200'})
+    assert result['total'] == len(expected)
+    assert result['problems'] == expected
+
+
+def test_pagination(catalog):
+    everything = _scan(catalog, lambda r: True)
+    pages = [catalog.query({'page': str(page), 'pageSize': '20'}) for page in (1, 2, 3, 4)]
+    assert [len(page['problems']) for page in pages] == [20, 20, 15, 0]
+    assert [rec for page in pages for rec in page['problems']] == everything
+    assert all(page['total'] == 55 for page in pages)
+    assert catalog.query({'pageSize': '100000'})['pageSize'] == 200
+
+
+@pytest.mark.parametrize('params', [{'page': '0'}, {'page': 'x'}, {'pageSize': '0'}, {'difficulty': 'hard'}])
+def test_bad_parameters(catalog, params):
+    with pytest.raises(CatalogQueryError):
+        catalog.query(params)
+
+
+# -- compiled snapshot --------------------------------------------------------
+
+@pytest.fixture
+def snapshot_path(catalog, tmp_path):
+    path = tmp_path / 'catalog.snapshot'
+    assert compile_snapshot(catalog, path) == path.stat().st_size
+    return path
+
+
+def test_snapshot_round_trip(catalog, snapshot_path):
+    mapped = load_snapshot(snapshot_path)
+    assert isinstance(mapped.strings, StringTable)
+    assert len(mapped) == len(catalog)
+    assert list(mapped.strings) == list(catalog.strings)
+    assert mapped.lists == catalog.lists
+    assert mapped.generated == catalog.generated
+    assert [mapped.record(i) for i in range(len(mapped))] == [catalog.record(i) for i in range(len(catalog))]
+    queries = [{'platform': 'spoj'}, {'cfContestId': '1005', 'cfIndex': 'A'},
+               {'minRating': '1000', 'page': '2', 'pageSize': '5'}]
+    for params in queries:
+        assert mapped.query(params) == catalog.query(params)
+
+
+@pytest.mark.parametrize('damage', [
+    lambda raw: raw[:10],
+    lambda raw: b'NOTASNAP' + raw[8:],
+    lambda raw: raw[:len(raw) // 2],
+])
+def test_damaged_snapshot_is_rejected(snapshot_path, damage):
+    snapshot_path.write_bytes(damage(snapshot_path.read_bytes()))
+    with pytest.raises(SnapshotError):
+        load_snapshot(snapshot_path)
+
+
+def test_load_catalog_prefers_a_fresh_snapshot(sources, catalog, snapshot_path, monkeypatch):
+    ladders, categories = sources
+    monkeypatch.setattr(a2oj_catalog, 'LADDERS_PATH', ladders)
+    monkeypatch.setattr(a2oj_catalog, 'CATEGORIES_PATH', categories)
+    monkeypatch.setattr(a2oj_snapshot, 'SNAPSHOT_PATH', snapshot_path)
+    monkeypatch.setattr(Catalog, 'from_sources', classmethod(lambda cls: catalog))
+    mtime = ladders.stat().st_mtime
+    os.utime(snapshot_path, (mtime + 10, mtime + 10))
+    assert isinstance(a2oj_catalog.load_catalog().strings, StringTable)
+
+    # A source edited after the snapshot was built wins over it...
+    os.utime(ladders, (mtime + 20, mtime + 20))
+    assert a2oj_catalog.load_catalog() is catalog
+
+    # ...and so do the sources when the snapshot cannot be read.
+    snapshot_path.write_bytes(b'garbage')
+    os.utime(snapshot_path, (mtime + 30, mtime + 30))
+    assert a2oj_catalog.load_catalog() is catalog
@@ -0,0 +1,151 @@
+"""
+Analytics (analytics.py): prefix-sum summaries checked against a naive
+loop over the history (the calculateDailyScores() formula), range
+clipping and truncation, and the per-handle cache.
+
+    python -m pytest -q test_analytics.py
+"""
+
+import random
+from collections import Counter
+
+import pytest
+
+import analytics
+from analytics import (
+    DAY_SECONDS, GAMMA, RATING_MAX, RATING_MIN, RATING_STEP, AnalyticsQueryError, UserAnalytics, check_range,
+    parse_day,
+)
+
+TAGS = ['math', 'dp', 'greedy', 'graphs', 'strings']
+FIRST_DAY = 19000
+
+
+def _history(seed=1, solves=400, days=200):
+    rng = random.Random(seed)
+    return [
+        [(FIRST_DAY + rng.randrange(days)) * DAY_SECONDS + rng.randrange(DAY_SECONDS),
+         rng.choice([0, 800, 1200, 1500, 1900, 2400, 3600]),
+         rng.sample(TAGS, rng.randrange(3))]
+        for _ in range(solves)
+    ]
+
+
+def _naive(history, start, end):
+    """Straight loop over the solves of days [start, end]."""
+    per_day = Counter()
+    per_day_rating = Counter()
+    topics = Counter()
+    ratings = Counter()
+    for seconds, rating, tags in history:
+        day = seconds // DAY_SECONDS
+        if not start <= day <= end:
+            continue
+        per_day[day] += 1
+        topics.update(tags)
+        if rating:
+            bucket = min(max(rating, RATING_MIN), RATING_MAX) // RATING_STEP * RATING_STEP
+            per_day_rating[day, bucket] += 1
+            ratings[str(bucket)] += 1
+    scores = Counter()
+    for (day, bucket), count in per_day_rating.items():
+        scores[day] += 100 * 2 ** ((bucket - RATING_MIN) / 400) * count ** GAMMA
+    scores = {day: round(score, 2) for day, score in scores.items()}
+    scoring = [score for score in scores.values() if score > 0]
+    active = len(per_day)
+    return {
+        'totalSolved': sum(per_day.values()),
+        'activeDays': active,
+        'avgProblemsPerDay': round(sum(per_day.values()) / active, 2) if active else 0,
+        'maxProblemsPerDay': max(per_day.values(), default=0),
+        'avgDailyScore': round(sum(scoring) / len(scoring), 1) if scoring else 0,
+        'maxDailyScore': max(scores.values(), default=0),
+        'problemsPerDay': [per_day[day] for day in range(start, end + 1)],
+        'dailyScores': [scores.get(day, 0) for day in range(start, end + 1)],
+        'byTopic': dict(topics),
+        'byRating': dict(ratings),
+    }
+
+
+@pytest.fixture(scope='module')
+def history():
+    return _history()
+
+
+@pytest.fixture(scope='module')
+def user(history):
+    return UserAnalytics(history)
+
+
+def _compare(summary, expected):
+    for key, value in expected.items():
+        if key in ('dailyScores', 'maxDailyScore', 'avgDailyScore'):
+            assert summary[key] == pytest.approx(value, abs=0.11), key
+        else:
+            assert summary[key] == value, key
+
+
+def test_whole_history_matches_the_loop(user, history):
+    days = [seconds // DAY_SECONDS for seconds, _, _ in history]
+    summary = user.summary()
+    _compare(summary, _naive(history, min(days), max(days)))
+    assert summary['from'] == analytics._iso(min(days)) and not summary['truncated']
+
+
+def test_random_ranges_match_the_loop(user, history):
+    rng = random.Random(9)
+    for _ in range(60):
+        start = FIRST_DAY + rng.randrange(-20, 200)
+        end = start + rng.randrange(0, 120)
+        summary = user.summary(start, end)
+        # Summaries cover only the days that have solves.
+        first, last = max(start, user.first_day), min(end, user.first_day + user.num_days - 1)
+        if first > last:
+            assert summary['totalSolved'] == 0 and summary['from'] is None
+            continue
+        _compare(summary, _naive(history, first, last))
+
+
+def test_avg_daily_score_skips_unrated_days():
+    day = FIRST_DAY * DAY_SECONDS
+    user = UserAnalytics([[day, 800, []], [day + DAY_SECONDS, 0, ['math']], [day + 2 * DAY_SECONDS, 800, []]])
+    summary = user.summary()
+    assert summary['activeDays'] == 3
+    assert summary['dailyScores'] == [100.0, 0.0, 100.0]
+    assert summary['avgDailyScore'] == 100.0
+
+
+def test_long_ranges_keep_the_latest_days(history, monkeypatch):
+    monkeypatch.setattr(analytics, 'MAX_RANGE_DAYS', 30)
+    user = UserAnalytics(history)
+    summary = user.summary()
+    last = user.first_day + user.num_days - 1
+    assert summary['truncated']
+    assert len(summary['problemsPerDay']) == 30
+    _compare(summary, _naive(history, last - 29, last))
+    assert not user.summary(last - 29, last)['truncated']
+
+
+def test_empty_history():
+    summary = UserAnalytics([]).summary()
+    assert summary['totalSolved'] == 0 and summary['problemsPerDay'] == [] and summary['from'] is None
+
+
+def test_parse_day_and_check_range():
+    assert parse_day('1970-01-02') == 1
+    assert parse_day('') is None
+    with pytest.raises(AnalyticsQueryError):
+        parse_day('02/01/1970')
+    check_range(10, 10)
+    check_range(None, 10)
+    with pytest.raises(AnalyticsQueryError):
+        check_range(11, 10)
+    with pytest.raises(AnalyticsQueryError):
+        check_range(0, analytics.MAX_RANGE_DAYS)
+
+
+def test_analytics_for_reuses_until_the_etag_changes(history):
+    doc = {'_id': 'cache-test', 'etag': '"1"', 'history': history}
+    built = analytics.analytics_for(doc)
+    assert analytics.analytics_for(doc) is built
+    assert analytics.analytics_for({**doc, 'etag': '"2"'}) is not built
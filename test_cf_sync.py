@@ -0,0 +1,126 @@
+"""
+Incremental Codeforces sync (cf_sync.py): user.status paging with
+from/count against a fake API, first-solve counters, and sync_handle()
+on mongomock when it is installed.
+
+    python -m pytest -q test_cf_sync.py
+"""
+
+import pytest
+
+import cf_sync
+from cf_sync import PAGE_SIZE, apply_submissions, fetch_new_submissions, solved_view, sync_handle
+
+
+def _sub(sub_id, contest_id, index='A', verdict='OK', rating=800, tags=('math',)):
+    return {'id': sub_id, 'verdict': verdict, 'creationTimeSeconds': 1000 + sub_id,
+            'problem': {'contestId': contest_id, 'index': index, 'rating': rating, 'tags': list(tags)}}
+
+
+class FakeStatus:
+    """user.status over a list of submissions, newest first; records every request."""
+
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.requests = []
+
+    def __call__(self, method, handle, **params):
+        assert method == 'user.status'
+        self.requests.append((params['from'], params['count']))
+        start = params['from'] - 1
+        return self.submissions[start:start + params['count']]
+
+
+def test_first_fetch_uses_big_pages():
+    api = FakeStatus([_sub(i, i) for i in range(250, 0, -1)])
+    fresh = fetch_new_submissions('tourist', 0, api)
+    assert [s['id'] for s in fresh] == list(range(250, 0, -1))
+    assert api.requests == [(1, cf_sync.INITIAL_PAGE_SIZE)]
+
+
+def test_incremental_fetch_stops_at_the_last_seen_id():
+    api = FakeStatus([_sub(i, i) for i in range(330, 0, -1)])
+    fresh = fetch_new_submissions('tourist', 100, api)
+    assert [s['id'] for s in fresh] == list(range(330, 100, -1))
+    assert api.requests == [(1, PAGE_SIZE), (101, PAGE_SIZE), (201, PAGE_SIZE)]
+
+    api.requests.clear()
+    assert fetch_new_submissions('tourist', 330, api) == []
+    assert api.requests == [(1, PAGE_SIZE)]
+
+
+def test_pages_shifted_by_new_submissions_are_not_counted_twice():
+    submissions = [_sub(i, i) for i in range(250, 0, -1)]
+    api = FakeStatus(submissions)
+
+    def shifting(method, handle, **params):
+        page = api(method, handle, **params)
+        if params['from'] == 1:
+            # Two submissions arrive before the second page is fetched.
+            submissions[:0] = [_sub(252, 252), _sub(251, 251)]
+        return page
+
+    fresh = fetch_new_submissions('tourist', 50, shifting)
+    assert [s['id'] for s in fresh] == list(range(250, 50, -1))
+
+
+def test_counters_only_count_first_solves():
+    submissions = [
+        _sub(5, 1, 'A', tags=('math', 'dp')),
+        _sub(4, 2, 'B', verdict='WRONG_ANSWER', rating=1200),
+        _sub(3, 1, 'A', tags=('math', 'dp')),
+        _sub(2, 3, 'C', rating=None, tags=('a.b',)),
+    ]
+    update, new_keys = apply_submissions({'solved': ['9Z'], 'lastSubmissionId': 1}, submissions)
+    assert new_keys == ['3C', '1A']
+    assert update['$set']['lastSubmissionId'] == 5
+    assert update['$push']['solved'] == {'$each': ['3C', '1A']}
+    assert update['$push']['history']['$each'] == [[1002, 0, ['a.b']], [1003, 800, ['math', 'dp']]]
+    assert update['$inc'] == {'byTag.a_b': 1, 'byTag.math': 1, 'byTag.dp': 1, 'byRating.800': 1}
+
+    update, new_keys = apply_submissions({'solved': ['1A'], 'lastSubmissionId': 3}, submissions[:1])
+    assert new_keys == [] and '$push' not in update and '$inc' not in update
+
+
+@pytest.fixture
+def db():
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient().db
+
+
+def test_sync_handle_is_incremental(db):
+    submissions = [_sub(i, i, rating=800 + 100 * (i % 3)) for i in range(30, 0, -1)]
+    api = FakeStatus(submissions)
+    doc = sync_handle(db, 'Tourist', call=api)
+    assert doc['_id'] == 'tourist' and doc['handle'] == 'Tourist'
+    assert len(doc['solved']) == 30 and doc['lastSubmissionId'] == 30
+    assert doc['byRating'] == {'800': 10, '900': 10, '1000': 10}
+    first_etag = doc['etag']
+
+    # Within CF_SYNC_INTERVAL the stored document answers without a request.
+    api.requests.clear()
+    assert sync_handle(db, 'tourist', call=api)['etag'] == first_etag
+    assert api.requests == []
+
+    submissions[:0] = [_sub(32, 1), _sub(31, 40, rating=1000)]
+    doc = sync_handle(db, 'tourist', force=True, call=api)
+    assert api.requests == [(1, PAGE_SIZE)]
+    assert doc['lastSubmissionId'] == 32
+    assert doc['solved'][-1] == '40A' and len(doc['solved']) == 31
+    assert doc['byRating']['1000'] == 11
+    assert doc['etag'] != first_etag
+    view = solved_view(doc)
+    assert view['solvedCount'] == 31 and view['syncedAt']
+
+
+def test_sync_conflict_when_another_process_advanced(db):
+    api = FakeStatus([_sub(2, 2), _sub(1, 1)])
+    sync_handle(db, 'petr', call=api)
+    api.submissions.insert(0, _sub(3, 3))
+
+    def racing(method, handle, **params):
+        db.cf_sync.update_one({'_id': 'petr'}, {'$set': {'lastSubmissionId': 3}})
+        return api(method, handle, **params)
+
+    with pytest.raises(cf_sync.SyncConflict):
+        sync_handle(db, 'petr', force=True, call=racing)
@@ -0,0 +1,115 @@
+"""
+Contest problem picker (contest_picker.py): rating ranges, tag and
+popularity bitmaps and drawing without repeats, checked against plain
+filters over a small synthetic problemset.
+
+    python -m pytest -q test_contest_picker.py
+"""
+
+import random
+
+import pytest
+
+from contest_picker import PickError, ProblemIndex, parse_slots, problem_key
+
+
+def _problemset():
+    problems, statistics = [], []
+    for contest_id in range(1, 41):
+        for n, index in enumerate('ABCDE'):
+            rating = 800 + 100 * n + 100 * (contest_id % 3)
+            tags = ['math'] if contest_id % 4 == 0 else ['greedy', 'implementation']
+            if n == 4 and contest_id == 7:
+                tags = ['FFT']
+            problems.append({'contestId': contest_id, 'index': index, 'name': f'P{contest_id}{index}',
+                             'rating': rating, 'tags': tags})
+            statistics.append({'contestId': contest_id, 'index': index, 'solvedCount': (contest_id * 37) % 1000})
+    # Unrated problems are not indexed.
+    problems.append({'contestId': 99, 'index': 'A', 'name': 'Unrated', 'tags': ['math']})
+    return problems, statistics
+
+
+@pytest.fixture(scope='module')
+def index():
+    return ProblemIndex(*_problemset())
+
+
+def _ids(index, keep):
+    return {pid for pid, p in enumerate(index.problems) if keep(p)}
+
+
+def test_ids_are_dense_and_ordered_by_rating(index):
+    assert len(index) == 200
+    ratings = [p['rating'] for p in index.problems]
+    assert ratings == sorted(ratings)
+    assert problem_key(99, 'A') not in index.ids
+    # Within a rating, ordered by solve count.
+    for a, b in zip(index.problems, index.problems[1:]):
+        if a['rating'] == b['rating']:
+            assert a['solvedCount'] <= b['solvedCount']
+
+
+@pytest.mark.parametrize('lo, hi', [(800, 800), (900, 1150), (1000, 1400), (1500, 1700), (0, 5000), (1250, 1299)])
+def test_id_range_matches_a_filter(index, lo, hi):
+    start, end = index.id_range(lo, hi)
+    assert set(range(start, end)) == _ids(index, lambda p: lo <= p['rating'] <= hi)
+
+
+def test_tag_bitmaps_are_case_insensitive(index):
+    fft = index.tag_bitmap(['fft'])
+    assert fft == index.tag_bitmap(['FFT']) and bin(fft).count('1') == 1
+    math = index.tag_bitmap(['math'])
+    assert {pid for pid in range(len(index)) if math >> pid & 1} == _ids(index, lambda p: 'math' in p['tags'])
+
+
+def test_mid_band_skips_the_extremes(index):
+    start, end = index.id_range(1000, 1000)
+    mid = [pid for pid in range(start, end) if index.mid >> pid & 1]
+    size = end - start
+    assert len(mid) < size
+    assert start not in mid and end - 1 not in mid  # least and most solved
+
+
+def test_pick_respects_range_exclusions_and_tags(index):
+    rng = random.Random(3)
+    solved = index.solved_bitmap([problem_key(c, 'B') for c in range(1, 41)])
+    for _ in range(200):
+        pid = index.pick((1000, 1100), ['math'], solved, rng)
+        p = index.problems[pid]
+        assert 1000 <= p['rating'] <= 1100
+        assert p['index'] != 'B'
+        assert 'math' in p['tags']
+        assert index.mid >> pid & 1
+
+
+def test_pick_falls_back_when_filters_match_nothing(index):
+    rng = random.Random(5)
+    # No problem in this range has the tag: the tag filter is dropped.
+    pid = index.pick((800, 800), ['fft'], 0, rng)
+    assert index.problems[pid]['rating'] == 800
+    # Everything but one (unpopular) problem is solved: that one is still picked.
+    start, end = index.id_range(800, 800)
+    exclude = ((1 << (end - start)) - 1) << start
+    assert index.pick((800, 800), None, exclude ^ (1 << start), rng) == start
+    assert index.pick((800, 800), None, exclude, rng) is None
+    assert index.pick((5000, 6000), None, 0, rng) is None
+
+
+def test_pick_contest_never_repeats(index):
+    rng = random.Random(11)
+    slots = [{'rating': [900, 900]}] * 8 + [{'rating': [2500, 2600]}]
+    picked = index.pick_contest(slots, rng=rng)
+    assert picked[-1] is None
+    assert len(set(picked[:-1])) == 8
+    start, end = index.id_range(900, 900)
+    assert all(start <= pid < end for pid in picked[:-1])
+
+
+def test_parse_slots():
+    assert parse_slots({'slots': [{'rating': [800, 900], 'tags': ['dp', 3]}, {'rating': [1000, 1200]}]}) == [
+        {'rating': [800, 900], 'tags': ['dp', '3']}, {'rating': [1000, 1200]},
+    ]
+    for body in ({}, {'slots': []}, {'slots': [{}] * 27}, {'slots': [{'rating': [800]}]},
+                 {'slots': [{'rating': [True, 900]}]}, {'slots': ['800-900']}):
+        with pytest.raises(PickError):
+            parse_slots(body)
@@ -0,0 +1,155 @@
+"""
+Parity of contest_storage.apply_update() with MongoDB.
+
+The sqlite and memory backends apply compile_ops() updates with
+apply_update(); every case below states what MongoDB does with the same
+update. Set MONGODB_TEST_URI to also run the cases against a real server
+(a throwaway `contest_storage_parity` database is created and dropped).
+
+    python -m pytest -q test_contest_storage.py
+"""
+
+import copy
+import os
+
+import pytest
+
+from contest_storage import MONGO_PATH_ERRORS, InvalidUpdatePath, apply_update, compile_ops
+
+MONGODB_TEST_URI = os.getenv('MONGODB_TEST_URI')
+
+
+def _active(*indexes):
+    return {'currentContest': {'problems': [{'index': index, 'status': 'unsolved'} for index in indexes]}}
+
+
+# (name, document before, (update, array_filters), document after)
+CASES = [
+    (
+        'array filters, one per problem index, later op wins',
+        {'activeContest': _active('A', 'B', 'C')},
+        compile_ops([
+            {'op': 'setProblemStatus', 'index': 'A', 'status': 'attempted', 'attempts': 1},
+            {'op': 'setProblemStatus', 'index': 'B', 'status': 'solved'},
+            {'op': 'setProblemStatus', 'index': 'A', 'status': 'solved', 'attempts': 2},
+            {'op': 'setProblemStatus', 'index': 'Z', 'status': 'solved'},
+        ])[:2],
+        {'activeContest': {'currentContest': {'problems': [
+            {'index': 'A', 'status': 'solved', 'attempts': 2},
+            {'index': 'B', 'status': 'solved'},
+            {'index': 'C', 'status': 'unsolved'},
+        ]}}},
+    ),
+    (
+        '$push with $each and a negative $slice',
+        {'streak': {'history': ['a', 'b', 'c']}},
+        ({'$push': {'streak.history': {'$each': ['d', 'e'], '$slice': -3}}}, []),
+        {'streak': {'history': ['c', 'd', 'e']}},
+    ),
+    (
+        '$push creates missing arrays and parents',
+        {},
+        compile_ops([{'op': 'bumpStreak', 'date': 'Mon Feb 17 2025', 'current': 4, 'best': 9}])[:2],
+        {'streak': {'history': ['Mon Feb 17 2025'], 'current': 4, 'lastDate': 'Mon Feb 17 2025', 'best': 9}},
+    ),
+    (
+        '$max keeps the larger value',
+        {'streak': {'best': 12}, 'stats': {'best': 30}},
+        ({'$max': {'streak.best': 9, 'stats.best': 80}}, []),
+        {'streak': {'best': 12}, 'stats': {'best': 80}},
+    ),
+    (
+        '$inc and $max on an appended contest',
+        {'pastContests': [], 'stats': {'count': 1, 'solved': 2, 'problems': 4, 'score': 100, 'time': 60, 'best': 100,
+                                       'byDivision': {}}},
+        compile_ops([{'op': 'appendContest', 'contest': {
+            'contestId': 7, 'contestType': 'div2', 'totalScore': 150, 'solvedCount': 3, 'totalProblems': 5,
+            'timeTaken': 90,
+        }}])[:2],
+        {'pastContests': [{'contestId': 7, 'contestType': 'div2', 'totalScore': 150, 'solvedCount': 3,
+                           'totalProblems': 5, 'timeTaken': 90}],
+         'stats': {'count': 2, 'solved': 5, 'problems': 9, 'score': 250, 'time': 150, 'best': 150,
+                   'byDivision': {'div2': {'count': 1, 'score': 150, 'solved': 3, 'total': 5}}}},
+    ),
+]
+
+# (name, document, (update, array_filters)) that MongoDB rejects.
+REJECTED = [
+    (
+        'array update without the array',
+        {'streak': {}},
+        compile_ops([{'op': 'setProblemStatus', 'index': 'A', 'status': 'solved'}])[:2],
+    ),
+    (
+        'array update on a non-array',
+        {'activeContest': {'currentContest': {'problems': {'index': 'A'}}}},
+        compile_ops([{'op': 'setProblemStatus', 'index': 'A', 'status': 'solved'}])[:2],
+    ),
+    (
+        'field under a non-object',
+        {'streak': 5},
+        compile_ops([{'op': 'bumpStreak', 'current': 4}])[:2],
+    ),
+    (
+        '$push to a non-array',
+        {'streak': {'history': 'Mon Feb 17 2025'}},
+        compile_ops([{'op': 'bumpStreak', 'date': 'Tue Feb 18 2025'}])[:2],
+    ),
+    (
+        '$inc of a non-number',
+        {'stats': {'count': 'many'}},
+        ({'$inc': {'stats.count': 1}}, []),
+    ),
+]
+
+
+@pytest.mark.parametrize('name, before, compiled, after', CASES, ids=[case[0] for case in CASES])
+def test_apply_update(name, before, compiled, after):
+    update, array_filters = compiled
+    doc = copy.deepcopy(before)
+    apply_update(doc, copy.deepcopy(update), array_filters)
+    assert doc == after
+
+
+@pytest.mark.parametrize('name, before, compiled', REJECTED, ids=[case[0] for case in REJECTED])
+def test_apply_update_rejects(name, before, compiled):
+    update, array_filters = compiled
+    with pytest.raises(InvalidUpdatePath):
+        apply_update(copy.deepcopy(before), copy.deepcopy(update), array_filters)
+
+
+@pytest.fixture(scope='module')
+def mongo():
+    pymongo = pytest.importorskip('pymongo')
+    client = pymongo.MongoClient(MONGODB_TEST_URI, serverSelectionTimeoutMS=5000)
+    db = client.contest_storage_parity
+    yield db.docs
+    client.drop_database(db)
+    client.close()
+
+
+def _mongo_apply(collection, before, update, array_filters):
+    collection.delete_many({})
+    collection.insert_one({'_id': 1, **copy.deepcopy(before)})
+    collection.update_one({'_id': 1}, update, array_filters=array_filters or None)
+    doc = collection.find_one({'_id': 1})
+    del doc['_id']
+    return doc
+
+
+@pytest.mark.skipif(not MONGODB_TEST_URI, reason='MONGODB_TEST_URI not set')
+@pytest.mark.parametrize('name, before, compiled, after', CASES, ids=[case[0] for case in CASES])
+def test_mongo_agrees(mongo, name, before, compiled, after):
+    update, array_filters = compiled
+    assert _mongo_apply(mongo, before, update, array_filters) == after
+
+
+@pytest.mark.skipif(not MONGODB_TEST_URI, reason='MONGODB_TEST_URI not set')
+@pytest.mark.parametrize('name, before, compiled', REJECTED, ids=[case[0] for case in REJECTED])
+def test_mongo_rejects(mongo, name, before, compiled):
+    from pymongo.errors import OperationFailure
+
+    update, array_filters = compiled
+    with pytest.raises(OperationFailure) as raised:
+        _mongo_apply(mongo, before, update, array_filters)
+    assert raised.value.code in MONGO_PATH_ERRORS
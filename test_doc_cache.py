@@ -0,0 +1,166 @@
+"""
+DocCache (doc_cache.py): the byte-weighted LRU bound, TTL expiry,
+single-flight loads and invalidation of loads in progress.
+
+    python -m pytest -q test_doc_cache.py
+"""
+
+import threading
+import time
+import types
+
+import pytest
+
+import doc_cache
+from doc_cache import ENTRY_OVERHEAD, DocCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(doc_cache, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def _loader(value, size=100, calls=None):
+    def load():
+        if calls is not None:
+            calls.append(value)
+        return value, size
+    return load
+
+
+def test_hits_do_not_reload():
+    cache = DocCache(max_bytes=10_000, ttl=60)
+    calls = []
+    assert cache.get('a', _loader(b'A', calls=calls)) == b'A'
+    assert cache.get('a', _loader(b'other', calls=calls)) == b'A'
+    assert cache.peek('a') == b'A' and cache.peek('b') is None
+    assert calls == [b'A']
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = DocCache(max_bytes=3 * (100 + ENTRY_OVERHEAD), ttl=60)
+    for key in 'abc':
+        cache.get(key, _loader(key))
+    cache.get('a', _loader('reloaded'))  # 'a' is now the most recent
+    cache.get('d', _loader('d'))
+    assert cache.peek('b') is None
+    assert [cache.peek(key) for key in 'acd'] == ['a', 'c', 'd']
+    assert cache.info()['bytes'] == 3 * (100 + ENTRY_OVERHEAD) <= cache.max_bytes
+
+    # A bigger entry pushes out as many as it needs to.
+    cache.get('big', _loader('big', size=2 * 100 + ENTRY_OVERHEAD))
+    assert cache.info()['entries'] == 2 and cache.peek('d') == 'd'
+
+
+def test_entries_larger_than_the_cache_are_not_kept():
+    cache = DocCache(max_bytes=1000, ttl=60)
+    calls = []
+    cache.get('huge', _loader('x', size=5000, calls=calls))
+    cache.get('huge', _loader('x', size=5000, calls=calls))
+    assert calls == ['x', 'x']
+    assert cache.info()['bytes'] == 0
+
+
+def test_entries_expire(clock):
+    cache = DocCache(max_bytes=10_000, ttl=5)
+    cache.get('a', _loader('old'))
+    clock.now += 4.9
+    assert cache.peek('a') == 'old'
+    clock.now += 0.2
+    assert cache.peek('a') is None
+    assert cache.info()['bytes'] == 0
+    assert cache.get('a', _loader('new')) == 'new'
+
+
+def test_disabled_cache_always_loads():
+    calls = []
+    for cache in (DocCache(max_bytes=0, ttl=60), DocCache(max_bytes=10_000, ttl=0)):
+        cache.get('a', _loader('a', calls=calls))
+        cache.get('a', _loader('a', calls=calls))
+    assert len(calls) == 4
+
+
+def _slow_loader(release, calls, value='v'):
+    def load():
+        calls.append(value)
+        release.wait(5)
+        return value, 10
+    return load
+
+
+def _start(cache, key, loader, results, errors):
+    def run():
+        try:
+            results.append(cache.get(key, loader))
+        except Exception as e:
+            errors.append(e)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_for_flight(cache, key):
+    for _ in range(500):
+        with cache._lock:
+            if key in cache._flights:
+                return
+        time.sleep(0.002)
+    raise AssertionError('no load started')
+
+
+def test_concurrent_misses_share_one_load():
+    cache = DocCache(max_bytes=10_000, ttl=60)
+    release, calls, results, errors = threading.Event(), [], [], []
+    leader = _start(cache, 'k', _slow_loader(release, calls), results, errors)
+    _wait_for_flight(cache, 'k')
+    followers = [_start(cache, 'k', _slow_loader(release, calls, 'again'), results, errors) for _ in range(5)]
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+    assert calls == ['v']
+    assert results == ['v'] * 6 and not errors
+    assert cache.peek('k') == 'v'
+
+
+def test_load_errors_reach_every_waiter_and_are_not_cached():
+    cache = DocCache(max_bytes=10_000, ttl=60)
+    release = threading.Event()
+    results, errors = [], []
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('database down')
+
+    leader = _start(cache, 'k', failing, results, errors)
+    _wait_for_flight(cache, 'k')
+    follower = _start(cache, 'k', failing, results, errors)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert not results and [str(e) for e in errors] == ['database down'] * 2
+    assert cache.get('k', _loader('ok')) == 'ok'
+
+
+def test_invalidation_during_a_load_is_not_cached():
+    cache = DocCache(max_bytes=10_000, ttl=60)
+    release, calls, results, errors = threading.Event(), [], [], []
+    leader = _start(cache, 'k', _slow_loader(release, calls, 'before write'), results, errors)
+    _wait_for_flight(cache, 'k')
+    cache.invalidate('k')
+    release.set()
+    leader.join(5)
+    assert results == ['before write']
+    assert cache.peek('k') is None
+    assert cache.get('k', _loader('after write')) == 'after write'
+
+
+def test_invalidate_and_clear():
+    cache = DocCache(max_bytes=10_000, ttl=60)
+    for key in 'abc':
+        cache.get(key, _loader(key))
+    cache.invalidate('a', 'missing')
+    assert cache.peek('a') is None and cache.info()['entries'] == 2
+    cache.clear()
+    assert cache.info() == {'entries': 0, 'bytes': 0, 'maxBytes': 10_000, 'ttl': 60}
@@ -0,0 +1,112 @@
+"""
+ETags, If-None-Match and response compression (http_cache.py), and how
+the contest API uses them on the memory backend.
+
+    python -m pytest -q test_http_cache.py
+"""
+
+import gzip
+import json
+
+import pytest
+
+import contest_server
+import contest_storage
+import http_cache
+from http_cache import (
+    MIN_COMPRESS_SIZE, choose_encoding, compress, content_etag, etag_matches, json_etag, negotiated_etag,
+)
+
+
+def test_json_etag_ignores_key_order():
+    assert json_etag({'a': 1, 'b': [1, 2]}) == json_etag({'b': [1, 2], 'a': 1})
+    assert json_etag({'a': 1}) != json_etag({'a': 2})
+    assert content_etag(b'x').startswith('"') and content_etag(b'x').endswith('"')
+
+
+@pytest.mark.parametrize('header, etag, expected', [
+    ('"abc"', '"abc"', True),
+    ('W/"abc"', '"abc"', True),
+    ('"abc"', 'W/"abc"', True),
+    ('"x", "abc"', '"abc"', True),
+    ('*', '"abc"', True),
+    ('"x"', '"abc"', False),
+    (None, '"abc"', False),
+    ('"abc"', None, False),
+])
+def test_etag_matches_is_weak(header, etag, expected):
+    assert etag_matches(header, etag) is expected
+
+
+def test_negotiated_etag():
+    assert negotiated_etag('"abc"', None) == '"abc"'
+    assert negotiated_etag('"abc"', 'gzip') == 'W/"abc"'
+    assert negotiated_etag('W/"abc"', 'br') == 'W/"abc"'
+
+
+@pytest.mark.parametrize('header, expected', [
+    (None, None),
+    ('identity', None),
+    ('gzip', 'gzip'),
+    ('gzip;q=0', None),
+    ('*', 'gzip' if http_cache.brotli is None else 'br'),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_gzip_round_trip():
+    body = b'{"a": 1}' * 200
+    assert gzip.decompress(compress(body, 'gzip')) == body
+    with pytest.raises(ValueError):
+        compress(body, 'deflate')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    store = contest_storage.MemoryStore()
+    monkeypatch.setattr(contest_server, 'get_store', lambda: store)
+    contest_server.doc_cache.invalidate(*contest_server._cache_keys('etag-user'))
+    client = contest_server.app.test_client()
+    contests = [{'contestId': i, 'contestType': 'div2', 'totalScore': 100, 'solvedCount': 2, 'totalProblems': 4,
+                 'timeTaken': 60, 'name': f'Practice contest {i}'} for i in range(1, 40)]
+    response = client.post('/api/contest/data', json={'user': 'etag-user', 'pastContests': contests})
+    assert response.status_code == 200
+    return client
+
+
+def test_data_etag_and_304(client):
+    first = client.get('/api/contest/data?user=etag-user')
+    etag = first.headers['ETag']
+    assert not etag.startswith('W/')
+    assert 'Content-Encoding' not in first.headers
+
+    again = client.get('/api/contest/data?user=etag-user', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+
+
+def test_compressed_body_gets_weak_etag(client):
+    identity = client.get('/api/contest/data?user=etag-user')
+    assert len(identity.data) >= MIN_COMPRESS_SIZE
+    zipped = client.get('/api/contest/data?user=etag-user', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert zipped.headers['ETag'] == 'W/' + identity.headers['ETag']
+    assert json.loads(gzip.decompress(zipped.data)) == identity.get_json()
+
+    # The weak tag still revalidates (If-None-Match uses the weak comparison).
+    again = client.get('/api/contest/data?user=etag-user',
+                       headers={'Accept-Encoding': 'gzip', 'If-None-Match': zipped.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == zipped.headers['ETag']
+
+
+def test_writes_change_the_etag(client):
+    etag = client.get('/api/contest/data?user=etag-user').headers['ETag']
+    response = client.patch('/api/contest/data', json={
+        'user': 'etag-user', 'version': 1, 'ops': [{'op': 'bumpStreak', 'current': 3, 'best': 3}],
+    })
+    assert response.status_code == 200
+    assert client.get('/api/contest/data?user=etag-user', headers={'If-None-Match': etag}).status_code == 200
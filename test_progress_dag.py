@@ -0,0 +1,95 @@
+"""
+ProgressDag (progress_dag.py): validation, the app.js unlock rules and
+incremental propagation checked against a full evaluation.
+
+    python -m pytest -q test_progress_dag.py
+"""
+
+import random
+
+import pytest
+
+from progress_dag import COMPLETE, IN_PROGRESS, LOCKED, UNLOCKED, DagError, ProgressDag
+
+
+def _zones(*sizes, prereqs=None):
+    prereqs = prereqs or {}
+    return [
+        {'id': f'zone-{z}', 'levels': [
+            {'id': f'level-{z}-{i}', 'prereqs': prereqs.get(f'level-{z}-{i}', [])} for i in range(1, size + 1)
+        ]}
+        for z, size in enumerate(sizes, 1)
+    ]
+
+
+def _locked(dag):
+    return {level_id: LOCKED for level_id in dag.order}
+
+
+def test_implicit_rules():
+    dag = ProgressDag(_zones(3, 2))
+    statuses = _locked(dag)
+    assert dag.evaluate('level-1-1', statuses) == UNLOCKED  # the very first level
+    assert dag.evaluate('level-1-2', statuses) == LOCKED
+
+    statuses['level-1-1'] = COMPLETE
+    assert dag.evaluate('level-1-2', statuses) == UNLOCKED
+    # zone-2 opens when int(3 * 0.7) = 2 levels of zone-1 are complete.
+    assert dag.evaluate('level-2-1', statuses) == LOCKED
+    statuses['level-1-2'] = COMPLETE
+    assert dag.evaluate('level-2-1', statuses) == UNLOCKED
+    # ...and only the first level of it.
+    assert dag.evaluate('level-2-2', statuses) == LOCKED
+
+
+def test_explicit_prereqs_replace_the_implicit_rule():
+    dag = ProgressDag(_zones(3, prereqs={'level-1-3': ['level-1-1']}))
+    statuses = {**_locked(dag), 'level-1-1': COMPLETE}
+    assert dag.evaluate('level-1-3', statuses) == UNLOCKED
+    assert dag.evaluate('level-1-2', statuses) == UNLOCKED
+    assert 'level-1-3' in dag.dependents['level-1-1']
+
+
+def test_started_levels_keep_their_status():
+    dag = ProgressDag(_zones(2))
+    statuses = {'level-1-1': LOCKED, 'level-1-2': IN_PROGRESS}
+    assert dag.evaluate('level-1-2', statuses) == IN_PROGRESS
+
+
+@pytest.mark.parametrize('zones, message', [
+    (_zones(2, prereqs={'level-1-2': ['level-9-9']}), 'unknown prereq'),
+    (_zones(2, prereqs={'level-1-1': ['level-1-2']}), 'cycle'),
+    ([{'id': 'zone-1', 'levels': [{'id': 'a'}, {'id': 'a'}]}], 'Duplicate'),
+])
+def test_invalid_graphs(zones, message):
+    with pytest.raises(DagError, match=message):
+        ProgressDag(zones)
+
+
+def test_completing_a_level_unlocks_downstream():
+    dag = ProgressDag(_zones(2, 2))
+    statuses = {**_locked(dag), 'level-1-1': COMPLETE}
+    assert dag.propagate(statuses, ['level-1-1']) == {'level-1-2': UNLOCKED, 'level-2-1': UNLOCKED}
+
+
+def test_reopening_a_level_relocks_downstream():
+    dag = ProgressDag(_zones(2, 2))
+    statuses = {'level-1-1': UNLOCKED, 'level-1-2': UNLOCKED, 'level-2-1': UNLOCKED, 'level-2-2': LOCKED}
+    assert dag.propagate(statuses, ['level-1-1']) == {'level-1-2': LOCKED, 'level-2-1': LOCKED}
+
+
+def test_propagate_matches_a_full_evaluation():
+    rng = random.Random(7)
+    prereqs = {'level-2-3': ['level-1-4'], 'level-3-2': ['level-2-1', 'level-1-2']}
+    dag = ProgressDag(_zones(5, 4, 3, prereqs=prereqs))
+    for _ in range(300):
+        # Start from a consistent state, then change a few levels by hand.
+        statuses = {level_id: rng.choice([LOCKED, COMPLETE, IN_PROGRESS]) for level_id in dag.order}
+        statuses.update(dag.evaluate_all(statuses))
+        touched = rng.sample(dag.order, 3)
+        for level_id in touched:
+            statuses[level_id] = rng.choice([LOCKED, UNLOCKED, IN_PROGRESS, COMPLETE])
+
+        incremental = {**statuses, **dag.propagate(statuses, touched)}
+        full = {**statuses, **dag.evaluate_all(statuses)}
+        assert incremental == full
@@ -0,0 +1,168 @@
+"""
+PATCH /progress: curriculum.apply_patch, the strong If-Match comparison
+and the server.py endpoint on a small curriculum in a temp dir.
+
+    python -m pytest -q test_progress_patch.py
+"""
+
+import http.client
+import json
+import threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import server
+from curriculum import XP_PER_LEVEL, PatchError, apply_patch, split_curriculum, state_view
+from http_cache import strong_etag_matches
+
+
+def _doc():
+    return {
+        'version': '1.0',
+        'zones': [
+            {'id': 'zone-1', 'title': 'One', 'levels': [
+                {'id': 'level-1-1', 'title': 'A', 'xp': 100, 'status': 'unlocked'},
+                {'id': 'level-1-2', 'title': 'B', 'xp': 100, 'status': 'locked'},
+            ]},
+            {'id': 'zone-2', 'title': 'Two', 'levels': [
+                {'id': 'level-2-1', 'title': 'C', 'xp': 100, 'status': 'locked'},
+            ]},
+        ],
+        'user': {'current_xp': 0, 'level': 1, 'notes': {}, 'journal': {}},
+        'settings': {'view': 'grid'},
+    }
+
+
+# -- apply_patch --------------------------------------------------------------
+
+def test_apply_patch_copies_only_what_it_touches():
+    doc = _doc()
+    new, touched = apply_patch(doc, {'levels': {'zone-1/level-1-1': {'status': 'complete', 'note': 'done'}}})
+    assert touched == ['level-1-1']
+    assert new['zones'][0]['levels'][0]['status'] == 'complete'
+    assert new['user']['notes'] == {'level-1-1': 'done'}
+    assert new['zones'][1] is doc['zones'][1]  # untouched zone is shared
+    assert doc == _doc()  # the input is not mutated
+
+
+def test_apply_patch_journal_settings_and_note_removal():
+    doc = _doc()
+    doc['user']['notes'] = {'level-1-2': 'old'}
+    new, touched = apply_patch(doc, {
+        'levels': {'zone-1/level-1-2': {'note': '', 'journal': [{'id': 'j1', 'text': 'hi'}]}},
+        'settings': {'shortcutsEnabled': False},
+    })
+    assert touched == []
+    assert new['user']['notes'] == {}
+    assert new['user']['journal'] == {'level-1-2': [{'id': 'j1', 'text': 'hi'}]}
+    assert new['settings'] == {'view': 'grid', 'shortcutsEnabled': False}
+
+
+@pytest.mark.parametrize('xp, level', [(0, 1), (XP_PER_LEVEL - 1, 1), (XP_PER_LEVEL, 2), (5 * XP_PER_LEVEL + 1, 6)])
+def test_xp_sets_the_user_level(xp, level):
+    new, _ = apply_patch(_doc(), {'xp': xp})
+    assert new['user']['current_xp'] == xp
+    assert new['user']['level'] == level
+
+
+@pytest.mark.parametrize('patch, status', [
+    ([], 400),
+    ({'levels': []}, 400),
+    ({'levels': {'zone-1/level-1-1': 'complete'}}, 400),
+    ({'levels': {'zone-1/level-1-1': {'status': 'done'}}}, 400),
+    ({'levels': {'zone-1/level-1-1': {'journal': [{'text': ''}]}}}, 400),
+    ({'levels': {'zone-9/level-1-1': {'status': 'complete'}}}, 404),
+    ({'xp': -1}, 400),
+    ({'xp': True}, 400),
+    ({'settings': 'list'}, 400),
+])
+def test_apply_patch_rejects(patch, status):
+    with pytest.raises(PatchError) as e:
+        apply_patch(_doc(), patch)
+    assert e.value.status == status
+
+
+def test_curriculum_and_state_split():
+    curriculum = split_curriculum(_doc())
+    assert all('status' not in level for zone in curriculum['zones'] for level in zone['levels'])
+    state = state_view(_doc(), 'abc')
+    assert state['curriculum'] == 'abc'
+    assert state['levels'] == {'level-1-1': 'unlocked', 'level-1-2': 'locked', 'level-2-1': 'locked'}
+
+
+@pytest.mark.parametrize('header, etag, expected', [
+    ('"abc"', '"abc"', True),
+    ('"x", "abc"', '"abc"', True),
+    ('*', '"abc"', True),
+    ('W/"abc"', '"abc"', False),
+    ('W/"abc"', 'W/"abc"', False),
+    ('"abc"', None, False),
+    (None, '"abc"', False),
+])
+def test_if_match_is_strong(header, etag, expected):
+    assert strong_etag_matches(header, etag) is expected
+
+
+# -- the endpoint -------------------------------------------------------------
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'PROGRESS_DIR', tmp_path)
+    monkeypatch.setattr(server, '_seed_progress', _doc)
+    monkeypatch.setattr(server, '_user_stores', OrderedDict())
+    monkeypatch.setattr(server, '_curriculum', None)
+    monkeypatch.setattr(server, '_dag', None)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), server.Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=5)
+    yield conn
+    conn.close()
+    httpd.shutdown()
+    httpd.server_close()
+    for store in server._user_stores.values():
+        store.close()
+
+
+def _request(conn, method, path, body=None, headers=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    conn.request(method, path, body=data, headers={'Content-Type': 'application/json', **(headers or {})})
+    response = conn.getresponse()
+    raw = response.read()
+    is_json = response.getheader('Content-Type', '').startswith('application/json')
+    return response, json.loads(raw) if raw and is_json else raw
+
+
+def test_patch_answers_with_changed_statuses(conn):
+    etag = _request(conn, 'GET', '/progress?user=patcher')[0].getheader('ETag')
+    response, body = _request(conn, 'PATCH', '/progress?user=patcher',
+                              {'levels': {'zone-1/level-1-1': {'status': 'complete'}}, 'xp': 100},
+                              {'If-Match': etag})
+    assert response.status == 200
+    # level-1-2 follows level-1-1; zone-2 opens at int(70%) of zone-1 complete.
+    assert body['levels'] == {'level-1-1': 'complete', 'level-1-2': 'unlocked', 'level-2-1': 'unlocked'}
+    assert body['etag'] != etag
+
+    doc = _request(conn, 'GET', '/progress?user=patcher')[1]
+    assert doc['zones'][0]['levels'][1]['status'] == 'unlocked'
+    assert doc['user']['current_xp'] == 100
+
+
+def test_patch_with_stale_if_match_is_412(conn):
+    etag = _request(conn, 'GET', '/progress?user=racer')[0].getheader('ETag')
+    assert _request(conn, 'PATCH', '/progress?user=racer', {'xp': 10}, {'If-Match': etag})[0].status == 200
+    assert _request(conn, 'PATCH', '/progress?user=racer', {'xp': 20}, {'If-Match': etag})[0].status == 412
+    # A weak tag (from a compressed GET) never satisfies If-Match.
+    fresh = _request(conn, 'GET', '/progress?user=racer')[0].getheader('ETag')
+    assert _request(conn, 'PATCH', '/progress?user=racer', {'xp': 20}, {'If-Match': 'W/' + fresh})[0].status == 412
+
+
+def test_patch_errors(conn):
+    assert _request(conn, 'PATCH', '/progress?user=err',
+                    {'levels': {'zone-1/level-1-2': {'status': 'complete'}}})[0].status == 409
+    assert _request(conn, 'PATCH', '/progress?user=err',
+                    {'levels': {'zone-1/nope': {'status': 'complete'}}})[0].status == 404
+    assert _request(conn, 'PATCH', '/progress?user=err', {'xp': 'lots'})[0].status == 400
+    assert _request(conn, 'PATCH', '/progress?user=bad/key', {'xp': 1})[0].status == 400
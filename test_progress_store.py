@@ -0,0 +1,156 @@
+"""
+ProgressStore (progress_store.py): copy-on-write snapshots, write-behind
+persistence, the ETag sidecar and the cross-process shared mode, on
+documents in a temp dir.
+
+    python -m pytest -q test_progress_store.py
+"""
+
+import json
+import multiprocessing
+import sys
+import time
+
+import pytest
+
+from progress_store import ProgressStore, Snapshot, create_json, read_json
+
+
+def _seed():
+    return {'zones': [], 'user': {'current_xp': 0}}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'progress.json'
+
+
+def test_seed_is_persisted_on_first_read(path):
+    store = ProgressStore(path, _seed)
+    snap = store.get()
+    assert snap.data == _seed()
+    assert read_json(path) == _seed()
+    assert read_json(store.etag_path)['etag'] == snap.etag
+    assert not store.dirty
+
+
+def test_snapshot_body_and_etag():
+    snap = Snapshot.of({'a': 'é'})
+    assert json.loads(snap.body) == {'a': 'é'}
+    assert snap.etag == Snapshot.of({'a': 'é'}).etag != Snapshot.of({'a': 'e'}).etag
+    assert snap.encoded('gzip') is snap.encoded('gzip')  # compressed once
+
+
+def test_write_behind_coalesces_a_burst(path, monkeypatch):
+    store = ProgressStore(path, _seed, flush_delay=60)
+    store.get()
+    writes = []
+    write = store._write
+
+    def counting_write(version, snap):
+        writes.append(version)
+        write(version, snap)
+
+    monkeypatch.setattr(store, '_write', counting_write)
+    for xp in (10, 20, 30):
+        snap = store.put({'zones': [], 'user': {'current_xp': xp}})
+        # Readers see the new snapshot at once, the file only after the flush.
+        assert store.get() is snap
+    assert store.dirty
+    assert read_json(path) == _seed()
+
+    store.close()
+    assert writes == [3]
+    assert read_json(path)['user']['current_xp'] == 30
+    assert read_json(store.etag_path)['etag'] == snap.etag
+    assert not store.dirty
+
+
+def test_flusher_writes_within_flush_delay(path):
+    store = ProgressStore(path, _seed, flush_delay=0.01)
+    store.put({'zones': [], 'user': {'current_xp': 5}})
+    deadline = time.monotonic() + 2
+    while store.dirty and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not store.dirty
+    assert read_json(path)['user']['current_xp'] == 5
+    store.close()
+
+
+def test_snapshots_are_copy_on_write(path):
+    store = ProgressStore(path, _seed, flush_delay=60)
+    before = store.get()
+    after = store.update(lambda snap: {**snap.data, 'user': {'current_xp': 7}})
+    assert before.data == _seed()
+    assert after.data['user'] == {'current_xp': 7}
+    assert store.get() is after
+    store.close()
+
+
+def test_put_after_close_writes_through(path):
+    store = ProgressStore(path, _seed)
+    store.get()
+    store.close()
+    store.put({'zones': [], 'user': {'current_xp': 99}})
+    assert read_json(path)['user']['current_xp'] == 99
+
+
+def test_external_edit_is_picked_up(path):
+    store = ProgressStore(path, _seed, stat_interval=0)
+    store.get()
+    path.write_text(json.dumps({'zones': [], 'user': {'current_xp': 42}}), encoding='utf-8')
+    snap = store.get()
+    assert snap.data['user']['current_xp'] == 42
+    assert read_json(store.etag_path)['etag'] == snap.etag
+
+
+# -- shared mode (several processes on one file) ------------------------------
+
+posix_only = pytest.mark.skipif(sys.platform == 'win32', reason='shared mode uses fcntl.flock')
+
+
+def _bump(snap):
+    user = snap.data['user']
+    return {**snap.data, 'user': {**user, 'current_xp': user['current_xp'] + 1}}
+
+
+def _bump_many(path, times):
+    store = ProgressStore(path, _seed, shared=True)
+    for _ in range(times):
+        store.update(_bump)
+
+
+def test_create_json_first_writer_wins(path):
+    assert create_json(path, {'first': True})
+    assert not create_json(path, {'first': False})
+    assert read_json(path) == {'first': True}
+    assert [p.name for p in path.parent.iterdir()] == [path.name]  # no temp files left behind
+
+
+@posix_only
+def test_shared_stores_see_each_others_writes(path):
+    a = ProgressStore(path, _seed, shared=True)
+    b = ProgressStore(path, _seed, shared=True)
+    assert a.get().data == b.get().data == _seed()
+
+    snap = a.put({'zones': [], 'user': {'current_xp': 12}})
+    assert not a.dirty  # written through, no flusher
+    assert read_json(path)['user']['current_xp'] == 12
+    assert b.get().etag == snap.etag
+
+    b.update(_bump)
+    assert a.get().data['user']['current_xp'] == 13
+
+
+@posix_only
+def test_shared_updates_from_processes_do_not_lose_writes(path):
+    ctx = multiprocessing.get_context('fork')
+    workers = [ctx.Process(target=_bump_many, args=(path, 25)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+    store = ProgressStore(path, _seed, shared=True)
+    assert store.get().data['user']['current_xp'] == 100
+    assert read_json(store.etag_path)['etag'] == store.get().etag
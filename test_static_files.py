@@ -0,0 +1,151 @@
+"""
+Static files (static_files.py): sidecar and validator selection, cache
+policy and build manifests, and how server.py sends them over one
+keep-alive connection, on files in a temp dir.
+
+    python -m pytest -q test_static_files.py
+"""
+
+import functools
+import gzip
+import http.client
+import json
+import os
+import threading
+import types
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import server
+import static_files
+from static_files import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, StaticFiles, is_fingerprinted
+
+SOURCE = b'console.log("hello");\n' * 50
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'app.js').write_bytes(SOURCE)
+    (tmp_path / 'app.js.gz').write_bytes(gzip.compress(SOURCE))
+    (tmp_path / 'app.js.br').write_bytes(b'not really brotli')
+    (tmp_path / 'app.3f9a1c2b7d.js').write_bytes(SOURCE)
+    (tmp_path / 'plain.css').write_bytes(b'body {}\n')
+    return tmp_path
+
+
+def _age(path, seconds):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns - int(seconds * 1e9)))
+
+
+def test_sidecar_follows_accept_encoding(root):
+    files = StaticFiles()
+    plain = files.resolve(root / 'app.js', None)
+    assert plain.path == root / 'app.js' and plain.encoding is None and plain.has_variants
+    assert plain.size == len(SOURCE)
+
+    zipped = files.resolve(root / 'app.js', 'gzip, deflate')
+    assert zipped.path == root / 'app.js.gz' and zipped.encoding == 'gzip'
+    assert files.resolve(root / 'app.js', 'gzip, br').encoding == 'br'
+    assert files.resolve(root / 'app.js', 'br;q=0, gzip').encoding == 'gzip'
+
+    # Each representation has its own strong validator.
+    assert len({plain.etag, zipped.etag, files.resolve(root / 'app.js', 'br').etag}) == 3
+    assert not plain.etag.startswith('W/')
+
+
+def test_stale_sidecars_are_ignored(root):
+    _age(root / 'app.js.gz', 10)
+    _age(root / 'app.js.br', 10)
+    found = StaticFiles().resolve(root / 'app.js', 'gzip, br')
+    assert found.encoding is None and found.path == root / 'app.js'
+    assert not found.has_variants
+
+
+def test_etag_is_hashed_once_per_file_version(root, monkeypatch):
+    files = StaticFiles()
+    hashed = []
+    sha256 = static_files.hashlib.sha256
+
+    def counting_sha256():
+        hashed.append(1)
+        return sha256()
+
+    monkeypatch.setattr(static_files, 'hashlib', types.SimpleNamespace(sha256=counting_sha256))
+    first = files.resolve(root / 'plain.css', None).etag
+    assert files.resolve(root / 'plain.css', None).etag == first
+    assert len(hashed) == 1
+    (root / 'plain.css').write_bytes(b'body { color: red }\n')
+    assert files.resolve(root / 'plain.css', None).etag != first
+    assert len(hashed) == 2
+
+
+def test_cache_policy(root):
+    files = StaticFiles()
+    assert files.resolve(root / 'app.3f9a1c2b7d.js', None).cache_control == IMMUTABLE_CACHE_CONTROL
+    assert files.resolve(root / 'app.js', None).cache_control == REVALIDATE_CACHE_CONTROL
+    assert files.resolve(root / 'missing.js', None) is None
+    assert files.resolve(root, None) is None
+    assert is_fingerprinted('app.0123abcd.css') and not is_fingerprinted('app.v2.css')
+
+
+def test_build_manifest(root, tmp_path_factory):
+    build = tmp_path_factory.mktemp('dist')
+    (build / 'data').mkdir()
+    (build / 'data' / 'skills-1a2b.json').write_bytes(b'{}')
+    (build / 'app.js').write_bytes(b'minified')
+    (build / 'asset-manifest.json').write_text(json.dumps(
+        {'assets': {'data/skills.json': {'file': 'data/skills-1a2b.json'}}}), encoding='utf-8')
+    files = StaticFiles(build)
+    assert files.locate(root, str(root / 'app.js')) == os.path.join(build, 'app.js')
+    assert files.locate(root, str(root / 'plain.css')) == str(root / 'plain.css')
+    # Manifest files are immutable even without the name.<hex>.ext pattern.
+    hashed = files.resolve(build / 'data' / 'skills-1a2b.json', None)
+    assert hashed.cache_control == IMMUTABLE_CACHE_CONTROL
+    assert StaticFiles(tmp_path_factory.mktemp('empty')).build_dir is None
+
+
+# -- served by server.py ------------------------------------------------------
+
+@pytest.fixture
+def conn(root, monkeypatch):
+    monkeypatch.setattr(server.Handler, 'static', StaticFiles())
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(server.Handler, directory=str(root)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=5)
+    yield conn
+    conn.close()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(conn, path, **headers):
+    conn.request('GET', path, headers=headers)
+    response = conn.getresponse()
+    return response, response.read()
+
+
+def test_served_sidecar_and_revalidation(conn):
+    response, body = _get(conn, '/app.js', **{'Accept-Encoding': 'gzip'})
+    assert response.status == 200
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Vary') == 'Accept-Encoding'
+    assert response.getheader('Cache-Control') == REVALIDATE_CACHE_CONTROL
+    assert gzip.decompress(body) == SOURCE
+    etag = response.getheader('ETag')
+
+    response, body = _get(conn, '/app.js', **{'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status == 304 and body == b''
+    # The identity representation has another tag: no false 304.
+    assert _get(conn, '/app.js', **{'If-None-Match': etag})[0].status == 200
+
+
+def test_cache_control_does_not_leak_across_keep_alive_requests(conn):
+    response, _ = _get(conn, '/app.3f9a1c2b7d.js')
+    assert response.getheader('Cache-Control') == IMMUTABLE_CACHE_CONTROL
+    response, _ = _get(conn, '/missing.js')
+    assert response.status == 404
+    assert response.getheader('Cache-Control') == 'no-store'
+    response, _ = _get(conn, '/app.js.etag')  # private suffixes are never served
+    assert response.status == 404 and response.getheader('Cache-Control') == 'no-store'